@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+#
+# CurTools - Benchmark suite
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+# Usage: python -m benchmarks run [--save benchmarks/baseline.json] [--only NAME ...] [--repeat N]
+#        python -m benchmarks compare [benchmarks/baseline.json] [--results FILE] [--threshold 0.25]
+#
+# The suite covers the pure functions on the hot paths (hotpaths.py) and
+# widgets driven by scripted keys on the headless backend (widgets.py).
+# Every benchmark runs a few times and the best time is kept.
+#
+
+import datetime
+import json
+import platform
+import time
+from typing import Callable, Dict, List
+
+# name -> (setup function, repeat)
+BENCHMARKS = {}
+
+# Modules of the suite, imported when it runs (they register their benchmarks).
+SUITE = ("benchmarks.hotpaths", "benchmarks.widgets")
+
+
+def benchmark(repeat: int = 5) -> Callable:
+    """Registers a benchmark.
+
+    The decorated function does the setup and returns the callable to be
+    timed, so the setup is not measured.
+
+    Args:
+        repeat (int): Times it runs (the best one counts).
+
+    Returns:
+        Callable: The decorator.
+    """
+    def register(setup: Callable) -> Callable:
+        BENCHMARKS[setup.__name__] = (setup, repeat)
+        return setup
+    return register
+
+
+def load_suite():
+    """Imports the modules of the suite."""
+    import importlib
+    for name in SUITE:
+        importlib.import_module(name)
+
+
+def run(only: List[str] = None, repeat: int = None, report: Callable = None) -> Dict[str, float]:
+    """Runs the benchmarks.
+
+    Args:
+        only (List[str]): Names (or parts of them) to be run. None runs them all.
+        repeat (int): Times every benchmark runs. None for its own default.
+        report (Callable): Called as report(name, seconds) after every benchmark.
+
+    Returns:
+        Dict[str, float]: Best time (seconds) of every benchmark.
+    """
+    load_suite()
+    results = {}
+    for name, (setup, times) in BENCHMARKS.items():
+        if only and not any(part in name for part in only):
+            continue
+        fn = setup()
+        best = None
+        for _ in range(repeat or times):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = best
+        if report is not None:
+            report(name, best)
+    return results
+
+
+def save(results: Dict[str, float], path: str):
+    """Writes results to a JSON file (a baseline).
+
+    Args:
+        results (Dict[str, float]): Results of run().
+        path (str): File name.
+    """
+    data = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path: str) -> Dict[str, float]:
+    """Reads results written by save().
+
+    Args:
+        path (str): File name.
+
+    Returns:
+        Dict[str, float]: The results.
+    """
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare(baseline: Dict[str, float], results: Dict[str, float], threshold: float = 0.25) -> List[tuple]:
+    """Compares results against a baseline.
+
+    Args:
+        baseline (Dict[str, float]): Results taken as the reference.
+        results (Dict[str, float]): New results.
+        threshold (float): Slowdown (0.25 is 25%) taken as a regression.
+
+    Returns:
+        List[tuple]: (name, baseline seconds, seconds, change, verdict) for
+        every benchmark. change is new / old - 1, verdict is "regression",
+        "faster", "ok", "new" or "missing".
+    """
+    rows = []
+    for name in sorted(baseline.keys() | results.keys()):
+        old, new = baseline.get(name), results.get(name)
+        if old is None or new is None:
+            rows.append((name, old, new, None, "new" if old is None else "missing"))
+            continue
+        change = new / old - 1 if old else 0.0
+        if change > threshold:
+            verdict = "regression"
+        elif change < -threshold:
+            verdict = "faster"
+        else:
+            verdict = "ok"
+        rows.append((name, old, new, change, verdict))
+    return rows
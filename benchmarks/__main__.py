@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+#
+# CurTools - Benchmark suite command line
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+# Usage: python -m benchmarks run [--save benchmarks/baseline.json] [--only NAME ...] [--repeat N]
+#        python -m benchmarks compare [benchmarks/baseline.json] [--results FILE] [--threshold 0.25]
+#
+
+import argparse
+import os
+import sys
+
+import benchmarks
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def _print_result(name: str, seconds: float):
+    """INTERNAL - A line per benchmark, as they finish."""
+    print(f"{name:<28} {seconds * 1000:10.2f} ms", flush=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="CurTools benchmark suite.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the suite.")
+    run.add_argument("--save", metavar="FILE", help="Write the results to FILE (i.e. the baseline).")
+    run.add_argument("--only", nargs="*", metavar="NAME", help="Run only the benchmarks with NAME in their name.")
+    run.add_argument("--repeat", type=int, help="Times every benchmark runs (the best counts).")
+
+    cmp = commands.add_parser("compare", help="Compare with a baseline. Exits with 1 on regressions.")
+    cmp.add_argument("baseline", nargs="?", default=BASELINE)
+    cmp.add_argument("--results", metavar="FILE", help="Results saved before, instead of running the suite.")
+    cmp.add_argument("--only", nargs="*", metavar="NAME", help="Run only the benchmarks with NAME in their name.")
+    cmp.add_argument("--repeat", type=int, help="Times every benchmark runs (the best counts).")
+    cmp.add_argument("--threshold", type=float, default=0.25, help="Slowdown flagged (0.25 is 25%%).")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = benchmarks.run(args.only, args.repeat, _print_result)
+        if args.save:
+            benchmarks.save(results, args.save)
+            print(f"Saved to {args.save}")
+        return 0
+
+    baseline = benchmarks.load(args.baseline)
+    if args.results:
+        results = benchmarks.load(args.results)
+    else:
+        results = benchmarks.run(args.only, args.repeat)
+        if args.only:
+            baseline = {name: t for name, t in baseline.items() if name in results}
+
+    rows = benchmarks.compare(baseline, results, args.threshold)
+    print(f"{'benchmark':<28} {'baseline ms':>12} {'now ms':>12} {'change':>8}")
+    for name, old, new, change, verdict in rows:
+        old_ms = f"{old * 1000:12.2f}" if old is not None else f"{'-':>12}"
+        new_ms = f"{new * 1000:12.2f}" if new is not None else f"{'-':>12}"
+        pct = f"{change:+8.1%}" if change is not None else f"{'':>8}"
+        mark = f"  {verdict.upper()}" if verdict != "ok" else ""
+        print(f"{name:<28} {old_ms} {new_ms} {pct}{mark}")
+
+    regressions = sum(row[4] == "regression" for row in rows)
+    if regressions:
+        print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
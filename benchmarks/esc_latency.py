@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+#
+# CurTools - ESC latency benchmark
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+# Usage: python -m benchmarks.esc_latency [--runs N]
+#
+# Time from an ESC written to a terminal (a pty) to the widget closing,
+# before (a keypad window read with getch(): curses waits ESCDELAY for the
+# rest of a sequence) and after (keys.Decoder, through eventloop). Not part
+# of the suite: it needs a terminal and it's about waiting, not CPU.
+#
+
+import argparse
+import os
+import pty
+import select
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READY = b"<ready>"
+
+# Widget waiting for ESC: the old way (keypad mode) and text_browser().
+_CHILD = {
+    "keypad": """
+import curses, os
+def main(s):
+    s.keypad(True)
+    os.write(1, READY)
+    while s.getch() != 27:
+        pass
+curses.wrapper(main)
+""",
+    "decoder": """
+import curses, os
+from modules import cur_tools, screen
+def main(s):
+    s = cur_tools.curses_init(s)
+    flush = screen.frame_flush
+    def ready(*args):
+        flush(*args)
+        os.write(1, READY)
+    screen.frame_flush = ready
+    cur_tools.text_browser(s, "ESC", "ESC closes it.")
+curses.wrapper(main)
+""",
+}
+
+
+def _read_until(fd: int, marker: bytes, timeout: float = 5) -> bool:
+    """INTERNAL - Reads the child's output until marker shows up."""
+    data = b""
+    end = time.monotonic() + timeout
+    while marker not in data and time.monotonic() < end:
+        if select.select([fd], [], [], 0.05)[0]:
+            try:
+                data = data[-len(marker):] + os.read(fd, 65536)
+            except OSError:
+                return False
+    return marker in data
+
+
+def esc_to_close(mode: str) -> float:
+    """Seconds from ESC to the widget closing, in a child on a pty.
+
+    Args:
+        mode (str): "keypad" (before) or "decoder" (after).
+
+    Returns:
+        float: The time.
+    """
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.chdir(ROOT)
+        os.environ.setdefault("TERM", "xterm")
+        os.environ.pop("ESCDELAY", None)  # The curses default (1000 ms).
+        os.execvp(sys.executable, [sys.executable, "-c", f"READY = {READY!r}\n" + _CHILD[mode]])
+    try:
+        if not _read_until(fd, READY):
+            raise RuntimeError(f"{mode}: the widget never got ready")
+        start = time.perf_counter()
+        os.write(fd, b"\x1b")
+        while os.waitpid(pid, os.WNOHANG) == (0, 0):
+            if select.select([fd], [], [], 0.001)[0]:
+                try:
+                    os.read(fd, 65536)
+                except OSError:
+                    pass
+        return time.perf_counter() - start
+    finally:
+        os.close(fd)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.esc_latency",
+                                     description="ESC to close latency, keypad mode vs keys.Decoder.")
+    parser.add_argument("--runs", type=int, default=5, help="Times every mode runs (the median counts).")
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'median ms':>10} {'min ms':>10} {'max ms':>10}")
+    for mode in ("keypad", "decoder"):
+        times = [esc_to_close(mode) for _ in range(args.runs)]
+        print(f"{mode:<10} {statistics.median(times) * 1000:10.1f} "
+              f"{min(times) * 1000:10.1f} {max(times) * 1000:10.1f}", flush=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
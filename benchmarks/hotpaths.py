@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+#
+# CurTools - Hot path benchmarks
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+# Part of the suite: python -m benchmarks run --only justification ...
+#
+
+import random
+
+from benchmarks import benchmark
+from modules import const, cur_tools, headless, keys, menumodel, validators
+
+_WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+          "incididunt ut labore et dolore magna aliqua").split()
+
+
+def build_words(count: int, seed: int = 0) -> str:
+    """Text of count random words.
+
+    Args:
+        count (int): Words.
+        seed (int): Random seed (different texts, so no cache helps).
+
+    Returns:
+        str: The text.
+    """
+    rnd = random.Random(seed)
+    return " ".join(rnd.choice(_WORDS) for _ in range(count))
+
+
+def build_options(menus: int, options: int) -> dict:
+    """Nested dict of options, as menu_bar() takes it (every tenth option has a submenu)."""
+    result = {}
+    for m in range(menus):
+        menu = {}
+        for i in range(options):
+            option = {"description": f"Option {i} of menu {m}."}
+            if i % 10 == 0:
+                option["submenu"] = {f"Sub {j}": {"description": f"Suboption {j}."} for j in range(5)}
+            menu[f"Option {m}.{i}"] = option
+        result[f"Menu {m}"] = menu
+    return result
+
+
+@benchmark()
+def text_justification():
+    """Justifies 100k words at width 60 (cache emptied every time)."""
+    text = build_words(100_000)
+
+    def run():
+        cur_tools.justification_cache_clear()
+        cur_tools.text_justification(text, 60)
+    return run
+
+
+@benchmark()
+def align_paragraph():
+    """Aligns 500 paragraphs of 100 words at width 70 (cache emptied every time)."""
+    paragraphs = [build_words(100, seed) for seed in range(500)]
+
+    def run():
+        cur_tools.justification_cache_clear()
+        for paragraph in paragraphs:
+            cur_tools.align_paragraph(paragraph, 70)
+    return run
+
+
+@benchmark()
+def align_string():
+    """Aligns 20k lines at width 80."""
+    text = build_words(200_000)
+    lines = [text[i:i + 70].strip() for i in range(0, len(text), 70)][:20_000]
+
+    def run():
+        for i, line in enumerate(lines):
+            cur_tools.align_string(line, 80, i % 10 == 9)
+    return run
+
+
+@benchmark()
+def menu_hotkey_option():
+    """Hotkeys for 10k options."""
+    choices = [[f"{_WORDS[i % len(_WORDS)].title()} item {i}", ""] for i in range(10_000)]
+
+    def run():
+        cur_tools.menu_hotkey_option(choices)
+    return run
+
+
+@benchmark()
+def menu_model():
+    """Compiles a menu bar of 10 menus of 500 options (what convert_json_to_matrix() used to do)."""
+    options = build_options(10, 500)
+
+    def run():
+        menumodel.MenuModel(options)
+    return run
+
+
+@benchmark()
+def status_bar():
+    """10k status bar updates, on the headless backend."""
+    texts = [f"Option ({i}, {i % 7}) - {build_words(8, i)}\r" for i in range(100)]
+    backend = headless.Backend(120, 40)
+
+    def run():
+        s = backend.install()
+        try:
+            for i in range(10_000):
+                cur_tools.status_bar(s, texts[i % len(texts)])
+        finally:
+            backend.uninstall()
+    return run
+
+
+@benchmark()
+def key_decoder():
+    """Decodes 100k keys: chars, arrows, F-keys and Alt+char sequences."""
+    sequences = ["a", "\x1b[A", "\x1b[B", "\x1bOP", "\x1b[15~", "\x1b[1;5C", "\x1bx", "Z"]
+    codes = [ord(c) for i in range(100_000) for c in sequences[i % len(sequences)]]
+
+    def run():
+        decoder = keys.Decoder()
+        for code in codes:
+            decoder.feed(code)
+        decoder.flush()
+    return run
+
+
+@benchmark()
+def valid_input():
+    """Every key from 0 to 255, 100 times, for every input type."""
+    types = (const.INPUT_TYPE_ALPHANUMERIC, const.INPUT_TYPE_NUMERIC,
+             const.INPUT_TYPE_ALPHABETIC, const.INPUT_TYPE_TEXT)
+
+    def run():
+        for _ in range(100):
+            for input_type in types:
+                for key in range(256):
+                    cur_tools.valid_input(key, input_type)
+    return run
+
+
+@benchmark()
+def input_validator():
+    """Every key from 0 to 255, 100 times, for every input type, as the input fields check them."""
+    accepts = [validators.get(input_type).accepts for input_type in (
+        const.INPUT_TYPE_ALPHANUMERIC, const.INPUT_TYPE_NUMERIC, const.INPUT_TYPE_ALPHABETIC,
+        const.INPUT_TYPE_TEXT, const.INPUT_TYPE_EMAIL, const.INPUT_TYPE_DATE)]
+
+    def run():
+        for _ in range(100):
+            for check in accepts:
+                for key in range(256):
+                    check(key)
+    return run
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+#
+# CurTools - Parallel justification benchmark
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+# Usage: python -m benchmarks.justify_parallel [--size-mb 8] [--width 70]
+#
+
+import argparse
+import os
+import time
+
+from modules import cur_tools, justify
+
+_SEPARATORS = ("\n\n", "\n\n\n", "\n\n", "\n \n\n\n")
+
+
+def build_text(size_mb: float) -> str:
+    """Builds a text of about size_mb megabytes out of sample.txt paragraphs.
+
+    Args:
+        size_mb (float): Size of the text.
+
+    Returns:
+        str: The text.
+    """
+    sample = os.path.join(os.path.dirname(__file__), "..", "sample.txt")
+    with open(sample, encoding="utf-8") as f:
+        paragraph = f.read().strip()
+
+    # Every paragraph is different, so the justification caches don't help.
+    # Some are apart by more than one blank line, which every chunk cut has
+    # to keep (the output is checked against the serial one).
+    copies = int(size_mb * 1024 * 1024 / (len(paragraph) + 10)) + 1
+    return "".join(f"{i} {paragraph}" + _SEPARATORS[i % len(_SEPARATORS)] for i in range(copies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs parallel justification.")
+    parser.add_argument("--size-mb", type=float, default=8)
+    parser.add_argument("--width", type=int, default=70)
+    parser.add_argument("--chunk-size", type=int, default=justify.DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    text = build_text(args.size_mb)
+    print(f"{len(text) / 1024 / 1024:.1f} MB, width {args.width}, "
+          f"chunk {args.chunk_size}, {os.cpu_count()} CPUs")
+
+    # The serial row is justify_paragraphs() in this process; every "w" row,
+    # 1 worker too, goes through the process pool (and pays its overhead).
+    cur_tools.justification_cache_clear()
+    start = time.perf_counter()
+    serial = justify.justify_paragraphs(text, args.width)
+    base = time.perf_counter() - start
+    print(f"{'serial':>10} {base:8.3f}s {1:6.2f}x")
+
+    for workers in args.workers:
+        cur_tools.justification_cache_clear()
+        start = time.perf_counter()
+        first = None
+        rows = []
+        for chunk in justify.justify_parallel(text, args.width, workers, args.chunk_size):
+            if first is None:
+                first = time.perf_counter() - start
+            rows.extend(chunk)
+        elapsed = time.perf_counter() - start
+
+        assert rows == serial, "parallel output differs from the serial one"
+        print(f"{workers:>8} w {elapsed:8.3f}s {base / elapsed:6.2f}x  (first chunk {first:.3f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+#
+# CurTools - Progress tracker benchmark
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+# Usage: python -m benchmarks.progress_tracker [--items 10000000] [--threads 4] [--screen]
+#
+
+import argparse
+import curses
+import threading
+import time
+
+from modules import cur_tools, progress
+
+
+def per_item(fn, items: int) -> float:
+    """Runs fn(items) and returns the nanoseconds per item."""
+    start = time.perf_counter()
+    fn(items)
+    return (time.perf_counter() - start) / items * 1e9
+
+
+def bare(items: int):
+    for _ in range(items):
+        pass
+
+
+def iterate(items: int, s: curses.window = None):
+    with progress.Progress(range(items), s=s) as p:
+        for _ in p:
+            pass
+
+
+def update(items: int, s: curses.window = None):
+    with progress.Progress(total=items, s=s) as p:
+        for _ in range(items):
+            p.update()
+
+
+def threads(items: int, count: int):
+    p = progress.Progress(total=items)
+
+    def work(n: int):
+        for _ in range(n):
+            p.update()
+
+    workers = [threading.Thread(target=work, args=(items // count,)) for _ in range(count)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    p.close()
+    assert p.count == items // count * count
+
+
+def old_update(items: int, s: curses.window):
+    w, sha = cur_tools.progress_bar_create(s, items)
+    for i in range(items):
+        cur_tools.progress_bar_update(w, i + 1, items)
+    cur_tools.progress_bar_close(w, sha)
+
+
+def report(rows: list, base: float):
+    print(f"{'case':<34} {'ns/item':>9} {'overhead':>9}")
+    for name, ns in rows:
+        print(f"{name:<34} {ns:9.1f} {ns - base:9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of the progress tracker per increment.")
+    parser.add_argument("--items", type=int, default=10_000_000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--screen", action="store_true",
+                        help="Paint in a curses window, against progress_bar_update() per item.")
+    args = parser.parse_args()
+
+    if args.screen:
+        rows = []
+
+        def run(scr):
+            s = cur_tools.curses_init(scr)
+            items = args.items // 100
+            rows.append(("loop", per_item(bare, args.items)))
+            rows.append(("Progress(iterable), window", per_item(lambda n: iterate(n, s), args.items)))
+            rows.append(("Progress.update(), window", per_item(lambda n: update(n, s), args.items)))
+            rows.append((f"progress_bar_update() x {items}", per_item(lambda n: old_update(n, s), items)))
+
+        curses.wrapper(run)
+    else:
+        rows = [("loop", per_item(bare, args.items)),
+                ("Progress(iterable)", per_item(iterate, args.items)),
+                ("Progress.update()", per_item(update, args.items)),
+                (f"Progress.update(), {args.threads} threads",
+                 per_item(lambda n: threads(n, args.threads), args.items))]
+
+    report(rows, rows[0][1])
+
+
+if __name__ == '__main__':
+    main()
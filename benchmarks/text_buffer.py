@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+#
+# CurTools - Text buffer benchmark
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+# Usage: python -m benchmarks.text_buffer [--sizes-mb 1 10 50] [--keys 5000]
+#
+
+import argparse
+import random
+import time
+
+from modules import textbuffer
+
+
+def build_text(size_mb: float) -> str:
+    """Builds a text of about size_mb megabytes, in lines of 40 to 100 chars.
+
+    Args:
+        size_mb (float): Size of the text.
+
+    Returns:
+        str: The text.
+    """
+    rnd = random.Random(size_mb)
+    line = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    lines = []
+    total = 0
+    while total < size_mb * 1024 * 1024:
+        lines.append(line[:rnd.randint(40, 100)])
+        total += len(lines[-1]) + 1
+    return "\n".join(lines)
+
+
+def typing(text: textbuffer.TextBuffer, keys: int, rows: int = 50) -> float:
+    """Types at random places, the way simple_text_editor does it.
+
+    Every key is an insert at (line, col) plus the line fetched to redraw
+    it. Every 100 keys there is a page (rows lines) fetched, as in a scroll.
+
+    Args:
+        text (TextBuffer): The buffer.
+        keys (int): Number of keys.
+        rows (int): Lines of a page.
+
+    Returns:
+        float: Microseconds per key.
+    """
+    rnd = random.Random(0)
+    lines = text.line_count()
+    start = time.perf_counter()
+    for i in range(keys):
+        if i % 100 == 0:
+            y = rnd.randrange(lines)
+            x = 0
+            text.lines(y, rows)
+        text.insert(text.offset(y, x), "x")
+        x += 1
+        text.line(y)
+    return (time.perf_counter() - start) / keys * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text buffer open time and typing latency.")
+    parser.add_argument("--sizes-mb", type=float, nargs="*", default=[0.01, 1, 10, 50])
+    parser.add_argument("--keys", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'size':>10} {'lines':>10} {'open':>9} {'us/key':>9}")
+    for size in args.sizes_mb:
+        raw = build_text(size)
+
+        start = time.perf_counter()
+        text = textbuffer.TextBuffer(raw)
+        opened = time.perf_counter() - start
+
+        per_key = typing(text, args.keys)
+        print(f"{size:>8} MB {text.line_count():>10} {opened:8.3f}s {per_key:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+#
+# CurTools - Vertical menu benchmark
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+# Usage: python -m benchmarks.vertical_menu [--options 10000] [--keys 200]
+#
+# Runs in the terminal (curses). The keys are scripted: the time from a
+# key read to the next read (drawing and sending the frame included) is
+# the latency of that key.
+#
+
+import argparse
+import curses
+import time
+
+from modules import cur_tools, eventloop, menumodel, screen
+
+
+def build_choices(count: int) -> list:
+    """Options like [text, description]."""
+    words = ["open", "save", "print", "export", "import", "close", "options", "tools"]
+    return [[f"{words[i % len(words)].title()} item {i}", f"Description of item {i}"]
+            for i in range(count)]
+
+
+def run_menu(s: curses.window, choices: list, keys: list) -> tuple:
+    """Opens a menu and feeds it the keys.
+
+    Returns:
+        tuple[float, dict]: Seconds until the menu waits for the first key,
+        and the latencies (seconds) of every kind of key.
+    """
+    script = iter(keys)
+    stamps = []
+    kinds = []
+
+    async def scripted_getch(w, timeout=None):
+        screen.frame_flush(True)
+        stamps.append(time.perf_counter())
+        kind, key = next(script)
+        kinds.append(kind)
+        stamps.append(time.perf_counter())
+        return key
+
+    original = eventloop.getch
+    eventloop.getch = scripted_getch
+    try:
+        start = time.perf_counter()
+        eventloop.run(cur_tools.vertical_menu_async(s, choices, 1, 0))
+    finally:
+        eventloop.getch = original
+
+    latencies = {}
+    for i, kind in enumerate(kinds[:-1]):
+        latencies.setdefault(kind, []).append(stamps[2 * i + 2] - stamps[2 * i + 1])
+    return stamps[0] - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open time and per key latency of vertical_menu().")
+    parser.add_argument("--options", type=int, default=10_000)
+    parser.add_argument("--keys", type=int, default=200)
+    args = parser.parse_args()
+
+    choices = build_choices(args.options)
+    n = args.keys
+    keys = ([("down", curses.KEY_DOWN)] * n + [("page down", curses.KEY_NPAGE)] * n
+            + [("up", curses.KEY_UP)] * n + [("end", curses.KEY_END), ("home", curses.KEY_HOME)] * (n // 2)
+            + [("hotkey", ord(c)) for c in "OSPEICT" * (n // 7)]
+            + [("search", ord("/"))] + [("search", ord(c)) for c in "item 9999"]
+            + [("enter", curses.ascii.NL)])
+
+    results = []
+
+    def run(scr):
+        s = cur_tools.curses_init(scr)
+        start = time.perf_counter()
+        menu = menumodel.MenuList(choices)
+        results.append(("compile", time.perf_counter() - start))
+        results.append(run_menu(s, menu, keys))
+
+    curses.wrapper(run)
+
+    (_, compile_time), (open_time, latencies) = results
+    print(f"{args.options} options")
+    print(f"{'compile (MenuList)':<18} {compile_time * 1000:9.2f} ms")
+    print(f"{'open':<18} {open_time * 1000:9.2f} ms")
+    print(f"{'key':<18} {'mean ms':>9} {'max ms':>9}")
+    for kind, times in latencies.items():
+        print(f"{kind:<18} {sum(times) / len(times) * 1000:9.3f} {max(times) * 1000:9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+#
+# CurTools - Widget benchmarks
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+# Part of the suite: python -m benchmarks run --only text_browser ...
+#
+# Widgets run on the headless backend, driven by scripted keys: the time
+# is the whole session, drawing included.
+#
+
+import contextlib
+import curses
+import os
+import tempfile
+from curses import ascii
+
+from benchmarks import benchmark
+from benchmarks.hotpaths import build_words
+from modules import cur_tools, formmodel, headless
+
+
+@contextlib.contextmanager
+def headless_screen(keys: list, cols: int = 100, lines: int = 30):
+    """Screen of a headless session with the keys scripted.
+
+    Args:
+        keys (list): Keys (see headless.Backend.feed()).
+        cols (int): Screen width.
+        lines (int): Screen height.
+
+    Yields:
+        curses.window: The screen, as curses_init() returns it.
+    """
+    backend = headless.Backend(cols, lines, keys)
+    try:
+        yield cur_tools.curses_init(None, backend)
+    finally:
+        cur_tools.curses_end()
+
+
+@benchmark(repeat=3)
+def text_browser_scroll():
+    """Scrolls 10k lines down in text_browser() (text justified beforehand)."""
+    text = build_words(100_000)
+    cur_tools.text_justification(text, 50)  # Cached: only the scroll is measured.
+    keys = [curses.KEY_DOWN] * 10_000 + [ascii.ESC]
+
+    def run():
+        with headless_screen(keys) as s:
+            cur_tools.text_browser(s, "Benchmark", text)
+    return run
+
+
+@benchmark(repeat=3)
+def text_browser_burst():
+    """A burst of 1000 down arrows (held down key) in text_browser(): one jump, one frame."""
+    text = build_words(100_000)
+    cur_tools.text_justification(text, 50)
+    keys = ["\x1b[B" * 1000, ascii.ESC]
+
+    def run():
+        with headless_screen(keys) as s:
+            cur_tools.text_browser(s, "Benchmark", text)
+    return run
+
+
+@benchmark(repeat=3)
+def text_editor_typing():
+    """Types 5k chars (a new line every 70) in simple_text_editor(), then exits without saving."""
+    text = build_words(1000)[:5000]
+    keys = [ch if (i + 1) % 70 else "\n" for i, ch in enumerate(text)]
+    keys += [curses.KEY_F10, "y"]
+    folder = tempfile.mkdtemp()
+
+    def run():
+        filename = os.path.join(folder, "typing.txt")
+        with headless_screen(keys) as s:
+            cur_tools.simple_text_editor(s, filename, swap=False)
+    return run
+
+
+@benchmark(repeat=3)
+def text_editor_paste():
+    """Pastes 100 KB (bracketed paste, 1200 lines) in simple_text_editor(), then exits without saving."""
+    text = "\r\n".join(build_words(15, i) for i in range(1200))
+    keys = ["\x1b[200~" + text + "\x1b[201~", curses.KEY_F10, "y"]
+    folder = tempfile.mkdtemp()
+
+    def run():
+        filename = os.path.join(folder, "paste.txt")
+        with headless_screen(keys) as s:
+            cur_tools.simple_text_editor(s, filename, swap=False)
+    return run
+
+
+@benchmark(repeat=3)
+def table_viewer_paging():
+    """Pages 1000 times down a table of 100k rows in table_viewer()."""
+    data = [[str(i), f"name {i}", str(i * 0.25), build_words(4, i % 100)] for i in range(100_000)]
+    keys = [curses.KEY_NPAGE] * 1000 + ["q"]
+
+    def run():
+        with headless_screen(keys) as s:
+            cur_tools.table_viewer(s, data)
+    return run
+
+
+@benchmark(repeat=3)
+def table_viewer_burst():
+    """A burst of 1000 down arrows and 1000 PgDn (held down keys) in table_viewer()."""
+    data = [[str(i), f"name {i}", str(i * 0.25), build_words(4, i % 100)] for i in range(100_000)]
+    keys = ["\x1b[B" * 1000, "\x1b[6~" * 1000, "q"]
+
+    def run():
+        with headless_screen(keys) as s:
+            cur_tools.table_viewer(s, data)
+    return run
+
+
+@benchmark(repeat=3)
+def form_entry():
+    """Fills a 300 field form (15 sections) in form_view(): a value and Tab per field, then submit."""
+    fields = [{"label": f"Field {i}", "length": 12, "section": f"Section {i // 20}" if i % 20 == 0 else None}
+              for i in range(300)]
+    model = formmodel.FormModel(fields)
+    keys = []
+    for i in range(300):
+        keys += [f"value {i}", "\t"]
+    keys.append("\n")
+
+    def run():
+        with headless_screen(keys) as s:
+            cur_tools.form_view(s, "Benchmark", model)
+    return run
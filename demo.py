@@ -1,16 +1,65 @@
 #!/usr/bin/env python3
+import asyncio
 import curses
+import os
+import shutil
 import sys
+import tempfile
+import time
 
 from modules import cur_tools
 from modules import const
-import time
+from modules import eventloop
+from modules import jobs
+from modules import menumodel
+from modules import progress
 
 
 # import lorem
 # import sqlite3
 
 
+def scratch_copy(filename: str) -> str:
+    """Copy of a file in the temp dir, to be edited without touching it.
+
+    Args:
+        filename (str): File name.
+
+    Returns:
+        str: Name of the copy (made once, later runs go on editing it).
+    """
+    copy = os.path.join(tempfile.gettempdir(), f"curtools-{os.path.basename(filename)}")
+    if not os.path.exists(copy):
+        shutil.copyfile(filename, copy)
+    return copy
+
+
+async def progress_demo(s: curses.window):
+    """Progress bar demo. Waiting between updates doesn't block the event loop.
+
+    Args:
+        s (curses): Screen curses object.
+    """
+    with progress.Progress(total=100, s=s, title="Progress Bar") as p:
+        for i in range(100):
+            await asyncio.sleep(100 / 1000)
+            p.update()
+
+
+def count_job(report, n: int, delay: float):
+    """Job for the dashboard demo: counts up to n, reporting every step.
+
+    Args:
+        report (jobs.Reporter): Progress report function.
+        n (int): Steps.
+        delay (float): Seconds per step.
+    """
+    for i in range(n):
+        time.sleep(delay)
+        report(i + 1, n)
+    return n
+
+
 def myapp(scr: curses.window):
     """Main Function
 
@@ -38,31 +87,34 @@ def myapp(scr: curses.window):
             "Bar Chart": {"description": "Bar chart."},
             "Progress Bar": {"description": "A simple progress bar."},
             "Editor": {"description": "A simple text editor."},
-            "Forms (WIP)": {"description": "Forms demo"}
+            "Forms (WIP)": {"description": "Forms demo"},
+            "Jobs": {"description": "Jobs running in a process pool."}
         },
         "Help": {
             "About": {"description": "About this app."}
         }
     }
 
+    menu = menumodel.MenuModel(myops)  # Compiled once, just drawn every time.
+
     cur_tools.status_bar(s, "Press Enter or ALT+KEY to start the demo.")
-    m, mm = cur_tools.menu_bar(s, myops)
+    m, mm = cur_tools.menu_bar(s, menu)
 
     while m != 1 or mm != 4:  # File->Exit
 
         cur_tools.status_bar(s, f'Option: ({m} , {mm})')
 
         # Option branch.
-        if m == 2 and mm == 1:
+        if m == 1 and mm == 1:
+            file = cur_tools.file_selector(s)
+            if file is not None:
+                cur_tools.info_win(s, file)
+        elif m == 2 and mm == 1:
             file = "sample.txt"
             try:
-                file = open(file)
+                cur_tools.text_file_browser(s, "Browsing demo", file)
             except FileNotFoundError:
                 cur_tools.error_win(s, f"File '{file}' not found")
-            else:
-                line = file.read().replace("\n", " ")
-                cur_tools.text_browser(s, "Browsing demo", line)
-                file.close()
         elif m == 2 and mm == 102:
             data = cur_tools.input_box(s, "Name", 40, "Enter your name",
                                        const.INPUT_TYPE_ALPHANUMERIC)
@@ -76,14 +128,10 @@ def myapp(scr: curses.window):
             cur_tools.bar_chart(win, [("A", 10), ("B", 20), ("C", 30), ("D", 40), ("E", 50)])
             cur_tools.end_win(win,sha)
         elif m == 2 and mm == 4:
-            pbw,pbs=cur_tools.progress_bar_create(s, 100, "Progress Bar")
-            for i in range(101):
-                cur_tools.progress_bar_update(pbw,i,100)
-                time.sleep(100 / 1000)
-                
-            cur_tools.progress_bar_close(pbw,pbs)
+            eventloop.run(progress_demo(s))
         elif m == 2 and mm == 5:
-            cur_tools.simple_text_editor(s, "sample.txt")            
+            # A scratch copy: autosave writes over the file.
+            cur_tools.simple_text_editor(s, scratch_copy("sample.txt"), autosave=30)
             
         elif m == 2 and mm == 6:
             data = cur_tools.form_win(s, "Form demo", [
@@ -92,13 +140,20 @@ def myapp(scr: curses.window):
                 {"label": "Email", "placeholder": "Enter your email", "type": const.INPUT_TYPE_EMAIL, "length": 30}
             ])
 
-            cur_tools.info_win(s, data)
+            if data is None:
+                cur_tools.info_win(s, "Form canceled")
+            else:
+                cur_tools.info_win(s, ", ".join(f"{name}: {value}" for name, value in data.items()))
+        elif m == 2 and mm == 7:
+            done = jobs.dashboard(s, [jobs.Job(count_job, 50 + 10 * i, 0.05, name=f"Job {i + 1}")
+                                      for i in range(8)], processes=True, workers=4)
+            cur_tools.info_win(s, f"{sum(job.state == jobs.DONE for job in done)} jobs done")
         elif m == 3 and mm == 1:
             cur_tools.info_win(s, "Demo for cur tools. By Pablo Niklas")
         else:
             cur_tools.info_win(s, ":: Men at work ::")
 
-        m, mm = cur_tools.menu_bar(s, myops)
+        m, mm = cur_tools.menu_bar(s, menu)
 
 
 # Python's entry point
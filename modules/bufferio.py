@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+#
+# CurTools - Text buffer load & save
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+import os
+import re
+import tempfile
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+from modules.textbuffer import TextBuffer
+
+# Files are read in chunks of this many chars.
+CHUNK_SIZE = 1024 * 1024
+
+_SWAP_MAGIC = "CURTOOLS-SWAP 1"
+
+
+class FileFormat:
+    """What a file looked like on disk, so saving it gives it back as it was."""
+
+    def __init__(self, newline: str = "\n", lossy: bool = False):
+        """Creates a file format.
+
+        Args:
+            newline (str): Line end of the file: "\\n", "\\r\\n" or "\\r".
+            lossy (bool): True if saving the text won't give the same file
+                back: it had bytes that aren't text in its encoding (loaded
+                as U+FFFD) or mixed line ends.
+        """
+        self.newline = newline
+        self.lossy = lossy
+
+
+# Bytes that aren't text in the encoding, as the surrogateescape handler loads them.
+_ESCAPED_RE = re.compile('[\udc80-\udcff]')
+
+
+def load(filename: str, encoding: str = "utf-8", chunk_size: int = CHUNK_SIZE) -> Tuple[TextBuffer, FileFormat]:
+    """Loads a file into a text buffer, chunk by chunk.
+
+    Line ends are loaded as "\\n", and bytes that aren't text in the encoding
+    as U+FFFD. The file format tells which line end to save and if the load
+    lost anything.
+
+    Args:
+        filename (str): File name. If it doesn't exist the buffer is empty.
+        encoding (str): File encoding.
+        chunk_size (int): Chars read at a time.
+
+    Returns:
+        Tuple[TextBuffer, FileFormat]: The text, and the format of the file.
+    """
+    text = TextBuffer()
+    fmt = FileFormat()
+    try:
+        with open(filename, encoding=encoding, errors="surrogateescape") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                if _ESCAPED_RE.search(chunk):
+                    chunk = _ESCAPED_RE.sub('\ufffd', chunk)
+                    fmt.lossy = True
+                text.extend(chunk)
+
+            if isinstance(f.newlines, str):
+                fmt.newline = f.newlines
+            elif f.newlines is not None:  # Mixed: they're all saved as "\n".
+                fmt.lossy = True
+    except FileNotFoundError:
+        pass
+
+    return text, fmt
+
+
+def save(chunks: Iterable[str], filename: str, encoding: str = "utf-8", newline: str = "\n"):
+    """Saves text atomically: it's written to a temp file that then replaces the file.
+
+    A crash in the middle leaves the old file untouched.
+
+    Args:
+        chunks (Iterable[str]): Pieces of the text (i.e. TextBuffer.snapshot()).
+        filename (str): File name.
+        encoding (str): File encoding.
+        newline (str): Line end every "\\n" of the text is written as (see FileFormat).
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, newline=newline) as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+
+        try:
+            os.chmod(tmp, os.stat(filename).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+
+        os.replace(tmp, filename)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def swap_name(filename: str) -> str:
+    """Name of the swap journal of a file (.name.swp, next to it).
+
+    Args:
+        filename (str): File name.
+
+    Returns:
+        str: Swap file name.
+    """
+    directory, name = os.path.split(os.path.abspath(filename))
+    return os.path.join(directory, f".{name}.swp")
+
+
+def _file_stamp(filename: str) -> tuple:
+    """INTERNAL - Size and mtime of a file, to tell if it changed."""
+    try:
+        st = os.stat(filename)
+    except FileNotFoundError:
+        return -1, 0
+    return st.st_size, st.st_mtime_ns
+
+
+class Journal:
+    """Append-only journal of the edits of a buffer (the swap file).
+
+    Every edit is a record with a sequence number. A checkpoint record says
+    that the file on disk holds the text up to some sequence number, so
+    after a crash the file is loaded and the later edits are replayed.
+
+    Records:
+        I <seq> <pos> <chars>\\n<text>\\n    insert
+        D <seq> <pos> <chars>\\n            delete
+        C <seq> <size> <mtime_ns>\\n        checkpoint
+    """
+
+    def __init__(self, filename: str, resume: bool = False):
+        """Starts a journal.
+
+        Args:
+            filename (str): File being edited.
+            resume (bool): True to go on with the journal of a recovered
+                session. False starts a new one (the old one is overwritten).
+        """
+        self.filename = filename
+        self.swap = swap_name(filename)
+        self.seq = 0
+        self._lock = threading.Lock()
+
+        size, mtime = _file_stamp(filename)
+        records = [f"{_SWAP_MAGIC}\n"]
+        base = None
+        if resume:
+            checkpoints, edits = _read_journal(self.swap)
+            base = _journal_base(checkpoints, filename)
+
+        if base is not None:
+            # Only what's needed to replay is kept, and a record cut by the
+            # crash is dropped.
+            records.append(f"C {base} {size} {mtime}\n")
+            self.seq = base
+            for kind, seq, pos, arg in edits:
+                if seq > base:
+                    records.append(_record(kind, seq, pos, arg))
+                    self.seq = seq
+        else:
+            records.append(f"C 0 {size} {mtime}\n")
+
+        save(records, self.swap)
+        self._f = open(self.swap, "a", encoding="utf-8", newline="")
+
+    def insert(self, pos: int, text: str):
+        """Records an insert.
+
+        Args:
+            pos (int): Offset, in chars.
+            text (str): Text inserted.
+        """
+        with self._lock:
+            self.seq += 1
+            self._f.write(_record("I", self.seq, pos, text))
+            self._f.flush()
+
+    def delete(self, pos: int, length: int):
+        """Records a delete.
+
+        Args:
+            pos (int): Offset, in chars.
+            length (int): Number of chars.
+        """
+        with self._lock:
+            self.seq += 1
+            self._f.write(_record("D", self.seq, pos, length))
+            self._f.flush()
+
+    def checkpoint(self, seq: int):
+        """Records that the file on disk holds the text up to edit seq.
+
+        Args:
+            seq (int): Sequence number of the last edit saved.
+        """
+        size, mtime = _file_stamp(self.filename)
+        with self._lock:
+            if self._f is not None:
+                self._f.write(f"C {seq} {size} {mtime}\n")
+                self._f.flush()
+
+    def close(self, remove: bool = True):
+        """Closes the journal.
+
+        Args:
+            remove (bool): True to delete the swap file (clean exit).
+        """
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+        if remove:
+            try:
+                os.unlink(self.swap)
+            except FileNotFoundError:
+                pass
+
+
+def _record(kind: str, seq: int, pos: int, arg) -> str:
+    """INTERNAL - Journal record of an edit (arg is the text or the length)."""
+    if kind == "I":
+        return f"I {seq} {pos} {len(arg)}\n{arg}\n"
+    return f"D {seq} {pos} {arg}\n"
+
+
+def _journal_base(checkpoints: List[tuple], filename: str) -> int:
+    """INTERNAL - Last checkpoint that fits the file on disk (None if none does)."""
+    stamp = _file_stamp(filename)
+    base = [seq for seq, size, mtime in checkpoints if (size, mtime) == stamp]
+    return base[-1] if base else None
+
+
+def _read_journal(swap: str) -> tuple:
+    """INTERNAL - Parses a swap file.
+
+    A record cut by a crash ends the journal.
+
+    Returns:
+        tuple[List[tuple], List[tuple]]: Checkpoints (seq, size, mtime) and
+        edits (kind, seq, pos, text or length).
+    """
+    checkpoints = []
+    edits = []
+    with open(swap, encoding="utf-8", newline="") as f:
+        if f.readline().rstrip("\n") != _SWAP_MAGIC:
+            return checkpoints, edits
+        while True:
+            line = f.readline()
+            if not line.endswith("\n"):
+                break
+            parts = line.split()
+            try:
+                kind, seq, a, b = parts[0], int(parts[1]), int(parts[2]), int(parts[3])
+            except (IndexError, ValueError):
+                break
+            if kind == "C":
+                checkpoints.append((seq, a, b))
+            elif kind == "D":
+                edits.append((kind, seq, a, b))
+            elif kind == "I":
+                text = f.read(b)
+                if len(text) != b or f.read(1) != "\n":
+                    break
+                edits.append((kind, seq, a, text))
+            else:
+                break
+
+    return checkpoints, edits
+
+
+def recover(filename: str) -> Optional[Tuple[TextBuffer, FileFormat]]:
+    """Rebuilds the text of a crashed session from its swap file.
+
+    Args:
+        filename (str): File that was being edited.
+
+    Returns:
+        Tuple[TextBuffer, FileFormat]: The recovered text and the format of
+        the file (see load()), or None if the swap file doesn't fit the file
+        on disk anymore (it was changed by someone else).
+    """
+    checkpoints, edits = _read_journal(swap_name(filename))
+    base = _journal_base(checkpoints, filename)
+    if base is None:
+        return None
+
+    text, fmt = load(filename)
+    for kind, seq, pos, arg in edits:
+        if seq <= base:
+            continue
+        if kind == "I":
+            text.insert(pos, arg)
+        else:
+            text.delete(pos, arg)
+
+    return text, fmt
+
+
+class Autosaver:
+    """Saves snapshots of a buffer from a background thread.
+
+    The editor hands over a snapshot (a list of references to the pieces of
+    the text, cheap to take) and goes on. Only the latest snapshot is kept
+    if the thread is still busy with the previous one.
+    """
+
+    def __init__(self, filename: str, journal: Journal = None, encoding: str = "utf-8",
+                 saved_seq: int = None, newline: str = "\n"):
+        """Starts the thread.
+
+        Args:
+            filename (str): File name.
+            journal (Journal): Journal to checkpoint after every save.
+            encoding (str): File encoding.
+            saved_seq (int): Sequence number of the text on disk (None if unknown).
+            newline (str): Line end of the file (see FileFormat).
+        """
+        self.filename = filename
+        self.journal = journal
+        self.encoding = encoding
+        self.newline = newline
+        self.error = None
+        self.saved_seq = saved_seq
+        self._pending = None
+        self._done = True
+        self._stop = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, snapshot: List[str], seq: int = 0):
+        """Asks for a save. It never blocks.
+
+        Args:
+            snapshot (List[str]): TextBuffer.snapshot().
+            seq (int): Sequence number of the last edit in the snapshot.
+        """
+        with self._cond:
+            self._pending = (snapshot, seq)
+            self._done = False
+            self._cond.notify_all()
+
+    def _run(self):
+        """INTERNAL - Thread body."""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._stop)
+                if self._pending is None:
+                    return
+                snapshot, seq = self._pending
+                self._pending = None
+
+            error = None
+            saved = False
+            try:
+                save(snapshot, self.filename, self.encoding, self.newline)
+                if self.journal is not None:
+                    self.journal.checkpoint(seq)
+                saved = True
+            except Exception as e:  # Kept in error: the thread goes on with the next save.
+                error = e
+            finally:  # Whatever happened, wait() mustn't hang.
+                with self._cond:
+                    self.error = error
+                    if saved:
+                        self.saved_seq = seq
+                    # A request made meanwhile is still to be saved.
+                    self._done = self._pending is None
+                    self._cond.notify_all()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Waits until the requested saves are done.
+
+        Args:
+            timeout (float): Seconds to wait. None waits forever.
+
+        Returns:
+            bool: True if there is nothing left to save.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending is None and self._done, timeout)
+
+    def close(self):
+        """Finishes the pending save and stops the thread."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        self._thread.join()
@@ -47,6 +47,10 @@ INPUT_TYPE_ALPHANUMERIC = 0
 INPUT_TYPE_NUMERIC = 1
 INPUT_TYPE_ALPHABETIC = 2
 INPUT_TYPE_EMAIL = 3
+INPUT_TYPE_TEXT = 4
+INPUT_TYPE_DATE = 5
+INPUT_TYPE_PHONE = 6
+INPUT_TYPE_IP = 7
 
 # ASCI Graphics
 CHAR_LOW_GRAY = "░"
@@ -5,7 +5,10 @@
 # By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
 #
 
+import asyncio
 import curses
+import functools
+import itertools
 import re
 import os
 import string
@@ -15,27 +18,55 @@ from curses import ascii
 from typing import List
 import calendar
 import datetime
+import time
 import modules.constant as const
+import modules.bufferio as bufferio
+import modules.eventloop as eventloop
+import modules.formmodel as formmodel
+import modules.fuzzy as fuzzy
+import modules.instrument as instrument
+import modules.keys as keys
+import modules.menumodel as menumodel
+import modules.rowsource as rowsource
+import modules.screen as screen
+import modules.textbuffer as textbuffer
+import modules.textfile as textfile
+import modules.validators as validators
 
 
 # from var_dump import var_dump
 
 # Color pair constants. Curses doesn't have them =(
-def curses_init(scr: curses.window) -> curses.window:
+def curses_init(scr: curses.window, backend=None) -> curses.window:
     """Initialize curses.
 
     Args:
         scr (curses): Curses screen object.
+        backend (headless.Backend): Virtual screen to run on instead of the
+            terminal, with scripted keys (scr is not used then). None for the
+            terminal.
 
     Returns:
         curses: Curses screen object.
     """
+    if backend is not None:
+        scr = backend.install()
+
+    # Opt-in render stats (see instrument).
+    instrument.enable_from_env()
+    scr = instrument.wrap(scr, is_screen=True)
+
     curses.initscr()
     curses.cbreak()
     curses.noecho()
     curses.curs_set(0)  # make cursor invisible
 
-    scr.keypad(True)
+    # No keypad mode (nor its ESCDELAY): escape sequences are decoded by eventloop (see keys).
+    scr.keypad(False)
+
+    # Pastes come as one keys.PASTE (the virtual screen has no terminal to ask).
+    if backend is None:
+        keys.set_bracketed_paste(True)
 
     # Defining color pairs
     curses.start_color()
@@ -73,17 +104,19 @@ def curses_init(scr: curses.window) -> curses.window:
     scr.clear()
     scr.bkgdset(' ')
     scr.bkgd(curses.color_pair(const.PAIR_SCREEN_BG))
-    scr.refresh()
+    screen.frame_mark(scr)
+    screen.frame_flush(True)
 
     return scr
 
 
 def curses_end():
     """Ends curses environment"""
+    keys.set_bracketed_paste(False)
     curses.endwin()
 
 
-def _popup(s: curses.window, color: curses, title: str, txt: str):
+async def _popup_async(s: curses.window, color: curses, title: str, txt: str):
     mh, mw = s.getmaxyx()
     w = len(txt) + 6
 
@@ -95,11 +128,12 @@ def _popup(s: curses.window, color: curses, title: str, txt: str):
     wy = int((mw - w) / 2)
     wininfo,shadow = init_win(h, w, wx, wy, title, color)
     wininfo.addstr(3, 3, txt)
-    wininfo.getch()
+    screen.frame_mark(wininfo)
+    await eventloop.getch(wininfo)
     end_win(wininfo,shadow)
 
 
-def info_win(s: curses.window, txt: str):
+async def info_win_async(s: curses.window, txt: str):
     """Creates an info window
 
     Args:
@@ -109,10 +143,15 @@ def info_win(s: curses.window, txt: str):
     """
     color = const.PAIR_WINDOW_BG_LOWER
     title = "Info Window"
-    _popup(s, color, title, txt)
+    await _popup_async(s, color, title, txt)
 
 
-def error_win(s: curses.window, txt: str):
+def info_win(s: curses.window, txt: str):
+    """Blocking version of info_win_async()."""
+    return eventloop.run(info_win_async(s, txt))
+
+
+async def error_win_async(s: curses.window, txt: str):
     """Creates an error window
 
     Args:
@@ -122,9 +161,14 @@ def error_win(s: curses.window, txt: str):
     """
     color = const.PAIR_ERROR_WINDOW
     title = "Error Window"
-    _popup(s, color, title, txt)
+    await _popup_async(s, color, title, txt)
 
-def confirm_dialog(s: curses.window, message: string):
+
+def error_win(s: curses.window, txt: str):
+    """Blocking version of error_win_async()."""
+    return eventloop.run(error_win_async(s, txt))
+
+async def confirm_dialog_async(s: curses.window, message: string):
     """Show a confirmation dialog.
 
     Args:
@@ -136,39 +180,262 @@ def confirm_dialog(s: curses.window, message: string):
     """
     height, width = 7, 50
     start_y, start_x = (s.getmaxyx()[0] - height) // 2, (s.getmaxyx()[1] - width) // 2
-    win = curses.newwin(height, width, start_y, start_x)
-    win.box()
+    win, sha = init_win(height, width, start_y, start_x)
     win.addstr(2, 2, message)
     win.addstr(4, 2, "[Y] Sí    [N] No")
-    win.refresh()
+    screen.frame_mark(win)
     while True:
-        key = win.getch()
+        key = await eventloop.getch(win)
         if key in [ord('y'), ord('Y')]:
+            end_win(win, sha)
             return True
         elif key in [ord('n'), ord('N')]:
+            end_win(win, sha)
             return False
 
-def file_selector(s: curses.window, start_path="."):
+
+def confirm_dialog(s: curses.window, message: string):
+    """Blocking version of confirm_dialog_async()."""
+    return eventloop.run(confirm_dialog_async(s, message))
+
+async def file_selector_async(s: curses.window, start_path=".", use_fuzzy: bool = False):
     """Show a file selector dialog.
 
+    Directories are listed in the background (see rowsource.dir_rows()), so
+    even a huge one comes up at once, and listings are cached while the
+    directories don't change. Only the entries on screen are drawn.
+
     Args:
         s (curses.window): Curses screen object.
         start_path (str, optional): Initial path. Defaults to ".".
+        use_fuzzy (bool, optional): True to pick among every file under start_path
+            with fuzzy_finder() instead.
 
     Returns:
-        _type_: Return value
+        str: Path of the chosen file, None if cancelled (ESC).
     """
+    if use_fuzzy:
+        chosen = await fuzzy_finder_async(s, _walk_files(start_path), os.path.abspath(start_path))
+        return os.path.join(start_path, chosen) if chosen is not None else None
+
+    mh, mw = s.getmaxyx()
+    height = max(min(mh - 4, 24), 6)
+    width = max(min(mw - 4, 80), 40)
+    view = height - 4
+    name_width = width - 4 - 8 - 17
+    w, sha = init_win(height, width, (mh - height) // 2, (mw - width) // 2)
+    w.addstr(1, 2, f"{'Name':<{name_width}} {'Size':>7} Modified", curses.A_BOLD)
+
     current_path = os.path.abspath(start_path)
-    while True:
-        files = os.listdir(current_path)
-        files.insert(0, "..")  # Para navegar al directorio padre
-        selected = vertical_menu(s, files, 0, 0)
-        chosen = files[selected]
-        new_path = os.path.join(current_path, chosen)
-        if os.path.isdir(new_path):
-            current_path = os.path.abspath(new_path)
-        else:
-            return new_path
+    came_from = None  # Directory left with "..", selected in the parent.
+    source = None
+    try:
+        while True:
+            try:
+                source = rowsource.dir_rows(current_path)
+            except OSError as e:
+                await error_win_async(s, str(e))
+                if source is None:
+                    return None
+                current_path = source.path  # Stay where we were.
+                continue
+
+            w.hline(0, 1, curses.ACS_HLINE, width - 2)
+            title = current_path if len(current_path) <= width - 8 else "..." + current_path[-(width - 11):]
+            w.addstr(0, (width - len(title) - 4) // 2, f"[ {title} ]", curses.A_REVERSE)
+
+            selected = source.find(came_from) + 1 if came_from else 0
+            top = max(0, selected - view // 2)
+            name = came_from
+            version = source.version
+            drawn = [False] * view  # (row, selected, text) on screen, None if blank
+            status = None
+            chosen = None
+            while chosen is None:
+                count = source.row_count() + 1  # Row 0 is ".."
+                if version != source.version:  # Sorted: keep the selected entry.
+                    if selected > 0:
+                        selected = source.find(name) + 1
+                        top = max(0, selected - view // 2)
+                    drawn = [False] * view
+                    version = source.version
+
+                top = min(max(top, selected - view + 1), selected)
+                page = source.rows(max(top - 1, 0), view)
+                if top == 0:
+                    page.insert(0, ("..", "", ""))
+                for i in range(view):
+                    if i < len(page):
+                        text = f"{page[i][0][:name_width]:<{name_width}} {page[i][1]:>7} {page[i][2]:<16}"
+                        line = (top + i, top + i == selected, text)
+                    else:
+                        line = None
+                    if line != drawn[i]:
+                        attr = curses.A_REVERSE if line is not None and line[1] else curses.A_NORMAL
+                        w.addstr(2 + i, 2, line[2] if line is not None else " " * (width - 4), attr)
+                        drawn[i] = line
+
+                info = f"{count - 1} entradas" + (" ..." if source.running else "")
+                if info != status:
+                    w.addstr(height - 2, 2, info.ljust(width - 4), curses.color_pair(const.PAIR_WINDOW_HELPER))
+                    status = info
+                screen.frame_mark(w)
+
+                key = await eventloop.getch(w, 0.1 if source.running else None)
+                if key == curses.KEY_UP:
+                    selected = max(selected - 1, 0)
+                elif key == curses.KEY_DOWN:
+                    selected = min(selected + 1, count - 1)
+                elif key == curses.KEY_PPAGE:
+                    selected = max(selected - view, 0)
+                    top = max(top - view, 0)
+                elif key == curses.KEY_NPAGE:
+                    selected = min(selected + view, count - 1)
+                    top = min(top + view, max(count - view, 0))
+                elif key == curses.KEY_HOME:
+                    selected = 0
+                elif key == curses.KEY_END:
+                    selected = count - 1
+                elif key in (curses.KEY_BACKSPACE, 127, 8):
+                    chosen = ("..", True)
+                elif key in (10, 13, curses.KEY_ENTER):
+                    chosen = ("..", True) if selected == 0 else source.entry(selected - 1)
+                elif key == ascii.ESC:
+                    return None
+                if 0 < selected < count:
+                    name = source.entry(selected - 1)[0]
+
+            name, is_dir = chosen
+            new_path = os.path.join(current_path, name)
+            if is_dir:
+                came_from = os.path.basename(current_path) if name == ".." else None
+                current_path = os.path.abspath(new_path)
+            else:
+                return new_path
+    finally:
+        end_win(w, sha)
+
+
+def file_selector(s: curses.window, start_path=".", use_fuzzy: bool = False):
+    """Blocking version of file_selector_async()."""
+    return eventloop.run(file_selector_async(s, start_path, use_fuzzy))
+
+
+def _walk_files(path: str):
+    """INTERNAL - Paths of the files under a directory, relative to it."""
+    for root, _, files in os.walk(path):
+        rel = os.path.relpath(root, path)
+        for name in files:
+            yield name if rel == "." else os.path.join(rel, name)
+
+
+async def fuzzy_finder_async(s: curses.window, candidates, title: str = "Buscar", key=str):
+    """Fuzzy finder (fzf style): narrows the candidates as the pattern is typed.
+
+    The candidates can be any iterable, even a slow generator (i.e. the
+    files of a walk, or the rows of a query): they're matched in the
+    background as they arrive (see fuzzy.Matcher), best matches first, and
+    the list on screen is updated while the matches stream in.
+
+    Args:
+        s (curses.window): Curses screen object.
+        candidates (Iterable): Candidates.
+        title (str, optional): Title of the window.
+        key (Callable, optional): Text of a candidate. Defaults to str.
+
+    Returns:
+        The chosen candidate, None if cancelled (ESC).
+    """
+    mh, mw = s.getmaxyx()
+    height = max(min(mh - 4, 24), 6)
+    width = max(min(mw - 4, 80), 30)
+    view = height - 4
+    text_width = width - 4
+    if len(title) > width - 8:
+        title = "..." + title[-(width - 11):]
+    w, sha = init_win(height, width, (mh - height) // 2, (mw - width) // 2, title)
+
+    pattern = ""
+    selected, top = 0, 0
+    drawn = [False] * view  # (index, selected, pattern) on screen, None if blank
+    status = None
+    with fuzzy.Matcher(candidates, key) as matcher:
+        try:
+            while True:
+                count = matcher.match_count()
+                selected = min(selected, max(count - 1, 0))
+                top = min(max(top, selected - view + 1), selected)
+                ids = matcher.results(top, view)
+                for i in range(view):
+                    line = (ids[i], top + i == selected, pattern) if i < len(ids) else None
+                    if line != drawn[i]:
+                        _fuzzy_finder_draw(w, 3 + i, text_width, matcher, line)
+                        drawn[i] = line
+
+                info = f"{count}/{len(matcher.texts)}" + (" ..." if matcher.running else "")
+                if (pattern, info) != status:
+                    w.addstr(1, 2, ("> " + pattern)[-text_width:].ljust(text_width))
+                    w.addstr(2, 2, info.rjust(text_width), curses.color_pair(const.PAIR_WINDOW_HELPER))
+                    status = (pattern, info)
+                w.move(1, 2 + min(len(pattern) + 2, text_width - 1))
+                screen.frame_mark(w)
+
+                key_pressed = await eventloop.getch(w, 0.1 if matcher.running else None)
+                if key_pressed == curses.KEY_UP:
+                    selected = max(selected - 1, 0)
+                elif key_pressed == curses.KEY_DOWN:
+                    selected = min(selected + 1, max(count - 1, 0))
+                elif key_pressed == curses.KEY_PPAGE:
+                    selected = max(selected - view, 0)
+                elif key_pressed == curses.KEY_NPAGE:
+                    selected = min(selected + view, max(count - 1, 0))
+                elif key_pressed in (10, 13, curses.KEY_ENTER):
+                    ids = matcher.results(selected, 1)
+                    if ids:
+                        return matcher.items[ids[0]]
+                elif key_pressed == ascii.ESC:
+                    return None
+                elif key_pressed in (curses.KEY_BACKSPACE, 127, 8):
+                    if pattern:
+                        pattern = pattern[:-1]
+                        matcher.search(pattern)
+                        selected, top = 0, 0
+                elif 32 <= key_pressed < 127:
+                    pattern += chr(key_pressed)
+                    matcher.search(pattern)
+                    selected, top = 0, 0
+        finally:
+            end_win(w, sha)
+
+
+def fuzzy_finder(s: curses.window, candidates, title: str = "Buscar", key=str):
+    """Blocking version of fuzzy_finder_async()."""
+    return eventloop.run(fuzzy_finder_async(s, candidates, title, key))
+
+
+def _fuzzy_finder_draw(w: curses.window, y: int, width: int, matcher, line: tuple):
+    """INTERNAL - Draws a match, with the matched chars highlighted.
+
+    Args:
+        w (curses.window): Window of the finder.
+        y (int): Window row.
+        width (int): Text width.
+        matcher (fuzzy.Matcher): Matcher.
+        line (tuple): (index of the candidate, selected, pattern), None for a blank row.
+    """
+    if line is None:
+        w.addstr(y, 2, " " * width)
+        return
+    index, is_selected, _ = line
+    text = matcher.texts[index].translate(_TABLE_BLANKS)[:width]
+    if is_selected:
+        attr, hot = curses.color_pair(const.PAIR_ITEM_SELECTED), curses.color_pair(const.PAIR_HOTKEY_SELECTED)
+    else:
+        attr, hot = curses.A_NORMAL, curses.color_pair(const.PAIR_HOTKEY_UNSELECTED)
+    w.addstr(y, 2, text.ljust(width), attr)
+    for pos in matcher.positions(index):
+        if pos < width:
+            w.addstr(y, 2 + pos, text[pos], hot | curses.A_BOLD)
 
 def progress_bar_create(s:curses.window, max_value: int, title: str = "Progress") -> curses.window:
     """
@@ -197,7 +464,8 @@ def progress_bar_create(s:curses.window, max_value: int, title: str = "Progress"
     bar_width = w - 4
     win.addstr(2, 2, f"{' ' * bar_width}", curses.color_pair(const.PAIR_PROGRESS_BAR) | curses.A_BOLD | curses.A_REVERSE)
     #win.addstr(4, col, progress_label, curses.color_pair(const.PAIR_WINDOW_BG_LOWER))
-    win.refresh()
+    screen.frame_mark(win)
+    screen.frame_flush()
 
     return win,sha
 
@@ -218,7 +486,8 @@ def progress_bar_update(s: curses.window, current_value: int, max_value: int) ->
     progress_label = f"{int((current_value/max_value) * 100)}%"
     col = 2 + int((width - len(progress_label)) / 2)
     s.addstr(4, col, progress_label)
-    s.refresh()
+    screen.frame_mark(s)
+    screen.frame_flush()
 
 def progress_bar_close(w: curses.window, s:curses.window) -> None:
     """
@@ -229,7 +498,7 @@ def progress_bar_close(w: curses.window, s:curses.window) -> None:
     """
     end_win(w, s)
 
-def input_box(s: curses.window, label: str,
+async def input_box_async(s: curses.window, label: str,
               length: int, help="", type: int = 0, hidden: bool = False) -> str:
     """
     Provides a simple input box.
@@ -243,6 +512,12 @@ def input_box(s: curses.window, label: str,
             0 - INPUT_TYPE_ALPHANUMERIC
             1 - INPUT_TYPE_NUMERIC
             2 - INPUT_TYPE_ALPHABETIC
+            3 - INPUT_TYPE_EMAIL
+            4 - INPUT_TYPE_TEXT (any printable char)
+            5 - INPUT_TYPE_DATE (dd/mm/yyyy mask)
+            6 - INPUT_TYPE_PHONE
+            7 - INPUT_TYPE_IP
+            or a type added with validators.register().
         hidden (bool): True means to hide the chars.
 
     Returns:
@@ -258,14 +533,20 @@ def input_box(s: curses.window, label: str,
 
     win_input, sha_input = init_win(h, w, wx, wy, "Input Box")
 
-    value = simple_input_text_field(s, win_input, 3, 3, label, length, help, type, hidden)
+    value = await simple_input_text_field_async(s, win_input, 3, 3, label, length, help, type, hidden)
 
     end_win(win_input, sha_input)
 
     return value
 
 
-def simple_input_text_field(s: curses.window, w: curses.window, x: int, y: int, label: str,
+def input_box(s: curses.window, label: str,
+              length: int, help="", type: int = 0, hidden: bool = False) -> str:
+    """Blocking version of input_box_async()."""
+    return eventloop.run(input_box_async(s, label, length, help, type, hidden))
+
+
+async def simple_input_text_field_async(s: curses.window, w: curses.window, x: int, y: int, label: str,
                             length: int, help="", type: int = 0, hidden: bool = False) -> str:
     """
     Creates a text field input.
@@ -278,12 +559,21 @@ def simple_input_text_field(s: curses.window, w: curses.window, x: int, y: int,
         label (str): Field label.
         length (int): Length of the input field.
         help (str): Help text.
-        type (int): Field type (0-Alphanumeric, 1-Numeric, 2-Alphabetic).
+        type (int): Field type (const.INPUT_TYPE_*, a type added with validators.register(), or a
+            validators.Validator). A mask (i.e. INPUT_TYPE_DATE) sets the length.
         hidden (bool): True if the input should be hidden.
 
     Returns:
         str: The value of the input.
+
+    Raises:
+        ValueError: Unknown field type.
     """
+    validator = validators.get(type)
+    if validator is None:
+        raise ValueError(f"Unknown input type: {type!r}")
+    length = validator.length or length
+
     value = ""
     status_bar(s, help)
 
@@ -301,27 +591,27 @@ def simple_input_text_field(s: curses.window, w: curses.window, x: int, y: int,
     cursor_offset = 0
     while True:
         w.move(field_x, field_y + cursor_offset)
-        w.refresh()
-        key = w.getch()
+        screen.frame_mark(w)
+        key = await eventloop.getch(w)
 
-        if key in (curses.ascii.NL, curses.ascii.ESC):  # Enter or ESC
+        if key == curses.ascii.ESC:
             break
-        elif key == curses.ascii.DEL or key == 127:  # Backspace
-            if cursor_offset > 0:
-                cursor_offset -= 1
-                value = value[:cursor_offset] + value[cursor_offset + 1:]
-                w.addstr(field_x, field_y + cursor_offset, ' ')
+        elif key in (curses.ascii.NL, curses.KEY_ENTER):  # Enter: only a valid value goes
+            if validator.validate(value):
+                break
+            status_bar(s, validator.message)
+        elif key in (curses.ascii.DEL, curses.ascii.BS, curses.KEY_BACKSPACE):  # Backspace
+            value, cursor_offset = validator.delete(value, cursor_offset)
         elif key == curses.KEY_LEFT:  # Move cursor left
             if cursor_offset > 0:
                 cursor_offset -= 1
         elif key == curses.KEY_RIGHT:  # Move cursor right
             if cursor_offset < len(value):
                 cursor_offset += 1
-        elif len(value) < length and valid_input(key, type):
-            # Insert character
-            char = chr(key)
-            value = value[:cursor_offset] + char + value[cursor_offset:]
-            cursor_offset += 1
+        elif key == keys.PASTE:  # The whole paste at once, as much as fits
+            value, cursor_offset = validator.insert(value, cursor_offset, eventloop.pasted, length)
+        elif validator.accepts(key):
+            value, cursor_offset = validator.insert(value, cursor_offset, chr(key), length)
 
         # Redraw the input field
         display_value = ''.join(['*' if hidden else c for c in value])
@@ -335,28 +625,50 @@ def simple_input_text_field(s: curses.window, w: curses.window, x: int, y: int,
     return value
 
 
+def simple_input_text_field(s: curses.window, w: curses.window, x: int, y: int, label: str,
+                            length: int, help="", type: int = 0, hidden: bool = False) -> str:
+    """Blocking version of simple_input_text_field_async()."""
+    return eventloop.run(simple_input_text_field_async(s, w, x, y, label, length, help, type, hidden))
+
+
 def valid_input(key: int, input_type: int) -> bool:
     """
     Validates the input based on type.
 
     Args:
         key (int): The key pressed.
-        input_type (int): The input type (0-Alphanumeric, 1-Numeric, 2-Alphabetic).
+        input_type (int): The input type (const.INPUT_TYPE_*, see validators).
 
     Returns:
         bool: True if the key is valid, False otherwise.
     """
-    char = chr(key)
-    if input_type == 0:  # Alphanumeric
-        return char.isalnum() or char.isspace()
-    elif input_type == 1:  # Numeric
-        return char.isdigit()
-    elif input_type == 2:  # Alphabetic
-        return char.isalpha()
-    return False
+    try:
+        return key in _valid_codes[input_type]
+    except KeyError:  # A Validator given as it is, or an unknown type.
+        validator = validators.get(input_type)
+        return validator is not None and validator.accepts(key)
+
+
+# The same dict as validators.CODES (register() updates it), one lookup away.
+_valid_codes = validators.CODES
+
+
+def valid_text(text: str, input_type: int) -> str:
+    """
+    Validates a whole text (i.e. a paste) based on type, in one pass.
+
+    Args:
+        text (str): The text.
+        input_type (int): The input type (see valid_input()).
+
+    Returns:
+        str: The text without the chars valid_input() would reject.
+    """
+    validator = validators.get(input_type)
+    return validator.filter(text) if validator is not None else ""
 
         
-def multi_select_menu(s: curses.window, options:List[str], title="Selecciona opciones:"):
+async def multi_select_menu_async(s: curses.window, options:List[str], title="Selecciona opciones:"):
     """Show a multi select menu dialog.
 
     Args:
@@ -380,9 +692,9 @@ def multi_select_menu(s: curses.window, options:List[str], title="Selecciona opc
             else:
                 s.addstr(i + 1, 0, f"{marker} {option}")
         s.addstr(len(options) + 2, 0, "Presiona Espacio para seleccionar, Enter para confirmar.")
-        s.refresh()
+        screen.frame_mark(s)
 
-        key = s.getch()
+        key = await eventloop.getch(s)
         if key == curses.KEY_UP:
             current_index = (current_index - 1) % len(options)
         elif key == curses.KEY_DOWN:
@@ -392,7 +704,12 @@ def multi_select_menu(s: curses.window, options:List[str], title="Selecciona opc
         elif key == 10:  # Enter para confirmar
             return [options[i] for i, sel in enumerate(selected) if sel]
 
-def calendar_widget(s: curses.window):
+
+def multi_select_menu(s: curses.window, options:List[str], title="Selecciona opciones:"):
+    """Blocking version of multi_select_menu_async()."""
+    return eventloop.run(multi_select_menu_async(s, options, title))
+
+async def calendar_widget_async(s: curses.window):
     """Show a calendar widget.
 
     Args:
@@ -409,14 +726,19 @@ def calendar_widget(s: curses.window):
         s.clear()
         display_calendar(s, current_year, current_month, selected_day)
         s.addstr(10, 0, "Usa las flechas para moverte, Enter para seleccionar.")
-        s.refresh()
+        screen.frame_mark(s)
 
-        key = s.getch()
+        key = await eventloop.getch(s)
         selected_day = update_selected_day(key, current_year, current_month, selected_day)
         if key == 10:  # Enter
             return datetime.date(current_year, current_month, selected_day)
 
 
+def calendar_widget(s: curses.window):
+    """Blocking version of calendar_widget_async()."""
+    return eventloop.run(calendar_widget_async(s))
+
+
 def display_calendar(s: curses.window, year: int, month: int, selected_day: int):
     """Display the calendar on the screen.
 
@@ -461,7 +783,7 @@ def update_selected_day(key: int, year: int, month: int, selected_day: int) -> i
         return min(calendar.monthrange(year, month)[1], selected_day + 7)
     return selected_day
 
-def bar_chart(stdscr, data):
+async def bar_chart_async(stdscr, data):
     """
     Displays a horizontal bar chart with labeled columns.
 
@@ -502,41 +824,222 @@ def bar_chart(stdscr, data):
         # Add label below the bar
         stdscr.addstr(max_height, 3 + i * 4, f"{label}", curses.A_BOLD)
 
-    stdscr.refresh()
-    stdscr.getch()
+    screen.frame_mark(stdscr)
+    await eventloop.getch(stdscr)
+
+
+def bar_chart(stdscr, data):
+    """Blocking version of bar_chart_async()."""
+    return eventloop.run(bar_chart_async(stdscr, data))
         
-def table_viewer(s: curses.window, data, col_width=15):
+def _table_viewer_cells(row, left: int, widths: List[int]) -> tuple:
+    """INTERNAL - Formats the visible cells of a row."""
+    return tuple(str(row[c] if c < len(row) else "")[:w - 1].translate(_TABLE_BLANKS).ljust(w)
+                 for c, w in enumerate(widths, left))
+
+
+_TABLE_BLANKS = str.maketrans('\n\r\t', '   ')
+
+
+def _table_viewer_draw(s: curses.window, y: int, old: tuple, cells: tuple, xs: List[int]):
+    """INTERNAL - Draws a row of the table, only the cells that changed.
+
+    Args:
+        s (curses.window): Curses screen object.
+        y (int): Screen row.
+        old (tuple): Cells on screen, in the same columns. Empty to draw them all.
+        cells (tuple): Cells to be shown.
+        xs (List[int]): Screen column of every cell.
+    """
+    for c, cell in enumerate(cells):
+        if c >= len(old) or old[c] != cell:
+            s.addstr(y, xs[c], cell)
+    if not old or len(cells) < len(old):
+        s.move(y, xs[len(cells)])
+        s.clrtoeol()
+
+
+async def table_viewer_async(s: curses.window, data, col_width=15):
     """Show a table viewer.
 
+    The data can be a list of lists or a rowsource.RowSource (i.e. a
+    rowsource.SqliteRows or a rowsource.CsvRows), which is asked only for
+    the rows on screen. Scrolling redraws only the rows and cells that
+    changed. Rows that are still arriving (i.e. a CSV file being indexed)
+    can be browsed, and the progress is shown in the status line.
+
+    A list (or a rowsource.ColumnarRows) can be sorted by the first column
+    on screen with S (again for descending order), and filtered with F
+    (see rowsource.ColumnarRows for the filters). Sorting runs in the
+    background, and the table can be browsed meanwhile. A list is shown as
+    it is, and only copied column by column the first time S or F is pressed.
+
     Args:
         s (curses.window): Curses screen object.
-        data (_type_): Data list.
-        col_width (int, optional): Column width. Defaults to 15.
+        data (list | rowsource.RowSource): Data list, or a row source.
+        col_width (int, optional): Column width, if the source doesn't size
+            the columns. Defaults to 15.
     """
-    rows, cols = len(data), len(data[0])
+    is_list = not isinstance(data, rowsource.RowSource)
+    source = rowsource.ListRows(data) if is_list else data
+    sortable = source.sortable or is_list
+    cols = source.column_count()
+    all_widths = source.column_widths() or [col_width] * cols
+    header = source.columns()
+    first = 1 if header else 0
     top, left = 0, 0
 
-    while True:
-        s.clear()
-        for r in range(min(rows - top, s.getmaxyx()[0] - 2)):
-            for c in range(min(cols - left, s.getmaxyx()[1] // col_width)):
-                s.addstr(r, c * col_width, f"{data[top + r][left + c]:<{col_width}}")
-        s.addstr(s.getmaxyx()[0] - 1, 0, "Usa las flechas para moverte, Q para salir.")
-        s.refresh()
+    # What's on screen: (row index, left, cells) for every row of the table,
+    # None if blank, False if unknown.
+    drawn = []
+    shown = None  # (top, left, height, width) of the last frame
+    status = None
+    version = source.version
 
-        key = s.getch()
+    s.idlok(True)
+    while True:
+        rows = source.row_count()
+        height, width = s.getmaxyx()
+        view = max(height - 2 - first, 0)
+
+        # Columns that fit on screen, from left.
+        xs = [0]
+        for w in all_widths[left:]:
+            if xs[-1] + w > width:
+                break
+            xs.append(xs[-1] + w)
+        widths = all_widths[left:left + len(xs) - 1]
+
+        if shown is None or shown[2:] != (height, width):
+            s.erase()
+            drawn = [None] * view
+            status = None
+        elif version != source.version:  # Sorted or filtered: every row is stale.
+            drawn = [False] * view
+            top = min(top, max(rows - 1, 0))
+        elif shown[1] == left and 0 < abs(top - shown[0]) < view:
+            # Same columns: the terminal scrolls, and only the new rows are drawn.
+            delta = top - shown[0]
+            s.setscrreg(first, first + view - 1)
+            s.scrollok(True)
+            s.scroll(delta)
+            s.scrollok(False)
+            s.setscrreg(0, height - 1)
+            if delta > 0:
+                drawn = drawn[delta:] + [None] * delta
+            else:
+                drawn = [None] * -delta + drawn[:delta]
+
+        if header and (shown is None or shown[1:] != (left, height, width)
+                       or version != source.version):
+            names = list(header)
+            if source.sortable and source.sorted_by is not None:
+                column, descending = source.sorted_by
+                names[column] = f"{names[column]}{'v' if descending else '^'}"
+            s.move(0, 0)
+            s.clrtoeol()
+            s.addstr(0, 0, ''.join(_table_viewer_cells(names, left, widths)), curses.A_REVERSE)
+        version = source.version
+
+        page = source.rows(top, view)
+        for i in range(view):
+            y = first + i
+            if i < len(page):
+                if drawn[i] and drawn[i][:2] == (top + i, left):
+                    continue
+                cells = _table_viewer_cells(page[i], left, widths)
+                old = drawn[i][2] if drawn[i] and drawn[i][1] == left else ()
+                _table_viewer_draw(s, y, old, cells, xs)
+                drawn[i] = (top + i, left, cells)
+            elif drawn[i] is not None:
+                s.move(y, 0)
+                s.clrtoeol()
+                drawn[i] = None
+
+        position = f"{min(top + 1, rows)}/{rows}"
+        if source.running:
+            position += f" ({int(source.progress() * 100)}%)"
+        if position != status:
+            if sortable:
+                help_text = "Flechas: moverse, S: ordenar, F: filtrar, Q: salir."
+            else:
+                help_text = "Usa las flechas para moverte, Q para salir."
+            s.move(height - 1, 0)
+            s.clrtoeol()
+            s.addstr(height - 1, 0, help_text[:max(width - len(position) - 2, 0)])
+            s.addstr(height - 1, max(width - len(position) - 1, 0), position[:width - 1])
+            status = position
+        shown = (top, left, height, width)
+        screen.frame_mark(s)
+
+        # While rows are arriving, wake up to show them.
+        key = await eventloop.getch(s, 0.1 if source.running else None)
+        # A held down key: its auto repeats go in one jump (and one frame).
+        steps = 1 + eventloop.repeats(s, key) if key in keys.SCROLL else 1
         if key == curses.KEY_UP and top > 0:
-            top -= 1
+            top = max(0, top - steps)
         elif key == curses.KEY_DOWN and top < rows - 1:
-            top += 1
+            top = min(rows - 1, top + steps)
+        elif key == curses.KEY_PPAGE:
+            top = max(0, top - view * steps)
+        elif key == curses.KEY_NPAGE:
+            top = max(0, min(rows - 1, top + view * steps))
+        elif key == curses.KEY_HOME:
+            top = 0
+        elif key == curses.KEY_END:
+            top = max(0, rows - view)
         elif key == curses.KEY_LEFT and left > 0:
-            left -= 1
+            left = max(0, left - steps)
         elif key == curses.KEY_RIGHT and left < cols - 1:
-            left += 1
+            left = min(cols - 1, left + steps)
+        elif key in [ord('s'), ord('S')] and sortable:
+            if not source.sortable:
+                source = rowsource.ColumnarRows(data)
+            source.sort(left, source.sorted_by == (left, False))
+        elif key in [ord('f'), ord('F')] and sortable:
+            expression = await input_box_async(s, "Filtro", 30, "col op valor [and ...], op: = < > ~",
+                                               const.INPUT_TYPE_TEXT)
+            if not source.sortable:
+                source = rowsource.ColumnarRows(data)
+            try:
+                source.filter(expression)
+                top = 0
+            except ValueError as e:
+                await error_win_async(s, str(e))
+            status = None
+        elif key == curses.KEY_RESIZE:  # Everything is laid out and drawn again.
+            shown = None
         elif key in [ord('q'), ord('Q')]:
             break
 
-def show_notification(s: curses.window, message:string, duration=2):
+
+def table_viewer(s: curses.window, data, col_width=15):
+    """Blocking version of table_viewer_async()."""
+    return eventloop.run(table_viewer_async(s, data, col_width))
+
+
+async def table_file_viewer_async(s: curses.window, filename: str, delimiter: str = None, header: bool = True):
+    """Table viewer over a CSV (or TSV) file of any size.
+
+    The file is memory mapped and indexed in the background, so the first
+    rows come up at once no matter the size of the file.
+
+    Args:
+        s (curses.window): Curses screen object.
+        filename (str): CSV file.
+        delimiter (str, optional): Field delimiter. None guesses it from the extension.
+        header (bool, optional): True if the first row holds the column names.
+    """
+    with rowsource.CsvRows(filename, delimiter, header) as source:
+        await table_viewer_async(s, source)
+
+
+def table_file_viewer(s: curses.window, filename: str, delimiter: str = None, header: bool = True):
+    """Blocking version of table_file_viewer_async()."""
+    return eventloop.run(table_file_viewer_async(s, filename, delimiter, header))
+
+
+async def show_notification_async(s: curses.window, message:string, duration=2):
     """Show a notification.
 
     Args:
@@ -546,65 +1049,220 @@ def show_notification(s: curses.window, message:string, duration=2):
     """
     height, width = 3, len(message) + 4
     start_y, start_x = (s.getmaxyx()[0] - height) // 2, (s.getmaxyx()[1] - width) // 2
-    win = curses.newwin(height, width, start_y, start_x)
-    win.box()
+    win, sha = init_win(height, width, start_y, start_x)
     win.addstr(1, 2, message)
-    win.refresh()
-    curses.napms(duration * 1000)
-    win.clear()
+    screen.frame_mark(win)
+    screen.frame_flush(True)
+    await asyncio.sleep(duration)
+    end_win(win, sha)
+    screen.frame_flush(True)
+
+
+def show_notification(s: curses.window, message:string, duration=2):
+    """Blocking version of show_notification_async()."""
+    return eventloop.run(show_notification_async(s, message, duration))
+
+
+def _editor_draw_line(s: curses.window, row: int, line: str, left: int, cols: int):
+    """INTERNAL - Draws a line of the editor.
+
+    Args:
+        s (curses.window): Curses screen object.
+        row (int): Screen row.
+        line (str): Text of the line.
+        left (int): First column shown (horizontal scroll).
+        cols (int): Screen width.
+    """
+    s.addstr(row, 0, line[left:left + cols - 1])
+    s.clrtoeol()
+
+
+def _editor_insert(text: textbuffer.TextBuffer, journal, pos: int, chars: str):
+    """INTERNAL - Inserts text in the editor buffer, and records it in the swap journal."""
+    text.insert(pos, chars)
+    if journal is not None:
+        journal.insert(pos, chars)
+
+
+def _editor_delete(text: textbuffer.TextBuffer, journal, pos: int, length: int = 1):
+    """INTERNAL - Deletes text from the editor buffer, and records it in the swap journal."""
+    text.delete(pos, length)
+    if journal is not None:
+        journal.delete(pos, length)
 
 
-def simple_text_editor(s: curses.window, filename="untitled.txt"):
+def _editor_paste_text(pasted: str) -> str:
+    """INTERNAL - Text of a paste as the editor takes it (newline line ends, tabs expanded, no control chars)."""
+    chars = pasted.replace("\r\n", "\n").replace("\r", "\n").expandtabs(4)
+    if all(line.isprintable() for line in chars.split("\n")):
+        return chars
+    return "".join(c for c in chars if c == "\n" or c.isprintable())
+
+
+async def simple_text_editor_async(s: curses.window, filename="untitled.txt", autosave: int = 0, swap: bool = True):
     """Simple text editor.
 
+    The text lives in a textbuffer.TextBuffer. Only the lines on screen are
+    drawn, and typing redraws just the line being edited.
+
+    The file is read in chunks, and saved (with its own line ends) to a temp
+    file that then replaces it, so a crash while saving doesn't break it.
+    Saves run in a background thread. A file that can't be saved back as it
+    was (invalid chars, mixed line ends) is never autosaved, and F2 asks
+    first. Every edit goes to a swap journal (.filename.swp), and if one is
+    found when opening the file, the crashed session can be replayed.
+
     Args:
         s (curses.window): Curses screen object.
         filename (str, optional): File name. Defaults to "untitled.txt".
+        autosave (int, optional): Seconds between autosaves. 0 (default) turns it off.
+        swap (bool, optional): False to go without the swap journal.
     """
+    loaded = None
+    if swap and os.path.exists(bufferio.swap_name(filename)):
+        if await confirm_dialog_async(s, "Recover the unsaved changes?"):
+            loaded = bufferio.recover(filename)
+            if loaded is None:
+                await error_win_async(s, "The file changed since. Swap file ignored.")
+
+    recovered = loaded is not None
+    text, fmt = loaded if recovered else bufferio.load(filename)
+
+    journal = bufferio.Journal(filename, recovered) if swap else None
+    seq = journal.seq if journal is not None else 0
+    saver = bufferio.Autosaver(filename, journal, saved_seq=None if recovered else seq,
+                               newline=fmt.newline)
+    last_save = time.monotonic()
+
     curses.curs_set(1)
-    text = []
     cursor_y, cursor_x = 0, 0
+    top, left = 0, 0
+
+    title = f"Archivo: {filename}  |  F2: Guardar  |  F10: Salir"
+    s.erase()
+    redraw = True
+    dirty = False
 
     while True:
-        s.clear()
-        s.addstr(0, 0, f"Archivo: {filename}  |  F2: Guardar  |  F10: Salir", curses.A_REVERSE)
-        for i, line in enumerate(text):
-            s.addstr(i + 1, 0, line)
-        s.move(cursor_y + 1, cursor_x)
-        s.refresh()
+        height, width = s.getmaxyx()
+        rows = height - 1
+
+        # Scroll to keep the cursor on screen.
+        if cursor_y < top:
+            top, redraw = cursor_y, True
+        elif cursor_y >= top + rows:
+            top, redraw = cursor_y - rows + 1, True
+        if cursor_x < left:
+            left, redraw = cursor_x, True
+        elif cursor_x >= left + width - 1:
+            left, redraw = cursor_x - width + 2, True
+
+        if redraw:
+            s.addstr(0, 0, title[:width - 1], curses.A_REVERSE)
+            s.clrtoeol()
+            visible = text.lines(top, rows)
+            for i in range(rows):
+                _editor_draw_line(s, i + 1, visible[i] if i < len(visible) else "", left, width)
+        elif dirty:
+            _editor_draw_line(s, cursor_y - top + 1, text.line(cursor_y), left, width)
+        redraw = dirty = False
+
+        s.move(cursor_y - top + 1, cursor_x - left)
+        screen.frame_mark(s)
+
+        # Autosave: wake up when it's due. Not while saving would change what
+        # the load couldn't keep: that's only on the user's say (F2).
+        wait = None
+        if autosave and not fmt.lossy and saver.saved_seq != seq:
+            due = last_save + autosave - time.monotonic()
+            if due <= 0:
+                saver.request(text.snapshot(), seq)
+                last_save = time.monotonic()
+            else:
+                wait = due
 
-        key = s.getch()
+        key = await eventloop.getch(s, wait)
         if key in [curses.KEY_F10]:  # Salir
-            break
+            await asyncio.to_thread(saver.wait)
+            if saver.saved_seq == seq or await confirm_dialog_async(s, "Exit without saving?"):
+                break
+            redraw = True
         elif key in [curses.KEY_F2]:  # Guardar
-            with open(filename, 'w') as file:
-                file.write('\n'.join(text))
+            if fmt.lossy:
+                redraw = True
+                if not await confirm_dialog_async(s, "Invalid chars/line ends will change. Save?"):
+                    continue
+                fmt.lossy = False
+            saver.request(text.snapshot(), seq)
+            last_save = time.monotonic()
+            await asyncio.to_thread(saver.wait)
+            if saver.error is not None:
+                await error_win_async(s, f"Error saving {filename}: {saver.error}")
+                redraw = True
         elif key in [curses.KEY_BACKSPACE, 127]:
             if cursor_x > 0:
-                text[cursor_y] = text[cursor_y][:cursor_x - 1] + text[cursor_y][cursor_x:]
+                _editor_delete(text, journal, text.offset(cursor_y, cursor_x) - 1)
+                seq += 1
                 cursor_x -= 1
+                dirty = True
             elif cursor_y > 0:
-                cursor_x = len(text[cursor_y - 1])
-                text[cursor_y - 1] += text.pop(cursor_y)
+                cursor_x = text.line_length(cursor_y - 1)
+                _editor_delete(text, journal, text.offset(cursor_y) - 1)
+                seq += 1
                 cursor_y -= 1
+                redraw = True
         elif key == curses.KEY_DOWN:
-            cursor_y = min(cursor_y + 1, len(text) - 1)
+            cursor_y = min(cursor_y + 1, text.line_count() - 1)
+            cursor_x = min(cursor_x, text.line_length(cursor_y))
         elif key == curses.KEY_UP:
             cursor_y = max(0, cursor_y - 1)
+            cursor_x = min(cursor_x, text.line_length(cursor_y))
+        elif key == curses.KEY_NPAGE:
+            cursor_y = min(cursor_y + rows, text.line_count() - 1)
+            cursor_x = min(cursor_x, text.line_length(cursor_y))
+        elif key == curses.KEY_PPAGE:
+            cursor_y = max(0, cursor_y - rows)
+            cursor_x = min(cursor_x, text.line_length(cursor_y))
         elif key == curses.KEY_LEFT:
             cursor_x = max(0, cursor_x - 1)
         elif key == curses.KEY_RIGHT:
-            cursor_x = min(len(text[cursor_y]), cursor_x + 1)
+            cursor_x = min(text.line_length(cursor_y), cursor_x + 1)
+        elif key == curses.KEY_HOME:
+            cursor_x = 0
+        elif key == curses.KEY_END:
+            cursor_x = text.line_length(cursor_y)
         elif key in [10, 13]:  # Enter
-            text.insert(cursor_y + 1, text[cursor_y][cursor_x:])
-            text[cursor_y] = text[cursor_y][:cursor_x]
+            _editor_insert(text, journal, text.offset(cursor_y, cursor_x), "\n")
+            seq += 1
             cursor_y += 1
             cursor_x = 0
-        else:
-            if len(text) <= cursor_y:
-                text.append("")
-            text[cursor_y] = text[cursor_y][:cursor_x] + chr(key) + text[cursor_y][cursor_x:]
+            redraw = True
+        elif key == keys.PASTE:  # The whole paste in one insert
+            chars = _editor_paste_text(eventloop.pasted)
+            if chars:
+                _editor_insert(text, journal, text.offset(cursor_y, cursor_x), chars)
+                seq += 1
+                lines = chars.count("\n")
+                cursor_x = len(chars) - chars.rfind("\n") - 1 if lines else cursor_x + len(chars)
+                cursor_y += lines
+                redraw = True
+        elif 0 <= key < 256 and chr(key).isprintable():
+            _editor_insert(text, journal, text.offset(cursor_y, cursor_x), chr(key))
+            seq += 1
             cursor_x += 1
+            dirty = True
+        elif key == curses.KEY_RESIZE:  # The loop lays the lines out for the new size.
+            redraw = True
+
+    saver.close()
+    if journal is not None:
+        journal.close()
+    curses.curs_set(0)
+
+
+def simple_text_editor(s: curses.window, filename="untitled.txt", autosave: int = 0, swap: bool = True):
+    """Blocking version of simple_text_editor_async()."""
+    return eventloop.run(simple_text_editor_async(s, filename, autosave, swap))
 
 
 def init_win(height: int, width: int, wx: int, wy: int, title: str = "",
@@ -625,40 +1283,43 @@ def init_win(height: int, width: int, wx: int, wy: int, title: str = "",
         curses: Curses screen object.
     """
 
-    w = curses.newwin(height, width, wx, wy)
+    # The window and its shadow are stacked, so closing them restores what was under.
+    w, s = screen.win_open(height, width, wx, wy)
 
     if border_type == 0:
         w.box()
 
     w.bkgd(' ', curses.color_pair(bgcolor))
 
-    # Create shadow effect
-    s = curses.newwin(height, width, wx + 1, wy + 2)
-    s.bkgd(" ", curses.A_DIM)  # Shadow background
-    s.refresh()
-    
-    w.refresh()
-
     if title != "":
         col = int((width - len(title) - 4) / 2)
         w.addstr(0, col, f'[ {title} ]', curses.A_REVERSE)
 
+    screen.frame_mark(s, w)
+
     return w,s
 
 def end_win(w: curses.window, s: curses.window):
     """Closes a curses window.
 
+    Windows created by init_win() are removed from the window stack, and
+    what was under them comes back in the next frame.
+
     Args:
         w (curses): curses window object.
         s (curses): curses window object.
     """
+    if screen.win_close(w):
+        del w,s
+        return
+
     w.bkgd(' ', curses.color_pair(const.PAIR_SCREEN_BG))
     w.erase()
-    w.refresh()
-    
+
     s.bkgd(' ', curses.color_pair(const.PAIR_SCREEN_BG))
     s.erase()
-    s.refresh()
+
+    screen.frame_mark(w, s)
     
     del w,s
 
@@ -690,7 +1351,7 @@ def status_bar(stdscr: curses.window, intxt: str):
     stdscr.addstr(height - 1, 0, txt, curses.color_pair(const.PAIR_WINDOW_BG_LOWER))
     stdscr.addstr(height - 1, len(txt) - 1, " " *
                   (width - len(txt)), curses.color_pair(const.PAIR_WINDOW_BG_LOWER))
-    stdscr.refresh()
+    screen.frame_mark(stdscr)
 
 def menu_hotkey_option(choices: list) -> List[str]:
     """INTERNAL - Given a list of options, returns a list of the hotkeys for every option.
@@ -699,34 +1360,14 @@ def menu_hotkey_option(choices: list) -> List[str]:
         choices (List[str]): The list of choices.
 
     Returns:
-        List[str]: The list of hotkeys for every option.
+        List[str]: The list of hotkeys for every option: [text, hotkey, position].
     """
-    hotkey_list = []
+    return menumodel.hotkey_option(choices)
 
-    # Walking the choices list.
-    for opt in choices:
-
-        # Walking the string
-        for x in opt[0]:
-
-            # Empty list => I've just add.
-            if len(hotkey_list) == 0:
-                hotkey_list.append([opt[0], x, opt[0].find(x)])
-                break
-            else:
-                # Stackoverflow to the rescue.
-                # https://stackoverflow.com/questions/13728023/check-if-a-sublist-contains-an-item
-                if any(x in i for i in hotkey_list):
-                    continue
-                else:  # Add if not exists.
-                    hotkey_list.append([opt[0], x, opt[0].find(x)])
-                    break
-
-    return hotkey_list
 
 def  menu_option_refresh(window_menu: curses.window, row: List[int], max_length: int,
                         choice: List[str], hotkey_list: List[str],
-                        word_color: int, hotkey_color: int):
+                        word_color: int, hotkey_color: int, top: int = 0):
     """INTERNAL - Refresh the menu option
 
     Args:
@@ -737,19 +1378,22 @@ def  menu_option_refresh(window_menu: curses.window, row: List[int], max_length:
         hotkey_list [str]: Hotkey inside the option.
         word_color (int): Color combination of the option.
         hotkey_color (int): Color combination of the hotkey.
+        top (int): First option on screen (the menu scrolls).
 
     Returns:
         None.
     """
-    window_menu.addstr(row + 1,
+    window_menu.addstr(row - top + 1,
                     1,
-                    " " + choice[0].ljust(max_length + 1),
+                    " " + choice[0][:max_length + 1].ljust(max_length + 1),
                     curses.color_pair(word_color))
 
-    window_menu.addstr(row + 1,
-                    hotkey_list[row][2] + 2,
-                    choice[0][hotkey_list[row][2]:hotkey_list[row][2] + 1],
-                    curses.color_pair(hotkey_color))
+    pos = hotkey_list[row][2]
+    if 0 <= pos <= max_length:
+        window_menu.addstr(row - top + 1,
+                        pos + 2,
+                        choice[0][pos:pos + 1],
+                        curses.color_pair(hotkey_color))
 
 def search_in_list(my_list: list, key: string, idx: int = 0) -> int:
     """INTERNAL - Search a string in a list of arrays.
@@ -773,371 +1417,350 @@ def search_in_list(my_list: list, key: string, idx: int = 0) -> int:
     return x    
 
 
-def vertical_menu(stdscr: curses.window, choices: List[str], wx: int, wy: int) -> int:
+async def vertical_menu_async(stdscr: curses.window, choices: List[str], wx: int, wy: int,
+                              use_fuzzy: bool = False) -> int:
     """Creates a vertical menu of options, allowing the user to choose between them.
 
     Args:
         stdscr (curses): Curses screen object.
-        choices (list): List of choices.
+        choices (list): List of choices, or a menumodel.MenuList (compiled
+            once, so opening the menu again only draws it). Not changed.
         wx (int): x coor.
         wy (int): y coor.
+        use_fuzzy (bool): True to pick the choice with fuzzy_finder() instead.
 
     Returns:
         int: The index of the choice that has been choosen.
     """
-
-    # Finding the max length between the menu options.
-    max_length = 0
-    for choice in choices:
-        if len(choice[0]) > max_length:
-            max_length = len(choice[0])
-
-    max_length += 2
-
-    # Discovering the hotkeys
-    hotkey_list = menu_hotkey_option(choices)
-
-    # Creating a new list to keep the code simple
-    hotkeys = []
-    for h in hotkey_list:
-        hotkeys.append(h[1])
-
-    # Drawing the window
-    window_menu, shadow_menu = init_win(len(choices) + 2, max_length + 4, wx, wy)
-    
-    # Add the symbol for submenus.
-    choices_copy = choices.copy()
-    for i, choice in enumerate(choices_copy):
-        if len(choice) == 3:
-            if ">" not in choice[0]:
-                choice[0] =  choice[0].ljust(max_length - 1)+ ">"
-
-
-    # Printing the choices of the submenu
-    row = 0
-    for choice in choices_copy:
-
-        parent_choice = choice.copy()   # tipos mutables se pasan por referencia con "=". Ojo.
-
-#        if len(choice) == 3:  # Submenu
-#            parent_choice[0] = choice[0].ljust(max_length-1)+ ">"
-
-        # First option selected
-        if row == 0:
-            menu_option_refresh(window_menu, row, max_length, parent_choice, hotkey_list,
-                                const.PAIR_ITEM_SELECTED, const.PAIR_HOTKEY_SELECTED)
-
-        else:
-            menu_option_refresh(window_menu, row, max_length, parent_choice, hotkey_list,
-                                const.PAIR_ITEM_UNSELECTED, const.PAIR_HOTKEY_UNSELECTED)
-
-        row += 1
-
-
-    shadow_menu.refresh()
-    window_menu.refresh()
-
-    # Submenu main cycle.
+    # Hotkeys, width and texts come worked out in the MenuList.
+    menu = choices if isinstance(choices, menumodel.MenuList) else menumodel.MenuList(choices)
+    choices = menu.items
+
+    if use_fuzzy:
+        chosen = await fuzzy_finder_async(stdscr, range(len(choices)), "Menu", key=lambda i: choices[i][0])
+        if chosen is None:
+            return -1
+        if choices[chosen][2] is None:
+            return chosen + 1
+        second_choice = await vertical_menu_async(stdscr, choices[chosen][2], wx, wy, True)
+        return second_choice + 101 if second_choice > 0 else second_choice
+
+    # The max length between the menu options, if it fits on screen.
+    mh, mw = stdscr.getmaxyx()
+    max_length = max(min(menu.max_length, mw - wy - 6), 1)
+    hotkey_list = menu.hotkey_list
+    hotkey_index = menu.hotkey_index
+    if max_length == menu.max_length:
+        texts = menu.texts
+    else:   # Cut short: the symbol for submenus goes at the new end.
+        texts = [text[:max_length - 1].ljust(max_length - 1) + ">" if choice[2] is not None else text
+                 for text, choice in zip(menu.texts, choices)]
+
+    # Drawing the window: as many options as fit, the rest scroll.
+    view = max(min(len(choices), mh - wx - 3), 1)
+    window_menu, shadow_menu = init_win(view + 2, max_length + 4, wx, wy)
+
+    # Submenu main cycle. Only the rows that changed are drawn.
     highlight_option = 0
+    top = 0
+    drawn = [None] * view  # (option, selected) on every row
+    query = None   # Type-ahead search ("/"), None when not searching.
+    hits = []      # Option found for every char of the query.
 
-    menu_option_refresh(window_menu, highlight_option, max_length,
-                        choices[highlight_option],
-                        hotkey_list,
-                        const.PAIR_ITEM_SELECTED, const.PAIR_HOTKEY_SELECTED)
-
-    status_bar(stdscr, choices[highlight_option][1])
-
-    pressed = window_menu.getch()
-    while pressed != 67 and \
-            pressed != 68 and \
-            pressed != curses.ascii.NL:
-
-        # Jump to the option if it's hotkey is pressed.
-        if pressed == 66:  # curses.KEY_DOWN:
-            menu_option_refresh(window_menu, highlight_option , max_length,
-                                choices[highlight_option],
-                                hotkey_list,
-                                const.PAIR_ITEM_UNSELECTED, const.PAIR_HOTKEY_UNSELECTED)
-
-            status_bar(stdscr, choices[highlight_option][1])
-
-            highlight_option += 1
-
-            if highlight_option >= len(choices):
-                highlight_option = 0
-
-        elif pressed == 65:  # curses.KEY_UP:
-            menu_option_refresh(window_menu, highlight_option, max_length,
-                                choices[highlight_option],
-                                hotkey_list,
-                                const.PAIR_ITEM_UNSELECTED, const.PAIR_HOTKEY_UNSELECTED)
-
-            status_bar(stdscr, choices[highlight_option][1])
-
-            highlight_option -= 1
-
-            if highlight_option < 0:
-                highlight_option = len(choices) - 1
-                
-        elif chr(pressed).upper() in hotkeys:
-            old_highlight_option = highlight_option
-
-            highlight_option = search_in_list(hotkeys, chr(pressed), 0)
-
-            menu_option_refresh(window_menu, old_highlight_option, max_length,
-                                choices[old_highlight_option],
-                                hotkey_list,
-                                const.PAIR_ITEM_UNSELECTED, const.PAIR_HOTKEY_UNSELECTED)
-
-
-        # Draw the new option
-        menu_option_refresh(window_menu, highlight_option, max_length,
-                            choices[highlight_option],
-                            hotkey_list,
-                            const.PAIR_ITEM_SELECTED, const.PAIR_HOTKEY_SELECTED)
-
-        status_bar(stdscr, choices[highlight_option][1])
-
-        window_menu.refresh()
-        pressed = window_menu.getch()
+    while True:
+        top = min(max(top, highlight_option - view + 1), highlight_option)
+        for y in range(view):
+            option = top + y
+            line = (option, option == highlight_option)
+            if option < len(choices) and drawn[y] != line:
+                if line[1]:
+                    colors = const.PAIR_ITEM_SELECTED, const.PAIR_HOTKEY_SELECTED
+                else:
+                    colors = const.PAIR_ITEM_UNSELECTED, const.PAIR_HOTKEY_UNSELECTED
+                menu_option_refresh(window_menu, option, max_length, (texts[option],),
+                                    hotkey_list, *colors, top)
+                drawn[y] = line
+
+        if query is None:
+            status_bar(stdscr, choices[highlight_option][1][:mw - len(const.STATUSBAR_PREFIX) - 2])
+        else:
+            status_bar(stdscr, f"/{query}"[:mw - len(const.STATUSBAR_PREFIX) - 2])
+        screen.frame_mark(window_menu)
 
-    if pressed == 67:
+        pressed = await eventloop.getch(window_menu)
+        if pressed in (curses.KEY_RIGHT, curses.KEY_LEFT, curses.ascii.NL, curses.KEY_ENTER):
+            break
+        # A held down key: its auto repeats go in one jump (and one frame).
+        steps = 1 + eventloop.repeats(window_menu, pressed) if pressed in keys.SCROLL else 1
+        if pressed == curses.KEY_DOWN:
+            highlight_option = (highlight_option + steps) % len(choices)
+            query = None
+        elif pressed == curses.KEY_UP:
+            highlight_option = (highlight_option - steps) % len(choices)
+            query = None
+        elif pressed == curses.KEY_NPAGE:
+            highlight_option = min(highlight_option + view * steps, len(choices) - 1)
+        elif pressed == curses.KEY_PPAGE:
+            highlight_option = max(highlight_option - view * steps, 0)
+        elif pressed == curses.KEY_HOME:
+            highlight_option = 0
+        elif pressed == curses.KEY_END:
+            highlight_option = len(choices) - 1
+        elif query is not None:
+            if pressed == curses.ascii.ESC:
+                query = None
+            elif pressed in (curses.KEY_BACKSPACE, 127, 8):
+                if hits:
+                    hits.pop()
+                    query = query[:-1]
+                    highlight_option = hits[-1] if hits else highlight_option
+                else:
+                    query = None
+            elif pressed == 14:  # Ctrl+N: next match
+                found = _menu_search(menu.labels, query, highlight_option + 1)
+                highlight_option = highlight_option if found is None else found
+            elif 32 <= pressed < 127:
+                # Every option matching the longer text matches the shorter
+                # one too: the search goes on from the current match.
+                query += chr(pressed)
+                found = _menu_search(menu.labels, query, highlight_option)
+                highlight_option = highlight_option if found is None else found
+                hits.append(highlight_option)
+        elif pressed == ord("/"):
+            query, hits = "", []
+        elif 0 <= pressed < 256 and chr(pressed).upper() in hotkey_index:
+            highlight_option = hotkey_index[chr(pressed).upper()]
+
+    if pressed == curses.KEY_RIGHT:
         end_win(window_menu, shadow_menu)
         return -10
-    elif pressed == 68:
+    elif pressed == curses.KEY_LEFT:
         end_win(window_menu, shadow_menu)
         return -11
     else:
-        if len(choices[highlight_option]) == 2:
+        if choices[highlight_option][2] is None:
             end_win(window_menu, shadow_menu)
             return highlight_option + 1
         else:   # submenu
             second_choices = choices[highlight_option][2]
-            second_choice = vertical_menu(stdscr, second_choices, wx + row - 1,
-                                        wy + max_length + 4)
+            second_choice = await vertical_menu_async(stdscr, second_choices,
+                                                      wx + highlight_option - top,
+                                                      wy + max_length + 4)
             end_win(window_menu, shadow_menu)
 
             return second_choice+101
 
-def convert_json_to_matrix(menu):
-    result = {}
-
-    for key, value in menu.items():
-        group = []
-        for subkey, subvalue in value.items():
-            if "submenu" in subvalue:  # Hay un submenú
-                group.append([
-                    subkey,
-                    subvalue["description"],
-                    convert_json_to_matrix({"submenu": subvalue["submenu"]})["submenu"]
-                ])
-            else:  # Solo tiene descripción
-                group.append([subkey, subvalue["description"]])
-        result[key] = group
-
-    return result
-
-def menu_bar(stdscr: curses.window, options_dict: dict) -> tuple:
+
+def _menu_search(labels: List[str], query: str, start: int) -> int:
+    """INTERNAL - First option from start (wrapping around) with query in its text.
+
+    Returns:
+        int: The option, None if none has it.
+    """
+    query = query.lower()
+    for i in itertools.chain(range(start, len(labels)), range(0, start)):
+        if query in labels[i]:
+            return i
+    return None
+
+
+def vertical_menu(stdscr: curses.window, choices: List[str], wx: int, wy: int,
+                  use_fuzzy: bool = False) -> int:
+    """Blocking version of vertical_menu_async()."""
+    return eventloop.run(vertical_menu_async(stdscr, choices, wx, wy, use_fuzzy))
+
+async def menu_bar_async(stdscr: curses.window, options_dict) -> tuple:
     """Generates the classic menu bar.
 
     Args:
         stdscr (curses): Curses screen object.
-        options_dict (dict): The list of options and suboptions.
+        options_dict (dict): The list of options and suboptions, or a
+            menumodel.MenuModel compiled from them (build it once and the
+            menu bar only has to be drawn every time).
 
     Returns:
         int: index value of the choice of the menu bar,
         int: index value of the choice of the submenu.
     """
 
-    options_dict = convert_json_to_matrix(options_dict)
-
-    menubar_options = []
-
-    for k in options_dict:
-        menubar_options.append(k)
+    model = options_dict
+    if not isinstance(model, menumodel.MenuModel):
+        model = menumodel.MenuModel(options_dict)
 
     _, width = stdscr.getmaxyx()
-
-    list_cols = []
-    col = 0
-    list_cols.append(col)
+    list_cols = model.columns
+    hotkey_list = model.hotkey_list
 
     # Drawing the bar
-    hotkey_list = menu_hotkey_option(menubar_options)
-    idx = 0
-    for opc in menubar_options:
-        stdscr.addstr(0, col, " " + opc + " ", curses.color_pair(const.PAIR_WINDOW_BG_LOWER))
-        stdscr.addstr(
-            0, col + hotkey_list[idx][2] + 1, hotkey_list[idx][1], curses.color_pair(const.PAIR_WINDOW_TITLE))
-
-        col += len(opc) + 2
-        idx += 1
-        list_cols.append(col)
-
+    for idx, opc in enumerate(model.bar):
+        col = list_cols[idx]
+        stdscr.addstr(0, col, opc, curses.color_pair(const.PAIR_WINDOW_BG_LOWER))
+        if hotkey_list[idx][2] >= 0:
+            stdscr.addstr(
+                0, col + hotkey_list[idx][2] + 1, hotkey_list[idx][1], curses.color_pair(const.PAIR_WINDOW_TITLE))
+
+    col = list_cols[-1]
     stdscr.addstr(0, col, " " * (width - col), curses.color_pair(const.PAIR_WINDOW_BG_LOWER))
     status_bar(stdscr, "Make a choice.")
-    stdscr.refresh()
 
-    # Creating a new list to keep the code simple
-    hotkeys = []
-    for h in hotkey_list:
-        hotkeys.append(h[1])
+    # Main cycle: Alt+hotkey opens its menu, any other key (or an unknown hotkey) the first one.
+    hotkey = keys.alt_char(await eventloop.getch(stdscr))
+    idx = model.hotkey_index.get(hotkey.upper(), 0) if hotkey else 0
 
-    submenu_choice = -1
+    # Calling the vertical menu
+    submenu_choice = await vertical_menu_async(
+        stdscr, model.menus[idx], 1, list_cols[idx])
 
-    # Main cycle
-    key = stdscr.getkey()
-    stdscr.nodelay(True)
-    if key == chr(27):
-        key = stdscr.getkey()
-    else:
-        key = hotkey_list[0][1]
+    while (submenu_choice == -10) or \
+            (submenu_choice == -11) or \
+            (submenu_choice == -1):
 
-    stdscr.nodelay(False)
+        # Going to the right
+        if submenu_choice == -10:
+            if idx < len(model.titles) - 1:
+                idx += 1
 
-    if search_in_list(hotkey_list, key, 2) != -1:
-        try:
-            idx = hotkeys.index(key.upper())
-        except ValueError:
-            idx = 0
-
-        _idx = menubar_options[idx]
-
-        # Calling the vertical menu
-        submenu_options = options_dict[_idx]
-        submenu_choice = vertical_menu(
-            stdscr, submenu_options, 1, list_cols[idx])
-
-        while (submenu_choice == -10) or \
-                (submenu_choice == -11) or \
-                (submenu_choice == -1):
-
-            # Going to the right
-            if submenu_choice == -10:
-                if idx < len(menubar_options) - 1:
-                    idx += 1
-
-            # Going to the left
-            elif submenu_choice == -11:
-                if idx > 0:
-                    idx -= 1
-
-            # Enter
-            elif 0 <= submenu_choice < len(submenu_options):
-                return idx + 1, submenu_choice
-
-            # Any other key
-            elif stdscr.getkey() == chr(27):
-                stdscr.nodelay(True)
-                key = stdscr.getkey()
-                if any(key in i for i in hotkey_list):
-                    try:
-                        idx = hotkeys.index(key.upper())
-                    except ValueError:
-                        pass
-
-            submenu_options = options_dict[menubar_options[idx]]
-            submenu_choice = vertical_menu(
-                stdscr, submenu_options, 1, list_cols[idx])
-    else:
-        info_win(stdscr, f"Char '{key}' not found in list {hotkey_list}")
+        # Going to the left
+        elif submenu_choice == -11:
+            if idx > 0:
+                idx -= 1
 
-    return idx + 1, submenu_choice
+        # Any other key
+        else:
+            hotkey = keys.alt_char(await eventloop.getch(stdscr))
+            if hotkey:
+                idx = model.hotkey_index.get(hotkey.upper(), idx)
 
+        submenu_choice = await vertical_menu_async(
+            stdscr, model.menus[idx], 1, list_cols[idx])
 
-def _simple_field_input_type(w: curses.window, input_type: str, field_x: int,
-                             field_y: int, cursor_offset: int,
-                             length: int, key: curses.ascii, value: str,
-                             hidden: bool = False) -> tuple:
-    """INTERNAL - Logic behind the input field.
+    return idx + 1, submenu_choice
 
-    Args:
-        w (curses.window): A curses window object.
-        input_type (string): Boolean validation expression
-        field_x (int): x coordinate.
-        field_y (int): y coordinate.
-        cursor_offset: Cursor position inside the field.
-        length (int): Field length.
-        key (curses.ascii): The key pressed.
-        value (string) : The data in the field.
-        hidden (bool): If True, print "*" instead of char.
 
-    Returns:
-        tuple [cursor_offset, value]
-    """
+def menu_bar(stdscr: curses.window, options_dict) -> tuple:
+    """Blocking version of menu_bar_async()."""
+    return eventloop.run(menu_bar_async(stdscr, options_dict))
 
-    w.move(field_x, field_y + cursor_offset)
-    if eval(input_type) and cursor_offset < length:
-        if hidden:
-            w.addch(curses.ACS_BULLET)
-        else:
-            w.addch(key)
-        value += chr(key)
-        cursor_offset += 1
-    elif key in [ord('\b'), 127,
-                 curses.ascii.BS,
-                 curses.KEY_BACKSPACE
-                 ]:
-        value = value[:len(value) - 1]
-        if cursor_offset > 0:
-            cursor_offset -= 1
-            w.move(field_x, field_y + cursor_offset)
-            w.addch(" ")
-
-    return cursor_offset, value
-
-
-def text_justification(text: string, width: int) -> List[str]:
+
+def text_justification(text: string, width: int, exact: bool = False) -> List[str]:
     """Justifity a text inside the desired width.
 
+    The text is justified paragraph by paragraph (blank lines split them),
+    and every paragraph is cached by (paragraph, width, exact), so after an
+    edit only the paragraphs that changed are justified again, and a scroll
+    or a resize back costs nothing.
+
     Args:
         text (string): Text to be justified
         width (int): Width of the justification.
+        exact (bool): True to fill the whole width, keep the last character of
+            the text and leave the last row unjustified. False keeps the
+            historical output.
 
     Returns:
         list[str]: list of rows for the justied text.
     """
+    rows = []
+    carry = ""
+    pos = 0
+    for m in _PARAGRAPH_END_RE.finditer(text):
+        paragraph_rows, carry = _justify_paragraph(carry + text[pos:m.end()], width, exact, False)
+        rows.extend(paragraph_rows)
+        pos = m.end()
 
-    current_cursor = 0
-    ulist = []
+    rows.extend(_justify_paragraph(carry + text[pos:], width, exact, True)[0])
+    return rows
 
-    # Split the text into a list
-    while current_cursor < len(text) - 1:
 
-        end_cursor = current_cursor + width - 1
-        if end_cursor > len(text) - 1:
-            end_cursor = len(text) - 1
+# A row can run over the end of a paragraph (the text is justified as a
+# whole), so a paragraph hands the start of its unfinished row, the carry,
+# to the next one: joined, the rows are the ones of the whole text.
+_PARAGRAPH_END_RE = re.compile(r'\n[ \t\r]*\n')
 
-        aux = text[current_cursor:end_cursor + 1]
 
-        # Truncate only where a space is detected
-        while aux[end_cursor - current_cursor] != " " \
-                and end_cursor > current_cursor:  # last line space detected
-            end_cursor -= 1
+@functools.lru_cache(maxsize=4096)
+def _justify_paragraph(text: str, width: int, exact: bool, final: bool) -> tuple:
+    """INTERNAL - Cached rows of a paragraph, and the carry for the next one.
 
-        if end_cursor == current_cursor:  # big word detected
-            end_cursor = current_cursor + width
-            if end_cursor > len(text) - 1:
-                end_cursor = len(text) - 1
-
-        aux = text[current_cursor:end_cursor] \
-            .strip() \
-            .ljust(width)  # up to the last space within width
+    Args:
+        text (str): The carry of the paragraph before, and the paragraph.
+        width (int): Width of the justification.
+        exact (bool): As in text_justification().
+        final (bool): True for the end of the text.
 
-        ulist.append(aux)  # up to the last space within width
-        current_cursor = end_cursor
+    Returns:
+        tuple: The rows (a tuple) and the carry (str).
+    """
+    if exact:
+        return _break_rows(text, width, final)
 
+    length = len(text)
+    last = length - 1
+    cur = 0
     jlist = []
-    for uitem in ulist:
-        jlist.append(align_string(uitem, width))
 
-    return jlist
+    # Split the text into rows, truncating only where a space is detected.
+    # Not at the end, a row is only done if the text after it is here too.
+    while cur < last and (final or cur + width < length):
+        end = text.rfind(' ', cur + 1, min(cur + width - 1, last) + 1)
+        if end == -1:  # big word detected
+            end = min(cur + width, last)
+
+        jlist.append(align_string(text[cur:end].strip().ljust(width), width))
+        cur = end
+
+    return tuple(jlist), "" if final else text[cur:]
+
+
+def _break_rows(text: str, width: int, final: bool = True) -> tuple:
+    """INTERNAL - Greedy line breaking that uses the whole width.
+
+    Args:
+        text (str): Text to be broken.
+        width (int): Width of the rows.
+        final (bool): True for the end of the text: the last row is not
+            justified. False keeps it back, as the carry.
+
+    Returns:
+        tuple: The justified rows (a tuple) and the carry (str).
+    """
+    words = text.split()
+    rows = []
+    line = []
+    line_len = -1
+    for word in words:
+        while len(word) > width:  # big word detected
+            if line:
+                rows.append(line)
+                line, line_len = [], -1
+            rows.append([word[:width]])
+            word = word[width:]
+
+        if line_len + 1 + len(word) > width:
+            rows.append(line)
+            line, line_len = [], -1
+
+        line.append(word)
+        line_len += 1 + len(word)
+
+    carry = ""
+    if final:
+        if line:
+            rows.append(line)
+    elif line:
+        carry = " ".join(line) + " "
+
+    last = len(rows) - 1 if final else -1
+    return tuple(_justify_words(tuple(row), width, i == last) for i, row in enumerate(rows)), carry
 
 
 def _items_len(thelist) -> int:
     return sum([len(x) for x in thelist])
 
 
+_LEAD_RE = re.compile(r'(^\s+)(.*)$')
+
+
 # https://code.activestate.com/recipes/414870-align-text-string-using-spaces-between-words-to-fi/
 def align_string(s: str, width: int, last_paragraph_line: int = 0) -> str:
     """Align string to specified width.
@@ -1152,36 +1775,46 @@ def align_string(s: str, width: int, last_paragraph_line: int = 0) -> str:
     """
 
     # detect and save leading whitespace
-    lead_re = re.compile(r'(^\s+)(.*)$')
-    m = lead_re.match(s)
+    m = _LEAD_RE.match(s)
     if m is None:
         left, right, w = '', s, width
     else:
         left, right, w = m.group(1), m.group(2), width - len(m.group(1))
 
-    items = right.split()
+    return left + _justify_words(tuple(right.split()), w, bool(last_paragraph_line))
 
-    # add required space to each words, exclude last item
-    for i in range(len(items) - 1):
-        items[i] += ' '
 
-    if not last_paragraph_line:
-        # number of spaces to add
-        left_count = w - _items_len(items)
-        while left_count > 0 and len(items) > 1:
-            for i in range(len(items) - 1):
-                items[i] += ' '
-                left_count -= 1
-                if left_count < 1:
-                    break
+@functools.lru_cache(maxsize=4096)
+def _justify_words(items: tuple, width: int, last_paragraph_line: bool) -> str:
+    """INTERNAL - Joins words spreading the spaces left evenly, leftmost gaps first.
 
-    res = left + ''.join(items)
-    return res
+    Args:
+        items (tuple): Words of the line.
+        width (int): width
+        last_paragraph_line (bool): True to join with single spaces.
+
+    Returns:
+        Justified line
+    """
+    gaps = len(items) - 1
+    left_count = width - _items_len(items) - gaps
+    if last_paragraph_line or gaps < 1 or left_count < 1:
+        return ' '.join(items)
+
+    # Every gap gets the same share, and the first ones one more space.
+    share, wider = divmod(left_count, gaps)
+    narrow = ' ' * (share + 1)
+    if wider == 0:
+        return narrow.join(items)
+
+    return (narrow + ' ').join(items[:wider + 1]) + narrow + narrow.join(items[wider + 1:])
 
 
 def align_paragraph(paragraph: List[str], width: int, debug=0) -> List[str]:
     """Align paragraph to a specific width.
 
+    Results are cached by (paragraph, width).
+
     Args:
         paragraph (list): list of lines
         width (int): width
@@ -1203,21 +1836,26 @@ def align_paragraph(paragraph: List[str], width: int, debug=0) -> List[str]:
 
     flatten_para = ' '.join(lines)
 
-    splitted = textwrap.wrap(flatten_para, width)
     if debug:
-        print('textwrap:\n%s\n' % '\n'.join(splitted))
+        print('textwrap:\n%s\n' % '\n'.join(textwrap.wrap(flatten_para, width)))
 
-    wrapped = list()
-    while len(splitted) > 0:
-        line = splitted.pop(0)
-        if len(splitted) == 0:
-            last_paragraph_line = 1
-        else:
-            last_paragraph_line = 0
-        aligned = align_string(line, width, last_paragraph_line)
-        wrapped.append(aligned)
+    return list(_align_paragraph(flatten_para, width))
+
+
+@functools.lru_cache(maxsize=1024)
+def _align_paragraph(flatten_para: str, width: int) -> tuple:
+    """INTERNAL - Cached body of align_paragraph()."""
+    splitted = textwrap.wrap(flatten_para, width)
+    last = len(splitted) - 1
+
+    return tuple(align_string(line, width, i == last) for i, line in enumerate(splitted))
 
-    return wrapped
+
+def justification_cache_clear():
+    """Empties the caches of the justification functions."""
+    _justify_paragraph.cache_clear()
+    _align_paragraph.cache_clear()
+    _justify_words.cache_clear()
 
 
 def _text_browser_refresh(w: curses.window, start_idx: int,
@@ -1227,206 +1865,417 @@ def _text_browser_refresh(w: curses.window, start_idx: int,
         w.addstr(row, 2, text_list[i], curses.color_pair(const.PAIR_WINDOW_BG_LOWER))
         row += 1
 
-    w.refresh()
+    screen.frame_mark(w)
 
 
 def _text_browser_refresh_bar(w: curses.window, start_idx: int, height: int, scale: int, width: int):
     """INTERNAL - Browser of the refresh bar
 
     w (curses.window): Curses window object
-    start_idx (int): Index stat
+    start_idx (int): Position of the box inside the bar
     height (int): Height of the window
     scale (int): Scale (length)
     width (int): Width of the window
 
     """
-    if start_idx > 0:
-        w.move(start_idx + 1, 0 + width + 3)
-        w.addch(curses.ACS_DIAMOND)
+    for i in range(2, height - 2):
+        w.move(i, 0 + width + 3)
+        if start_idx + 2 <= i < start_idx + 2 + scale:
+            w.addch(curses.ACS_CKBOARD)
+        else:
+            w.addch(curses.ACS_DIAMOND)
+
+    screen.frame_mark(w)
+
+
+def _text_browser_open(title: str, width: int, height: int) -> tuple:
+    """INTERNAL - Opens the browser window: frame, scroll arrows and help.
+
+    Args:
+        title (str): Title of the window.
+        width (int): Width of the browser.
+        height (int): Height of the browser.
+
+    Returns:
+        tuple[curses.window, curses.window]: The window and its shadow.
+    """
+    w, sha = init_win(height + 2, width + 4, 3, 3, title,
+                      const.PAIR_WINDOW_BG_LOWER, 0)
+    w.attron(curses.A_REVERSE)
+    w.move(1, 0 + width + 3)
+    w.addch(curses.ACS_UARROW)
+    w.move(height - 2, 0 + width + 3)
+    w.addch(curses.ACS_DARROW)
+
+    w.attron(curses.A_NORMAL)
+
+    w.addstr(height + 1, 2, "<ESC> Exit /// Up/Down to browse".center(width)[:width],
+             curses.color_pair(const.PAIR_WINDOW_HELPER))
+    return w, sha
 
-    for i in range(start_idx + 1, scale + start_idx - 1):
-        w.move(i + 1, 0 + width + 3)
-        w.addch(curses.ACS_CKBOARD)
 
-    if scale + start_idx < height - 2:
-        w.move(scale + start_idx, 0 + width + 3)
-        w.addch(curses.ACS_DIAMOND)
+def _text_browser_page(text_list: List[str], source, start_idx: int, rows: int, width: int) -> List[str]:
+    """INTERNAL - Rows to be displayed, padded up to the browser height.
 
-    w.refresh()
+    Args:
+        text_list (List[str]): Justified text (None for file browsing).
+        source (MappedText): Mapped file (None for text browsing).
+        start_idx (int): First row.
+        rows (int): Number of rows.
+        width (int): Width of the browser.
+
+    Returns:
+        List[str]: The rows.
+    """
+    if source is None:
+        page = text_list[start_idx:start_idx + rows]
+    else:
+        page = source.rows(start_idx, rows)
+
+    return page + [" " * width] * (rows - len(page))
 
 
-def text_browser(s: curses.window, title: str, text: str, width: int = 50, height: int = 20):
+async def text_browser_async(s: curses.window, title: str, text, width: int = 50, height: int = 20):
     """Text Browsing
 
+    When the terminal is resized, the browser is fitted to it (never bigger
+    than width and height), and a text given as a string is justified again
+    for the new width.
+
     Args:
         s (Curses.window): Curses screen object.
         title (string): Title of the window.
-        text (string): Text to be browsed.
+        text (string): Text to be browsed, a textfile.MappedText for big files
+            (see await text_file_browser_async()) or a justify.JustifiedText still being
+            justified in the background (stopped on exit if it isn't done).
         width (int): width of the browser.
         height (int): height of the browser.
     """
 
     status_bar(s, "Browsing text.")
 
-    text_list = text_justification(text, width)
-    text_list[len(text_list) - 1] = text_list[len(text_list) - 1].ljust(width)
-    # text_list.append(" ".ljust(width))
+    if isinstance(text, str):
+        text_list = text_justification(text, width)
+        text_list[len(text_list) - 1] = text_list[len(text_list) - 1].ljust(width)
+        source = None
+        num_rows = len(text_list)
+    else:  # Only the visible rows are justified.
+        text_list = None
+        source = text
+        num_rows = source.estimate_rows()
+
+    max_width, max_height = width, height
+    start_idx = 0
 
-    num_rows = len(text_list)
+    # Drawing the browser
+    w, sha = _text_browser_open(title, width, height)
+
+    try:
+        pressed = None
+        steps = 1
+        while pressed != curses.ascii.ESC:
+            visible = height - 3
+            # Size of the box on the right bar
+            max_length = height - 4
+
+            if pressed == curses.KEY_DOWN:
+                start_idx += steps
+            elif pressed == curses.KEY_UP:
+                start_idx -= steps
+            elif pressed == curses.KEY_NPAGE:
+                start_idx += visible * steps
+            elif pressed == curses.KEY_PPAGE:
+                start_idx -= visible * steps
+            elif pressed == curses.KEY_HOME:
+                start_idx = 0
+            elif pressed == curses.KEY_END:
+                start_idx = (source.index_all() if source else num_rows) - visible
+            elif pressed == curses.KEY_RESIZE:  # Fit the browser and its shadow above the status bar.
+                lines, cols = s.getmaxyx()
+                height = max(4, min(max_height, lines - 7))
+                if source is None:  # A mapped or justifying source has its width.
+                    width = max(10, min(max_width, cols - 9))
+                    text_list = text_justification(text, width)
+                    text_list[len(text_list) - 1] = text_list[len(text_list) - 1].ljust(width)
+                    num_rows = len(text_list)
+                visible, max_length = height - 3, height - 4
+                end_win(w, sha)
+                w, sha = _text_browser_open(title, width, height)
+
+            # Populating
+            start_idx = max(0, start_idx)
+            page = _text_browser_page(text_list, source, start_idx, visible, width)
+            if source is not None:
+                num_rows = source.estimate_rows()
+            if start_idx > max(0, num_rows - visible):
+                start_idx = max(0, num_rows - visible)
+                page = _text_browser_page(text_list, source, start_idx, visible, width)
+
+            _text_browser_refresh(w, 0, visible, page)
+
+            if num_rows > visible:
+                scale = max(1, max_length * visible // num_rows)
+                pos = (max_length - scale) * start_idx // max(1, num_rows - visible)
+                _text_browser_refresh_bar(w, pos, height, scale, width)
+            else:
+                _text_browser_refresh_bar(w, 0, height, 0, width)
 
-    start_idx = 0
-    end_idx = start_idx + height - 1 - 2
+            # Keep polling while the rows are still arriving.
+            wait = None
+            if getattr(source, 'running', False):
+                status_bar(s, f"Browsing text. Justifying... {source.row_count()} rows.")
+                wait = 0.1
+            else:
+                status_bar(s, "Browsing text.")
 
-    if end_idx > num_rows:
-        end_idx = num_rows - 1
+            pressed = await eventloop.getch(w, wait)
+            # A held down key: its auto repeats go in one jump (and one frame).
+            steps = 1 + eventloop.repeats(w, pressed) if pressed in keys.SCROLL else 1
+    finally:
+        # Closing the browser
+        end_win(w,sha)
+        if getattr(source, 'running', False):  # Nobody will read the rest.
+            source.close()
 
-    # Drawing the browser
-    w,s = init_win(height + 2, width + 4, 3, 3, title,
-                                const.PAIR_WINDOW_BG_LOWER, 0)
-    w.attron(curses.A_REVERSE)
-    w.move(1, 0 + width + 3)
-    w.addch(curses.ACS_UARROW)
-    w.move(height - 2, 0 + width + 3)
-    w.addch(curses.ACS_DARROW)
 
-    w.attron(curses.A_NORMAL)
+def text_browser(s: curses.window, title: str, text, width: int = 50, height: int = 20):
+    """Blocking version of text_browser_async()."""
+    return eventloop.run(text_browser_async(s, title, text, width, height))
 
-    # Draw the right bar
-    for i in range(2, height - 2):
-        w.move(i, 0 + width + 3)
-        w.addch(curses.ACS_DIAMOND)
 
-    # Draw the box on the right bar
-    max_length = height - 4
-    scale = int(max_length / num_rows * (height - 2)) - 1
+async def text_file_browser_async(s: curses.window, title: str, filename: str, width: int = 50, height: int = 20):
+    """Text Browsing over a file of any size.
 
-    if num_rows > max_length:
-        _text_browser_refresh_bar(w, start_idx, height, scale, width)
+    The file is memory mapped and only the visible rows are justified, so the
+    first page comes up at once no matter the size of the file.
 
-    w.addstr(height + 1, 2, "<ESC> Exit /// Up/Down to browse".center(width),
-             curses.color_pair(const.PAIR_WINDOW_HELPER))
+    Args:
+        s (Curses.window): Curses screen object.
+        title (string): Title of the window.
+        filename (string): File to be browsed.
+        width (int): width of the browser.
+        height (int): height of the browser.
+    """
+    with textfile.MappedText(filename, width) as source:
+        await text_browser_async(s, title, source, width, height)
 
-    # Populating
-    _text_browser_refresh(w, start_idx, end_idx, text_list)
 
-    pressed = s.getch()
-    s.nodelay(True)
-    while pressed != curses.ascii.ESC:
+def text_file_browser(s: curses.window, title: str, filename: str, width: int = 50, height: int = 20):
+    """Blocking version of text_file_browser_async()."""
+    return eventloop.run(text_file_browser_async(s, title, filename, width, height))
 
-        if pressed == curses.KEY_DOWN:  # curses.KEY_DOWN: 66
-            if start_idx > 0:
-                start_idx -= 1
-                end_idx -= 1
+# Work in progress
+async def form_view_async(s: curses.window, title: str, form, values: dict = None,
+                          submit_label: str = "Submit", cancel_label: str = "Cancel") -> dict:
+    """
+    Form dialog for any number of fields.
 
-        if pressed == curses.KEY_UP:  # curses.KEY_UP: 65
-            if end_idx < len(text_list):
-                start_idx += 1
-                end_idx += 1
+    The fields scroll inside the window, and typing goes straight to the
+    focused one. Tab/Shift+Tab and Enter move the focus in tab order,
+    Up/Down and PgUp/PgDn as the fields are shown. Only the rows whose
+    value or focus changed are drawn again. Enter on a field with an
+    invalid value, or on the submit button with any, shows the message of
+    its validator and moves the focus to it instead.
 
-        _text_browser_refresh(w, start_idx, end_idx, text_list)
+    Args:
+        s (curses.window): Curses screen object.
+        title (str): Title of the form window.
+        form (formmodel.FormModel | list): The form, or its fields (see formmodel.FormModel for
+            what a field takes: sections, tab order, names, initial values...).
+        values (dict): Initial values by field name. None for the ones of the fields.
+        submit_label (str): Label for the submit button (default: "Submit").
+        cancel_label (str): Label for the cancel button (default: "Cancel").
 
-        if num_rows > max_length:
-            _text_browser_refresh_bar(w, start_idx, height, scale, width)
+    Returns:
+        dict: The values by field name, or None if the form was canceled.
+    """
+    model = form
+    if not isinstance(model, formmodel.FormModel):
+        model = formmodel.FormModel(form)
+    fields, rows = model.fields, model.rows
+    submit, cancel = len(fields), len(fields) + 1
+    values = model.values(values)
 
-        pressed = s.getch()
+    mh, mw = s.getmaxyx()
+    width = min(model.label_width + model.value_width + 15, mw - 2)
+    height = min(len(rows) + 7, mh - 2)
+    view = max(height - 7, 1)                   # Rows of fields on screen
+    value_col = model.label_width + 4
+    room = max(width - value_col - 3, 1)        # Longer values scroll in the field
+    w, sha = init_win(height, width, (mh - height) // 2, (mw - width) // 2, title)
+
+    focus = model.tab_order[0]
+    cursor = len(values[focus])
+    top = 0
+    drawn = [None] * view   # (field, value, focused, offset) or section title on every row
+    drawn_top = drawn_buttons = -1  # Nothing drawn yet
+    status = message = None
 
-    # Closing the browser
-    end_win(w,s)
+    while True:
+        # Scroll to the focused field (with the title of its section, if it fits).
+        offset = 0
+        if focus < submit:
+            row = fields[focus].row
+            first = row - 1 if view > 1 and row > 0 and not isinstance(rows[row - 1], int) else row
+            top = min(max(top, row - view + 1), first)
+            offset = max(0, cursor - min(fields[focus].length, room) + 1)
+
+        for y in range(view):
+            item = rows[top + y] if top + y < len(rows) else None
+            if isinstance(item, int):
+                line = (item, values[item], item == focus, offset if item == focus else 0)
+            else:
+                line = item
+            if drawn[y] != line:
+                _form_draw_row(w, 2 + y, line, fields, value_col, room, width)
+                drawn[y] = line
+
+        if top != drawn_top:  # More fields above/below
+            w.addch(2, width - 1, curses.ACS_UARROW if top > 0 else curses.ACS_VLINE)
+            w.addch(1 + view, width - 1, curses.ACS_DARROW if top + view < len(rows) else curses.ACS_VLINE)
+            drawn_top = top
+
+        buttons = focus if focus >= submit else None
+        if buttons != drawn_buttons:
+            w.addstr(height - 3, 2, f"[{submit_label}]",
+                     curses.A_BOLD | curses.A_REVERSE if focus == submit else curses.A_NORMAL)
+            w.addstr(height - 3, width - len(cancel_label) - 4, f"[{cancel_label}]",
+                     curses.A_BOLD | curses.A_REVERSE if focus == cancel else curses.A_NORMAL)
+            drawn_buttons = buttons
+
+        text = message or (fields[focus].help if focus < submit else "") or \
+            "Tab/Enter: siguiente, Shift+Tab: anterior, ESC: cancelar."
+        if text != status:
+            status_bar(s, text[:mw - len(const.STATUSBAR_PREFIX) - 2])
+            status = text
+
+        if focus < submit:
+            curses.curs_set(1)
+            w.move(2 + fields[focus].row - top, value_col + cursor - offset)
+        else:
+            curses.curs_set(0)
+        screen.frame_mark(w)
 
-# Work in progress
-def form_win(s: curses.window, title: str, fields: list, submit_label: str = "Submit", cancel_label: str = "Cancel") -> dict:
+        key = await eventloop.getch(w)
+        # A held down key: its auto repeats go in one jump (and one frame).
+        steps = 1 + eventloop.repeats(w, key) if key in keys.SCROLL else 1
+        message = None
+        moved = focus
+
+        if key == curses.ascii.ESC:
+            values = None
+            break
+        elif key == curses.ascii.TAB:
+            moved = model.tab_order[(model.tab_index[focus] + 1) % len(model.tab_order)]
+        elif key == curses.KEY_BTAB:
+            moved = model.tab_order[(model.tab_index[focus] - 1) % len(model.tab_order)]
+        elif key == curses.KEY_DOWN:
+            moved = (focus + steps) % (cancel + 1)
+        elif key == curses.KEY_UP:
+            moved = (focus - steps) % (cancel + 1)
+        elif key == curses.KEY_NPAGE:
+            moved = min(focus + view * steps, submit - 1) if focus < submit else focus
+        elif key == curses.KEY_PPAGE:
+            moved = max(focus - view * steps, 0) if focus < submit else focus
+        elif key in (curses.ascii.NL, curses.KEY_ENTER):
+            if focus == cancel:
+                values = None
+                break
+            # The field (or, on submit, the first field) with an invalid value.
+            check = range(submit) if focus == submit else (focus,)
+            invalid = next((i for i in check if not fields[i].validator.validate(values[i])), None)
+            if invalid is not None:
+                moved = invalid
+                message = f"{fields[invalid].label}: {fields[invalid].validator.message}"
+            elif focus == submit:
+                break
+            else:
+                moved = model.tab_order[model.tab_index[focus] + 1]
+        elif focus < submit:
+            field = fields[focus]
+            if key == curses.KEY_LEFT:
+                cursor = max(cursor - steps, 0)
+            elif key == curses.KEY_RIGHT:
+                cursor = min(cursor + steps, len(values[focus]))
+            elif key == curses.KEY_HOME:
+                cursor = 0
+            elif key == curses.KEY_END:
+                cursor = len(values[focus])
+            elif key in (curses.ascii.DEL, curses.ascii.BS, curses.KEY_BACKSPACE):
+                values[focus], cursor = field.validator.delete(values[focus], cursor)
+            elif key == keys.PASTE:
+                values[focus], cursor = field.validator.insert(values[focus], cursor, eventloop.pasted, field.length)
+            elif field.validator.accepts(key):
+                values[focus], cursor = field.validator.insert(values[focus], cursor, chr(key), field.length)
+
+        if moved != focus:
+            focus = moved
+            cursor = len(values[focus]) if focus < submit else 0
+
+    curses.curs_set(0)
+    end_win(w, sha)
+    if values is None:
+        return None
+    return {field.name: value for field, value in zip(fields, values)}
+
+
+def form_view(s: curses.window, title: str, form, values: dict = None,
+              submit_label: str = "Submit", cancel_label: str = "Cancel") -> dict:
+    """Blocking version of form_view_async()."""
+    return eventloop.run(form_view_async(s, title, form, values, submit_label, cancel_label))
+
+
+def _form_draw_row(w: curses.window, y: int, line, fields: tuple, value_col: int, room: int, width: int):
+    """INTERNAL - Draws a row of a form: a field (field, value, focused, offset), a section title or nothing."""
+    w.addstr(y, 1, " " * (width - 2))
+    if isinstance(line, str):
+        w.addstr(y, 2, line[:width - 4], curses.A_BOLD | curses.A_UNDERLINE)
+        return
+    if line is None:
+        return
+
+    index, value, focused, offset = line
+    field = fields[index]
+    size = min(field.length, room)
+    w.addstr(y, 2, f"{field.label}:")
+    if value or focused:
+        text = ("*" * len(value) if field.hidden else value)[offset:offset + size]
+        w.addstr(y, value_col, text.ljust(size), curses.A_REVERSE if focused else
+                 curses.color_pair(const.PAIR_INPUT_FIELD))
+    else:
+        w.addstr(y, value_col, field.placeholder[:size].ljust(size),
+                 curses.color_pair(const.PAIR_INPUT_FIELD) | curses.A_DIM)
+
+
+async def form_win_async(s: curses.window, title: str, fields, submit_label: str = "Submit", cancel_label: str = "Cancel") -> dict:
     """
     Creates a form dialog with multiple input fields.
 
+    It's form_view_async(), so large forms scroll, and the fields can have
+    sections, tab order, placeholders and initial values.
+
     Args:
         s (curses.window): Curses screen object.
         title (str): Title of the form window.
-        fields (list): A list of dictionaries, each defining a field:
+        fields (list | formmodel.FormModel): A list of dictionaries, each defining a field:
             - label (str): The field label.
             - length (int): The length of the input field.
             - help (str): Help text for the field.
-            - type (int): Field type (0-Alphanumeric, 1-Numeric, 2-Alphabetic).
+            - type (int): Field type (const.INPUT_TYPE_*, see validators).
             - hidden (bool): True if the field should hide characters.
+            (More in formmodel.FormModel.) A FormModel compiled beforehand also goes.
         submit_label (str): Label for the submit button (default: "Submit").
         cancel_label (str): Label for the cancel button (default: "Cancel").
 
     Returns:
-        dict: A dictionary containing field labels as keys and their input values as values,
+        dict: A dictionary containing field labels (or names) as keys and their input values as values,
               or None if the form was canceled.
     """
-    # Calculate form dimensions
-    # Compute the maximum label length, only considering valid dictionaries with a 'label' key
-    max_label_length = max(
-        len(field['label']) for field in fields if isinstance(field, dict) and 'label' in field
-    )
-
-    max_length = max(field['length'] for field in fields)
-    width = max_label_length + max_length + 15
-    height = len(fields) + 7
-    mh, mw = s.getmaxyx()
-    wx = (mh - height) // 2
-    wy = (mw - width) // 2
+    return await form_view_async(s, title, fields, None, submit_label, cancel_label)
 
-    # Create the form window
-    _,win_form = init_win(height, width, wx, wy, title)
 
-    # Initialize field values and positions
-    field_values = {}
-    y_offset = 2
-    for field in fields:
-        win_form.addstr(y_offset, 2, f"{field['label']}:")
-        field_values[field['label']] = ""
-        y_offset += 1
-
-    # Add buttons
-    win_form.addstr(height - 3, 2, f"[{submit_label}]", curses.A_REVERSE)
-    win_form.addstr(height - 3, width - len(cancel_label) - 4, f"[{cancel_label}]", curses.A_REVERSE)
-
-    # Form interaction loop
-    curses.curs_set(1)
-    active_field = 0
-    while True:
-        # Draw input fields
-        y_offset = 2
-        for idx, field in enumerate(fields):
-            is_active = (idx == active_field)
-            value_display = ''.join(['*' if field.get('hidden', False) else c for c in field_values[field['label']]])
-            win_form.addstr(y_offset, len(field['label']) + 4, value_display.ljust(field['length']), curses.A_REVERSE if is_active else curses.A_NORMAL)
-            y_offset += 1
-
-        # Highlight buttons
-        if active_field == len(fields):  # Submit
-            win_form.addstr(height - 3, 2, f"[{submit_label}]", curses.A_BOLD | curses.A_REVERSE)
-            win_form.addstr(height - 3, width - len(cancel_label) - 4, f"[{cancel_label}]", curses.A_NORMAL)
-        elif active_field == len(fields) + 1:  # Cancel
-            win_form.addstr(height - 3, 2, f"[{submit_label}]", curses.A_NORMAL)
-            win_form.addstr(height - 3, width - len(cancel_label) - 4, f"[{cancel_label}]", curses.A_BOLD | curses.A_REVERSE)
-
-        win_form.refresh()
-
-        # Handle user input
-        key = s.getch()
-        if key in (66, 65):
-            if key == 65:
-                active_field = (active_field - 1) % (len(fields) + 2)
-            elif key == 66:
-                active_field = (active_field + 1) % (len(fields) + 2)
-        elif key == curses.ascii.NL:  # Enter key
-            if active_field < len(fields):
-                # Edit the current field
-                field = fields[active_field]
-                field_values[field['label']] = simple_input_text_field(
-                    s, win_form, 2 + active_field, len(field['label']) + 4,
-                    field['label'], field['length'], field.get('help', ""), field.get('type', 0), field.get('hidden', False)
-                )
-            elif active_field == len(fields):  # Submit
-                curses.curs_set(0)
-                return field_values
-            elif active_field == len(fields) + 1:  # Cancel
-                curses.curs_set(0)
-                return None
-        elif key == curses.ascii.ESC:  # Escape key
-            curses.curs_set(0)
-            return None
+def form_win(s: curses.window, title: str, fields, submit_label: str = "Submit", cancel_label: str = "Cancel") -> dict:
+    """Blocking version of form_win_async()."""
+    return eventloop.run(form_win_async(s, title, fields, submit_label, cancel_label))
 
 
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+#
+# CurTools - Event loop
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+import asyncio
+import collections
+import curses
+import sys
+
+import modules.instrument as instrument
+import modules.keys as keys
+import modules.screen as screen
+
+# One event loop for the whole app, so tasks started by a widget (timers,
+# background I/O) live on after the widget returns.
+_loop = None
+
+# Futures of the coroutines waiting for a key, the newest last. Keys go to
+# the newest one (the widget on top); the others get them once it's done.
+_waiters = []
+_listening = False
+
+# Where the keys come from instead of stdin (headless.Backend), None for the terminal.
+_source = None
+
+# What's read is decoded (escape sequences) into keys, the same for every widget.
+_decoder = keys.Decoder()
+_keys = collections.deque()  # Keys decoded and not read yet.
+
+# Text of the last keys.PASTE read.
+pasted = ""
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Event loop of the widgets.
+
+    Returns:
+        asyncio.AbstractEventLoop: The loop, created the first time.
+    """
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop
+
+
+def run(coro):
+    """Runs a coroutine until it's done (the sync widgets use it).
+
+    Tasks created meanwhile keep running while the next widget waits for
+    input.
+
+    Args:
+        coro (coroutine): Coroutine to be run (i.e. cur_tools.menu_bar_async(...)).
+
+    Returns:
+        The value returned by the coroutine.
+
+    Raises:
+        RuntimeError: Called from a coroutine. Await the _async widget instead.
+    """
+    loop = get_loop()
+    if loop.is_running():
+        coro.close()
+        raise RuntimeError("Blocking widget called inside the event loop, await its _async version")
+    return loop.run_until_complete(coro)
+
+
+def set_key_source(source):
+    """Takes the keys from somewhere else than the terminal.
+
+    Args:
+        source: Object with a coroutine wait(timeout) -> bool that returns once
+            there's a key to read (False if the time is up), as
+            headless.Backend. None to go back to stdin.
+    """
+    global _source
+    _source = source
+
+
+async def getch(w: curses.window, timeout: float = None) -> int:
+    """Sends the pending frame and waits for a key, without blocking the loop.
+
+    Escape sequences are decoded (see keys.Decoder): arrows, F-keys and so
+    on come as curses.KEY_* codes, Alt+key as keys.ALT | key, and a lone
+    ESC comes keys.esc_delay after it's pressed. A paste comes as one
+    keys.PASTE, its text in pasted. The windows don't need keypad mode.
+
+    The frame is sent only if no key has been typed yet: while keys are
+    queued (i.e. auto repeats of a held down key), the widget handles
+    them first and the screen gets the state after the last one.
+
+    Args:
+        w (curses.window): Curses window object.
+        timeout (float): Seconds to wait. None waits forever.
+
+    Returns:
+        int: The key pressed, -1 if the time is up.
+    """
+    return await _getch(w, timeout, sys._getframe(1).f_code.co_name if instrument.enabled else None)
+
+
+async def getkey(w: curses.window) -> str:
+    """Sends the pending frame and waits for a key, without blocking the loop.
+
+    Args:
+        w (curses.window): Curses window object.
+
+    Returns:
+        str: The key pressed, named as curses getkey() does ("M-x" for Alt+x, see keys.name()).
+    """
+    return keys.name(await _getch(w, None, sys._getframe(1).f_code.co_name if instrument.enabled else None))
+
+
+async def _getch(w: curses.window, timeout: float, widget: str) -> int:
+    """INTERNAL - getch(), for a widget (its name when the stats are on)."""
+    global pasted
+    _drain(w)
+    if not _keys:
+        _send_frame()
+    elif widget is not None:
+        instrument.waiting()
+    while True:
+        key = await _next_key(w, timeout)
+        if key != -1 and widget is not None and instrument.key_event(key, widget):
+            _send_frame()
+            continue
+        if key == keys.PASTE:
+            pasted = _decoder.pastes.popleft()
+        return key
+
+
+def repeats(w: curses.window, key: int) -> int:
+    """Takes the keys already typed that repeat the one just read (auto repeats of a held down key).
+
+    The widgets use it to merge a burst of moves (see keys.SCROLL) into one jump.
+
+    Args:
+        w (curses.window): Curses window object.
+        key (int): The key just read.
+
+    Returns:
+        int: How many were taken (0 for none).
+    """
+    _drain(w)
+    count = 0
+    while _keys and _keys[0] == key:
+        _keys.popleft()
+        count += 1
+    return count
+
+
+def _drain(w: curses.window):
+    """INTERNAL - Decodes every code already typed, without waiting."""
+    w.timeout(0)
+    try:
+        while True:
+            code = w.getch()
+            if code == -1:
+                break
+            _keys.extend(_decoder.feed(code))
+    finally:
+        w.timeout(-1)
+
+
+async def _next_key(w: curses.window, timeout: float) -> int:
+    """INTERNAL - Next decoded key, -1 if the time is up."""
+    while not _keys:
+        code = _read(w, w.getch)
+        if code != -1:
+            _keys.extend(_decoder.feed(code))
+        elif _decoder.pending:
+            # The rest of a sequence comes at once: if nothing does, it was an ESC.
+            if not await _input(keys.esc_delay):
+                _keys.extend(_decoder.flush())
+        elif not await _input(timeout):
+            return -1
+    return _keys.popleft()
+
+
+def _send_frame():
+    """INTERNAL - Sends the pending frame, with the stats overlay if it's on."""
+    if instrument.enabled:
+        overlay = instrument.waiting()
+        if overlay is not None:
+            screen.frame_mark(overlay)
+    screen.frame_flush(True)
+
+
+def _read(w: curses.window, read):
+    """INTERNAL - Reads a key without waiting."""
+    w.timeout(0)
+    try:
+        return read()
+    finally:
+        w.timeout(-1)
+
+
+async def _input(timeout: float) -> bool:
+    """INTERNAL - Waits until there's input for this coroutine.
+
+    Returns:
+        bool: False if the time is up.
+    """
+    if _source is not None:
+        return await _source.wait(timeout)
+
+    loop = asyncio.get_running_loop()
+    waiter = loop.create_future()
+    _waiters.append(waiter)
+    _listen(loop)
+    try:
+        await asyncio.wait_for(waiter, timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        _waiters.remove(waiter)
+        if _waiters:
+            _listen(loop)
+
+
+def _listen(loop: asyncio.AbstractEventLoop):
+    """INTERNAL - Watches stdin while someone is waiting for a key."""
+    global _listening
+    if not _listening:
+        loop.add_reader(sys.stdin.fileno(), _ready, loop)
+        _listening = True
+
+
+def _ready(loop: asyncio.AbstractEventLoop):
+    """INTERNAL - stdin has input: the newest waiter reads it."""
+    global _listening
+    # Not watched again until the key is read, or the callback would spin.
+    loop.remove_reader(sys.stdin.fileno())
+    _listening = False
+    for waiter in reversed(_waiters):
+        if not waiter.done():
+            waiter.set_result(True)
+            return
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+#
+# CurTools - Form model
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+from types import MappingProxyType
+
+import modules.validators as validators
+from modules.menumodel import _Frozen
+
+
+class FormField(_Frozen):
+    """A field of a form, compiled once (see FormModel)."""
+
+    __slots__ = ('name', 'label', 'length', 'help', 'validator', 'hidden', 'placeholder', 'value',
+                 'section', 'row')
+
+    def __init__(self, field: dict, row: int):
+        """Compiles a field.
+
+        Args:
+            field (dict): The field, as form_win() takes it.
+            row (int): Its row in the form.
+
+        Raises:
+            ValueError: Unknown field type.
+        """
+        validator = validators.get(field.get('type', 0))
+        if validator is None:
+            raise ValueError(f"Unknown input type for {field['label']!r}: {field.get('type')!r}")
+        self._set(name=field.get('name', field['label']), label=field['label'],
+                  length=validator.length or field['length'], help=field.get('help', ""),
+                  validator=validator, hidden=field.get('hidden', False),
+                  placeholder=field.get('placeholder', ""), value=field.get('value', ""),
+                  section=field.get('section'), row=row)
+
+
+class FormModel(_Frozen):
+    """Form, compiled once from the list of fields form_win() takes.
+
+    The validator of every field, the rows (a section starts with a row of
+    its own) and the tab order are worked out here, so the form only draws
+    the rows on screen and moves the focus through an index, however many
+    fields it has.
+
+        [{"label": "Name", "length": 20, "section": "Personal data"},
+         {"label": "Birth", "length": 10, "type": const.INPUT_TYPE_DATE, "tab": 3},
+         {"label": "Email", "length": 30, "type": const.INPUT_TYPE_EMAIL, "name": "email"}]
+    """
+
+    __slots__ = ('fields', 'rows', 'tab_order', 'tab_index', 'index', 'label_width', 'value_width')
+
+    def __init__(self, fields: list):
+        """Compiles the form.
+
+        Args:
+            fields (list): The fields, dicts with:
+                - label (str): The field label.
+                - length (int): The length of the input field (a mask sets its own).
+                - help (str): Help text for the field.
+                - type: Field type (const.INPUT_TYPE_*, see validators).
+                - hidden (bool): True if the field should hide characters.
+                - name (str): Key of its value in the result (the label by default).
+                - value (str): Initial value.
+                - placeholder (str): Shown while the field is empty.
+                - section (str): Title of the section the field starts (it goes on
+                  until the next field with a section).
+                - tab (int): Place in the tab order (the order of the list by default).
+
+        Raises:
+            ValueError: No fields, or a field of an unknown type.
+        """
+        if not fields:
+            raise ValueError("A form needs at least one field")
+
+        compiled = []
+        rows = []  # A field index, or the title of a section.
+        for field in fields:
+            section = field.get('section')
+            if section:
+                rows.append(section)
+            compiled.append(FormField(field, len(rows)))
+            rows.append(len(compiled) - 1)
+
+        # Fields without "tab" keep their place; sorted() is stable.
+        order = sorted(range(len(fields)), key=lambda i: fields[i].get('tab', i))
+        tab_order = tuple(order) + (len(fields), len(fields) + 1)  # The buttons go last.
+        tab_index = [0] * len(tab_order)
+        for position, slot in enumerate(tab_order):
+            tab_index[slot] = position
+
+        self._set(fields=tuple(compiled), rows=tuple(rows), tab_order=tab_order, tab_index=tuple(tab_index),
+                  index=MappingProxyType({field.name: i for i, field in enumerate(compiled)}),
+                  label_width=max(len(field.label) for field in compiled),
+                  value_width=max(field.length for field in compiled))
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __getitem__(self, i):
+        return self.fields[i]
+
+    def values(self, values: dict = None) -> list:
+        """Initial values of the fields.
+
+        Args:
+            values (dict): Values by field name, over the ones of the fields. None for none.
+
+        Returns:
+            list: A value per field.
+        """
+        values = values or {}
+        return [values.get(field.name, field.value) for field in self.fields]
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+#
+# CurTools - Fuzzy matcher
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+import heapq
+import itertools
+import re
+import threading
+from typing import Callable, Iterable, List
+
+# Score of every matched char, and bonus for a match at the start of a word.
+_SCORE_MATCH = 16
+_BONUS_BOUNDARY = 10
+_BOUNDARIES = frozenset(" /\\_-.:")
+
+# The ranking key packs -score, length and index in an int, so sorting
+# millions of them is cheap.
+_INDEX_BITS = 28
+_LENGTH_BITS = 16
+
+
+class Matcher:
+    """Fuzzy (fzf style) matcher over a list of candidates.
+
+    The candidates can come from any iterable, even a slow generator: a
+    thread reads them while the ones already there are matched. Matching
+    runs in a worker thread, a chunk at a time, and the matches stream in
+    as they're found. A pattern that extends the previous one only looks
+    at the previous matches (plus the candidates the previous search had
+    not reached yet).
+
+    A pattern matches if its chars are in the candidate in that order. It's
+    case sensitive only if it has uppercase chars. Tighter matches, and
+    matches at the start of a word, rank better.
+    """
+
+    def __init__(self, candidates: Iterable, key: Callable = str, chunk_size: int = 4096,
+                 cache_size: int = 16):
+        """Starts reading the candidates.
+
+        Args:
+            candidates (Iterable): Candidates (any object).
+            key (Callable): Text of a candidate, the one matched and shown.
+            chunk_size (int): Candidates matched at a time by the worker.
+            cache_size (int): Results kept for patterns searched before
+                (going back with backspace is free).
+        """
+        self.items = []
+        self.texts = []
+        self.key = key
+        self.chunk_size = chunk_size
+        self.cache_size = cache_size
+
+        self._cond = threading.Condition()
+        self._fed = False
+        self._closed = False
+
+        self._pattern = ""
+        self._job = 0
+        self._runs = []     # sorted runs of the keys of the matches, longest first
+        self._scanned = 0   # candidates looked at by the current search
+        self._base = None   # previous matches to be looked at
+        self._base_pos = 0
+        self._busy = False
+        self._cache = {}    # pattern -> (runs, scanned)
+
+        self._feeder = threading.Thread(target=self._feed, args=(iter(candidates),), daemon=True)
+        self._feeder.start()
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+
+    def close(self):
+        """Stops the threads."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def pattern(self) -> str:
+        """Pattern searched."""
+        return self._pattern
+
+    @property
+    def running(self) -> bool:
+        """True while candidates are arriving or being matched."""
+        return not self._fed or self._busy
+
+    def search(self, pattern: str):
+        """Starts searching a pattern. The previous search is dropped.
+
+        Args:
+            pattern (str): Pattern. Empty matches everything, in order.
+        """
+        with self._cond:
+            old = self._pattern
+            if pattern == old:
+                return
+            if old and self._base is None:
+                self._remember(old)
+
+            self._job += 1
+            self._pattern = pattern
+            cached = self._cache.pop(pattern, None)
+            base = None
+            if not pattern:
+                self._runs, self._scanned = [], len(self.texts)
+            elif cached is not None:
+                self._runs, self._scanned = cached
+            elif old and _narrows(pattern, old):
+                # Only the previous matches can match, plus what it hadn't looked at.
+                base = list(itertools.chain.from_iterable(self._runs))
+                if self._base is not None:
+                    base += self._base[self._base_pos:]
+                self._runs = []
+            else:
+                self._runs, self._scanned = [], 0
+            self._base, self._base_pos = base or None, 0
+            self._busy = True
+            self._cond.notify_all()
+
+    def match_count(self) -> int:
+        """Matches found so far."""
+        if not self._pattern:
+            return len(self.texts)
+        return sum(map(len, self._runs))
+
+    def results(self, start: int, count: int) -> List[int]:
+        """Indexes of a range of the matches, best first.
+
+        Args:
+            start (int): First match (from 0).
+            count (int): Number of matches.
+
+        Returns:
+            List[int]: Indexes of the candidates (in items and texts).
+        """
+        if not self._pattern:
+            return list(range(start, min(start + count, len(self.texts))))
+        with self._cond:
+            runs = list(self._runs)
+        # Runs are never changed once stored, only replaced.
+        if len(runs) == 1:
+            keys = runs[0][start:start + count]
+        else:
+            keys = itertools.islice(heapq.merge(*runs), start, start + count)
+        mask = (1 << _INDEX_BITS) - 1
+        return [k & mask for k in keys]
+
+    def positions(self, index: int) -> List[int]:
+        """Positions of the pattern chars in a candidate, to highlight them.
+
+        Args:
+            index (int): Index of the candidate.
+
+        Returns:
+            List[int]: The positions, empty if it doesn't match.
+        """
+        pattern = self._pattern
+        if not pattern:
+            return []
+        m = _compile(pattern).search(self.texts[index])
+        return [m.start(g) for g in range(1, len(pattern) + 1)] if m else []
+
+    def _remember(self, pattern: str):
+        """INTERNAL - Caches the results of a search (if it wasn't over, it goes on from there)."""
+        self._cache[pattern] = (self._runs, self._scanned)
+        while len(self._cache) > self.cache_size:
+            del self._cache[next(iter(self._cache))]
+
+    def _feed(self, it):
+        """INTERNAL - Reads the candidates."""
+        key = self.key
+        batch = []
+        try:
+            for item in it:
+                batch.append(item)
+                if len(batch) >= self.chunk_size:
+                    self._add(batch, key)
+                    batch = []
+                if self._closed:
+                    return
+            self._add(batch, key)
+        finally:
+            with self._cond:
+                self._fed = True
+                self._cond.notify_all()
+
+    def _add(self, batch: list, key: Callable):
+        """INTERNAL - Adds read candidates."""
+        texts = list(map(key, batch))
+        with self._cond:
+            self.items.extend(batch)
+            self.texts.extend(texts)
+            self._cond.notify_all()
+
+    def _work(self):
+        """INTERNAL - Worker: matches the current pattern, a chunk at a time.
+
+        The cursors move when the matches of a chunk are stored, so a search
+        that starts meanwhile sees consistent results.
+        """
+        mask = (1 << _INDEX_BITS) - 1
+        while True:
+            with self._cond:
+                while not self._closed and not self._has_work():
+                    self._busy = False
+                    self._cond.wait()
+                if self._closed:
+                    return
+                self._busy = True
+                job, pattern, base = self._job, self._pattern, self._base
+                if base is not None:  # Previous matches first.
+                    start = self._base_pos
+                    ids = [k & mask for k in base[start:start + self.chunk_size]]
+                else:
+                    start = self._scanned
+                    ids = range(start, min(start + self.chunk_size, len(self.texts)))
+                texts = self.texts
+
+            found = _match(pattern, texts, ids)
+
+            found.sort()
+            with self._cond:
+                if job != self._job:
+                    continue
+                runs = self._runs
+                if found:
+                    runs.append(found)
+                if base is None:
+                    self._scanned = start + len(ids)
+                else:
+                    self._base_pos = start + len(ids)
+                    if self._base_pos >= len(base):
+                        self._base = None
+
+            self._merge(runs)
+
+    def _merge(self, runs: list):
+        """INTERNAL - Merges the last runs while the one before isn't much longer.
+
+        Runs keep halving in size, so there are few of them, and every key
+        goes through a few merges in all. The merge is done outside the lock.
+        """
+        while True:
+            with self._cond:
+                if runs is not self._runs or len(runs) < 2 or len(runs[-2]) > 2 * len(runs[-1]):
+                    return
+                a, b = runs[-2], runs[-1]
+            merged = a + b
+            merged.sort()  # Two sorted runs: Timsort merges them.
+            with self._cond:
+                if runs is not self._runs or len(runs) < 2 or runs[-2] is not a or runs[-1] is not b:
+                    return
+                runs[-2:] = [merged]
+
+    def _has_work(self) -> bool:
+        """INTERNAL - True if the current search has candidates left."""
+        if not self._pattern:
+            return False
+        return self._base is not None or self._scanned < len(self.texts)
+
+
+def _narrows(pattern: str, old: str) -> bool:
+    """INTERNAL - Tells if every match of pattern matches old too.
+
+    It does if old is a subsequence of pattern (if old has uppercase chars,
+    so does pattern, and both are case sensitive).
+    """
+    chars = iter(pattern)
+    return all(c in chars for c in old)
+
+
+def _compile(pattern: str) -> re.Pattern:
+    """INTERNAL - Regex finding the pattern chars in order (compiled once)."""
+    regex = _regex_cache.get(pattern)
+    if regex is None:
+        parts = [f"({re.escape(c)})" for c in pattern]
+        flags = 0 if any(c.isupper() for c in pattern) else re.IGNORECASE
+        regex = re.compile(".*?".join(parts), flags | re.DOTALL)
+        if len(_regex_cache) > 256:
+            _regex_cache.clear()
+        _regex_cache[pattern] = regex
+    return regex
+
+
+_regex_cache = {}
+
+
+def _match(pattern: str, texts: List[str], ids) -> List[int]:
+    """INTERNAL - Ranking keys of the candidates that match.
+
+    The score is worked out of the span of the match (the regex finds the
+    tightest one from the leftmost start, so consecutive chars score
+    better) plus a bonus if it starts a word: the per match work stays in C.
+    """
+    search = _compile(pattern).search
+    base = (1 << 20) - _SCORE_MATCH * len(pattern) - len(pattern)
+    shift = _LENGTH_BITS + _INDEX_BITS
+    top = (1 << _LENGTH_BITS) - 1
+    boundaries = _BOUNDARIES
+    keys = []
+    append = keys.append
+    for i in ids:
+        text = texts[i]
+        m = search(text)
+        if m is None:
+            continue
+        start, end = m.span()
+        rank = base + end - start  # (1 << 20) - score
+        if start == 0 or text[start - 1] in boundaries:
+            rank -= _BONUS_BOUNDARY
+        length = len(text)
+        append(((rank << shift) | ((length if length < top else top) << _INDEX_BITS) | i))
+    return keys
+
+
+def score(pattern: str, text: str) -> int:
+    """Score of a text for a pattern.
+
+    Args:
+        pattern (str): Pattern.
+        text (str): Text.
+
+    Returns:
+        int: The score (higher is better), None if it doesn't match.
+    """
+    keys = _match(pattern, [text], [0])
+    if not keys:
+        return None
+    return (1 << 20) - (keys[0] >> (_LENGTH_BITS + _INDEX_BITS))
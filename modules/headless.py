@@ -0,0 +1,672 @@
+#!/usr/bin/env python3
+#
+# CurTools - Headless backend
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+import asyncio
+import collections
+import curses
+import curses.panel
+import weakref
+from typing import Iterable, List
+
+import modules.eventloop as eventloop
+
+# VT100 line drawing chars (the ACS_* constants) and what they look like.
+_ACS = {
+    'ULCORNER': ('l', '┌'), 'LLCORNER': ('m', '└'), 'URCORNER': ('k', '┐'), 'LRCORNER': ('j', '┘'),
+    'LTEE': ('t', '├'), 'RTEE': ('u', '┤'), 'BTEE': ('v', '┴'), 'TTEE': ('w', '┬'),
+    'HLINE': ('q', '─'), 'VLINE': ('x', '│'), 'PLUS': ('n', '┼'), 'S1': ('o', '⎺'),
+    'S9': ('s', '⎽'), 'DIAMOND': ('`', '◆'), 'CKBOARD': ('a', '▒'), 'DEGREE': ('f', '°'),
+    'PLMINUS': ('g', '±'), 'BULLET': ('~', '·'), 'LARROW': (',', '←'), 'RARROW': ('+', '→'),
+    'DARROW': ('.', '↓'), 'UARROW': ('-', '↑'), 'BOARD': ('h', '#'), 'LANTERN': ('i', '␋'),
+    'BLOCK': ('0', '█'),
+}
+_ALTCHARS = {ord(code): char for code, char in _ACS.values()}
+
+# Names getkey() gives to the special keys.
+_KEY_NAMES = {}
+for _name, _value in vars(curses).items():
+    if _name.startswith('KEY_') and isinstance(_value, int):
+        _KEY_NAMES.setdefault(_value, _name)
+
+_UNSET = object()
+_PAUSE = object()  # Between the scripted keys: see Backend.feed().
+
+
+class KeysExhausted(EOFError):
+    """A widget waits for a key and the script has none left."""
+
+
+class Backend:
+    """Virtual screen to run the widgets without a terminal.
+
+    Once installed (curses_init() does it), the curses functions the widgets
+    use (newwin(), color_pair(), doupdate(), the panels...) work on windows
+    kept in memory, as a grid of cells, and the keys come from a scripted
+    queue: widgets run at full speed, with no TTY.
+
+        backend = headless.Backend(80, 25, keys=["/foo", curses.KEY_DOWN, "\\n"])
+        s = cur_tools.curses_init(None, backend)
+        choice = cur_tools.vertical_menu(s, choices, 1, 0)
+        print(backend.text())
+
+    A widget waiting for a key when the queue is empty gets KeysExhausted.
+    """
+
+    def __init__(self, cols: int = 80, lines: int = 25, keys: Iterable = ()):
+        """Creates the virtual screen (blank).
+
+        Args:
+            cols (int): Screen width.
+            lines (int): Screen height.
+            keys (Iterable): Keys: ints (curses.KEY_*) or strings (a key per char).
+        """
+        self.cols = cols
+        self.lines = lines
+        self.keys = collections.deque()
+        self.frames = 0
+        self.cursor = (0, 0)
+        self.cursor_visibility = 1
+        self.pairs = {0: (curses.COLOR_WHITE, curses.COLOR_BLACK)}
+        self.feed(*keys)
+
+        self._chars = [[" "] * cols for _ in range(lines)]  # What's on the screen.
+        self._attrs = [[0] * cols for _ in range(lines)]
+        self._base = Window(self, lines, cols, 0, 0)        # Windows refreshed out of the panels.
+        self._panels = []                                    # Weak refs, bottom first.
+        self._saved = None
+        self.stdscr = Window(self, lines, cols, 0, 0)
+
+    def feed(self, *keys):
+        """Adds keys to the script.
+
+        Every key is typed after a pause (long enough for ESC to be taken as
+        ESC, and for a widget to draw a frame), but the chars of a string go
+        all at once, as a burst: a held down key, or an escape sequence
+        ("\\x1b[B" * 1000 is the down arrow held down).
+
+        Args:
+            keys: ints (curses.KEY_*) or strings (a key per char).
+        """
+        for key in keys:
+            if self.keys:
+                self.keys.append(_PAUSE)
+            if isinstance(key, str):
+                self.keys.extend(map(ord, key))
+            else:
+                self.keys.append(key)
+
+    def install(self) -> 'Window':
+        """Puts the virtual screen in place of the terminal.
+
+        Returns:
+            Window: The screen window (stdscr).
+        """
+        if self._saved is None:
+            patches = self._patches()
+            self._saved = {target: getattr(target[0], target[1], _UNSET) for target in patches}
+            for (module, name), value in patches.items():
+                setattr(module, name, value)
+            eventloop.set_key_source(self)
+        return self.stdscr
+
+    def uninstall(self):
+        """Gives the terminal back to curses."""
+        if self._saved is None:
+            return
+        for (module, name), value in self._saved.items():
+            if value is _UNSET:
+                delattr(module, name)
+            else:
+                setattr(module, name, value)
+        self._saved = None
+        eventloop.set_key_source(None)
+
+    async def wait(self, timeout: float = None) -> bool:
+        """Waits for a key, as eventloop does for the terminal.
+
+        Args:
+            timeout (float): Seconds to wait. None waits forever.
+
+        Returns:
+            bool: False if the time is up.
+
+        Raises:
+            KeysExhausted: No key left, and no timeout.
+        """
+        if self.keys and self.keys[0] is _PAUSE:
+            self.keys.popleft()
+            if timeout is not None:  # The pause outlasts it.
+                return False
+        if self.keys:
+            return True
+        if timeout is None:
+            raise KeysExhausted("No scripted keys left")
+        await asyncio.sleep(timeout)
+        return bool(self.keys)
+
+    @property
+    def display(self) -> List[str]:
+        """Lines on the screen, as of the last frame."""
+        return ["".join(row) for row in self._chars]
+
+    def text(self) -> str:
+        """Screen as of the last frame, a line per row."""
+        return "\n".join(line.rstrip() for line in self.display)
+
+    def cell(self, y: int, x: int) -> tuple:
+        """Char and attributes of a cell, as of the last frame.
+
+        Returns:
+            tuple[str, int]: The char and its attributes (with the color pair).
+        """
+        return self._chars[y][x], self._attrs[y][x]
+
+    def _patches(self) -> dict:
+        """INTERNAL - curses functions and constants replaced while installed."""
+        patches = {
+            (curses, 'initscr'): lambda: self.stdscr,
+            (curses, 'endwin'): self.uninstall,
+            (curses, 'isendwin'): lambda: self._saved is None,
+            (curses, 'newwin'): self._newwin,
+            (curses, 'doupdate'): self._doupdate,
+            (curses, 'curs_set'): self._curs_set,
+            (curses, 'init_pair'): self._init_pair,
+            (curses, 'color_pair'): lambda n: (n << 8) & curses.A_COLOR,
+            (curses, 'pair_number'): lambda attr: (attr & curses.A_COLOR) >> 8,
+            (curses, 'has_colors'): lambda: True,
+            (curses, 'beep'): lambda: None,
+            (curses, 'flash'): lambda: None,
+            (curses, 'napms'): lambda ms: 0,
+            (curses, 'flushinp'): self.keys.clear,
+            (curses, 'LINES'): self.lines,
+            (curses, 'COLS'): self.cols,
+            (curses, 'COLORS'): 8,
+            (curses, 'COLOR_PAIRS'): 64,
+            (curses.panel, 'new_panel'): self._new_panel,
+            (curses.panel, 'update_panels'): lambda: None,
+        }
+        for name in ('cbreak', 'nocbreak', 'echo', 'noecho', 'raw', 'noraw', 'start_color',
+                     'use_default_colors', 'nl', 'nonl'):
+            patches[(curses, name)] = lambda *args: None
+        for name, (code, _) in _ACS.items():
+            patches[(curses, 'ACS_' + name)] = ord(code) | curses.A_ALTCHARSET
+        return patches
+
+    def _newwin(self, *args) -> 'Window':
+        """INTERNAL - curses.newwin(): newwin(nlines, ncols[, begin_y, begin_x])."""
+        nlines, ncols, y, x = args if len(args) == 4 else args + (0, 0)
+        nlines = nlines or self.lines - y
+        ncols = ncols or self.cols - x
+        if y < 0 or x < 0 or nlines <= 0 or ncols <= 0 or y + nlines > self.lines or x + ncols > self.cols:
+            raise curses.error("curses function returned NULL")
+        return Window(self, nlines, ncols, y, x)
+
+    def _new_panel(self, w: 'Window') -> 'Panel':
+        """INTERNAL - curses.panel.new_panel()."""
+        panel = Panel(self, w)
+        w._panel = True
+        self._panels.append(weakref.ref(panel))
+        return panel
+
+    def _curs_set(self, visibility: int) -> int:
+        """INTERNAL - curses.curs_set()."""
+        old, self.cursor_visibility = self.cursor_visibility, visibility
+        return old
+
+    def _init_pair(self, pair: int, fg: int, bg: int):
+        """INTERNAL - curses.init_pair()."""
+        self.pairs[pair] = (fg, bg)
+
+    def _doupdate(self):
+        """INTERNAL - curses.doupdate(): the panels go on top of the rest."""
+        self._panels = [ref for ref in self._panels if ref() is not None]
+        for y in range(self.lines):
+            self._chars[y][:] = self._base._chars[y]
+            self._attrs[y][:] = self._base._attrs[y]
+        for ref in self._panels:
+            panel = ref()
+            if panel is not None and not panel._hidden:
+                self._copy(panel._window, range(panel._window._height))
+        self.frames += 1
+
+    def _copy(self, w: 'Window', rows, chars=None, attrs=None):
+        """INTERNAL - Copies rows of a window into a screen grid (clipped)."""
+        chars = self._chars if chars is None else chars
+        attrs = self._attrs if attrs is None else attrs
+        left = max(w._x, 0)
+        right = min(w._x + w._width, self.cols)
+        if left >= right:
+            return
+        for row in rows:
+            y = w._y + row
+            if 0 <= y < self.lines:
+                chars[y][left:right] = w._chars[row][left - w._x:right - w._x]
+                attrs[y][left:right] = w._attrs[row][left - w._x:right - w._x]
+
+
+class Panel:
+    """A curses.panel panel, on the virtual screen."""
+
+    def __init__(self, backend: Backend, w: 'Window'):
+        self._backend = backend
+        self._window = w
+        self._hidden = False
+
+    def window(self) -> 'Window':
+        return self._window
+
+    def hide(self):
+        self._hidden = True
+
+    def hidden(self) -> bool:
+        return self._hidden
+
+    def show(self):
+        self._hidden = False
+        self.top()
+
+    def top(self):
+        panels = self._backend._panels
+        for ref in panels:
+            if ref() is self:
+                panels.remove(ref)
+                panels.append(ref)
+                return
+
+    def bottom(self):
+        panels = self._backend._panels
+        for ref in panels:
+            if ref() is self:
+                panels.remove(ref)
+                panels.insert(0, ref)
+                return
+
+    def move(self, y: int, x: int):
+        self._window.mvwin(y, x)
+
+
+class Window:
+    """A curses window on the virtual screen: a grid of cells.
+
+    Writing, moving, background and attributes, borders, scrolling,
+    touched lines and the input calls behave as their curses counterparts
+    (the same errors too), with the keys taken from the script.
+    """
+
+    def __init__(self, backend: Backend, height: int, width: int, y: int, x: int):
+        self._backend = backend
+        self._height = height
+        self._width = width
+        self._y = y
+        self._x = x
+        self._cy = 0
+        self._cx = 0
+        self._bkgd_char = " "
+        self._bkgd_attr = 0
+        self._attr = 0
+        self._chars = [[" "] * width for _ in range(height)]
+        self._attrs = [[0] * width for _ in range(height)]
+        self._touched = [True] * height
+        self._top = 0
+        self._bottom = height - 1
+        self._scroll = False
+        self._delay = -1
+        self._keypad = False
+        self._panel = False
+
+    # Geometry.
+
+    def getmaxyx(self) -> tuple:
+        return self._height, self._width
+
+    def getbegyx(self) -> tuple:
+        return self._y, self._x
+
+    def getyx(self) -> tuple:
+        return self._cy, self._cx
+
+    def move(self, y: int, x: int):
+        if not (0 <= y < self._height and 0 <= x < self._width):
+            raise curses.error("wmove() returned ERR")
+        self._cy, self._cx = y, x
+
+    def mvwin(self, y: int, x: int):
+        self._y, self._x = y, x
+
+    # Settings.
+
+    def keypad(self, flag: bool):
+        self._keypad = bool(flag)
+
+    def nodelay(self, flag: bool):
+        self._delay = 0 if flag else -1
+
+    def timeout(self, delay: int):
+        self._delay = delay
+
+    def scrollok(self, flag: bool):
+        self._scroll = bool(flag)
+
+    def setscrreg(self, top: int, bottom: int):
+        if not (0 <= top <= bottom < self._height):
+            raise curses.error("wsetscrreg() returned ERR")
+        self._top, self._bottom = top, bottom
+
+    def idlok(self, flag: bool):
+        pass
+
+    def leaveok(self, flag: bool):
+        pass
+
+    def clearok(self, flag: bool):
+        pass
+
+    def immedok(self, flag: bool):
+        pass
+
+    # Attributes and background.
+
+    def attron(self, attr: int):
+        self._attr |= attr
+
+    def attroff(self, attr: int):
+        self._attr &= ~attr
+
+    def attrset(self, attr: int):
+        self._attr = attr
+
+    def bkgdset(self, ch, attr: int = 0):
+        self._bkgd_char, self._bkgd_attr = _char_attr(ch, attr)
+
+    def bkgd(self, ch, attr: int = 0):
+        """Sets the background and applies it to every cell."""
+        old_char, old_attr = self._bkgd_char, self._bkgd_attr
+        self.bkgdset(ch, attr)
+        new_char, new_attr = self._bkgd_char, self._bkgd_attr
+        old_color, new_color = old_attr & curses.A_COLOR, new_attr & curses.A_COLOR
+        keep = ~(old_attr & ~curses.A_COLOR) & ~curses.A_COLOR
+        for chars, attrs in zip(self._chars, self._attrs):
+            for i, a in enumerate(attrs):
+                color = a & curses.A_COLOR
+                attrs[i] = (a & keep) | (new_attr & ~curses.A_COLOR) | (new_color if color == old_color else color)
+                if chars[i] == old_char:
+                    chars[i] = new_char
+        self.touchwin()
+
+    def _render(self, attr: int) -> int:
+        """INTERNAL - Attributes of a written char: its own, the window ones and the background."""
+        attr |= self._attr
+        if attr & curses.A_COLOR:
+            return attr | (self._bkgd_attr & ~curses.A_COLOR)
+        return attr | self._bkgd_attr
+
+    # Output.
+
+    def addstr(self, *args):
+        """addstr([y, x,] str[, attr])"""
+        y, x, text, attr = _text_args(args)
+        if y is not None:
+            self.move(y, x)
+        self._put(text, self._render(attr))
+
+    def addnstr(self, *args):
+        """addnstr([y, x,] str, n[, attr])"""
+        if isinstance(args[0], (str, bytes)):
+            args = (None, None) + args
+        y, x, text, n, *attr = args
+        self.addstr(*((y, x) if y is not None else ()), text[:n], *attr)
+
+    def addch(self, *args):
+        """addch([y, x,] ch[, attr])"""
+        if len(args) >= 3:
+            self.move(args[0], args[1])
+            args = args[2:]
+        char, attr = _char_attr(*args)
+        self._put(char, self._render(attr))
+
+    def insstr(self, *args):
+        """insstr([y, x,] str[, attr]): the rest of the line moves right, the cursor stays."""
+        y, x, text, attr = _text_args(args)
+        if y is not None:
+            self.move(y, x)
+        y, x = self._cy, self._cx
+        n = min(len(text), self._width - x)
+        chars, attrs = self._chars[y], self._attrs[y]
+        chars[x:] = list(text[:n]) + chars[x:self._width - n]
+        attrs[x:] = [self._render(attr)] * n + attrs[x:self._width - n]
+        self._touched[y] = True
+
+    def hline(self, *args):
+        """hline([y, x,] ch, n)"""
+        if len(args) == 4:
+            self.move(args[0], args[1])
+        char, attr = _char_attr(args[-2])
+        n = min(args[-1], self._width - self._cx)
+        row = self._cy
+        self._chars[row][self._cx:self._cx + n] = [char] * n
+        self._attrs[row][self._cx:self._cx + n] = [self._render(attr)] * n
+        self._touched[row] = True
+
+    def vline(self, *args):
+        """vline([y, x,] ch, n)"""
+        if len(args) == 4:
+            self.move(args[0], args[1])
+        char, attr = _char_attr(args[-2])
+        attr = self._render(attr)
+        for row in range(self._cy, min(self._cy + args[-1], self._height)):
+            self._chars[row][self._cx] = char
+            self._attrs[row][self._cx] = attr
+            self._touched[row] = True
+
+    def border(self, ls=0, rs=0, ts=0, bs=0, tl=0, tr=0, bl=0, br=0):
+        acs = {name: ord(code) | curses.A_ALTCHARSET for name, (code, _) in _ACS.items()}
+        ls, rs = ls or acs['VLINE'], rs or acs['VLINE']
+        ts, bs = ts or acs['HLINE'], bs or acs['HLINE']
+        tl, tr = tl or acs['ULCORNER'], tr or acs['URCORNER']
+        bl, br = bl or acs['LLCORNER'], br or acs['LRCORNER']
+        h, w = self._height, self._width
+        self.hline(0, 1, ts, w - 2)
+        self.hline(h - 1, 1, bs, w - 2)
+        self.vline(1, 0, ls, h - 2)
+        self.vline(1, w - 1, rs, h - 2)
+        for y, x, ch in ((0, 0, tl), (0, w - 1, tr), (h - 1, 0, bl), (h - 1, w - 1, br)):
+            char, attr = _char_attr(ch)
+            self._chars[y][x] = char
+            self._attrs[y][x] = self._render(attr)
+        self._cy = self._cx = 0
+
+    def box(self, vertch=0, horch=0):
+        self.border(vertch, vertch, horch, horch)
+
+    def _put(self, text: str, attr: int):
+        """INTERNAL - Writes at the cursor, wrapping and scrolling as curses does."""
+        y, x = self._cy, self._cx
+        width = self._width
+        if "\n" not in text and "\t" not in text and x + len(text) < width:
+            self._chars[y][x:x + len(text)] = text
+            self._attrs[y][x:x + len(text)] = [attr] * len(text)
+            self._cx = x + len(text)
+            self._touched[y] = True
+            return
+
+        for char in text:
+            if char == "\t":
+                self._put(" " * (8 - x % 8), attr)
+                y, x = self._cy, self._cx
+                continue
+            if char == "\n":
+                self._cx = x
+                self.clrtoeol()
+            else:
+                self._chars[y][x] = char
+                self._attrs[y][x] = attr
+                self._touched[y] = True
+                x += 1
+                if x < width:
+                    continue
+                x -= 1  # The last cell is written even if curses returns an error.
+            self._cy, self._cx = y, x
+            y, x = self._newline(y)
+        self._cy, self._cx = y, x
+
+    def _newline(self, y: int) -> tuple:
+        """INTERNAL - Next line for the cursor (the region scrolls if it's at the bottom).
+
+        Raises:
+            curses.error: There is no next line.
+        """
+        if y == self._bottom and self._scroll:
+            self._shift(1)
+            return y, 0
+        if y == self._bottom or y == self._height - 1:
+            raise curses.error("addwstr() returned ERR")
+        return y + 1, 0
+
+    def scroll(self, lines: int = 1):
+        if not self._scroll:
+            raise curses.error("scroll() returned ERR")
+        self._shift(lines)
+
+    def _shift(self, lines: int):
+        """INTERNAL - Scrolls the region up (lines > 0) or down."""
+        top, bottom = self._top, self._bottom + 1
+        blank = [self._bkgd_char] * self._width
+        attr = [self._bkgd_attr] * self._width
+        for grid, fill in ((self._chars, blank), (self._attrs, attr)):
+            region = grid[top:bottom]
+            n = max(-len(region), min(lines, len(region)))
+            if n >= 0:
+                region = region[n:] + [fill[:] for _ in range(n)]
+            else:
+                region = [fill[:] for _ in range(-n)] + region[:n]
+            grid[top:bottom] = region
+        self.touchline(top, bottom - top)
+
+    def erase(self):
+        for y in range(self._height):
+            self._chars[y][:] = [self._bkgd_char] * self._width
+            self._attrs[y][:] = [self._bkgd_attr] * self._width
+        self._cy = self._cx = 0
+        self.touchwin()
+
+    def clear(self):
+        self.erase()
+
+    def clrtoeol(self):
+        y, x = self._cy, self._cx
+        self._chars[y][x:] = [self._bkgd_char] * (self._width - x)
+        self._attrs[y][x:] = [self._bkgd_attr] * (self._width - x)
+        self._touched[y] = True
+
+    def clrtobot(self):
+        self.clrtoeol()
+        for y in range(self._cy + 1, self._height):
+            self._chars[y][:] = [self._bkgd_char] * self._width
+            self._attrs[y][:] = [self._bkgd_attr] * self._width
+            self._touched[y] = True
+
+    # Reading back.
+
+    def inch(self, *args) -> int:
+        y, x = args if args else (self._cy, self._cx)
+        char = self._chars[y][x]
+        return (ord(char) if ord(char) <= curses.A_CHARTEXT else ord("?")) | self._attrs[y][x]
+
+    def instr(self, *args) -> bytes:
+        """instr([y, x,] [n]): the text from there (bytes, as curses)."""
+        if len(args) >= 2:
+            self.move(args[0], args[1])
+            args = args[2:]
+        n = args[0] if args else self._width
+        return "".join(self._chars[self._cy][self._cx:self._cx + n]).encode()
+
+    # Refresh.
+
+    def touchwin(self):
+        self._touched = [True] * self._height
+
+    def untouchwin(self):
+        self._touched = [False] * self._height
+
+    def redrawwin(self):
+        self.touchwin()
+
+    def touchline(self, start: int, count: int, changed: bool = True):
+        for y in range(start, min(start + count, self._height)):
+            self._touched[y] = changed
+
+    def is_linetouched(self, line: int) -> bool:
+        if not 0 <= line < self._height:
+            raise curses.error("is_linetouched: line number outside of boundaries")
+        return self._touched[line]
+
+    def is_wintouched(self) -> bool:
+        return any(self._touched)
+
+    def noutrefresh(self):
+        backend = self._backend
+        if not self._panel:  # The panels are put on top by doupdate().
+            rows = [y for y, touched in enumerate(self._touched) if touched]
+            backend._copy(self, rows, backend._base._chars, backend._base._attrs)
+        backend.cursor = (self._y + self._cy, self._x + self._cx)
+        self.untouchwin()
+
+    def refresh(self):
+        self.noutrefresh()
+        self._backend._doupdate()
+
+    # Input.
+
+    def getch(self, *args) -> int:
+        if len(args) == 2:
+            self.move(*args)
+        keys = self._backend.keys
+        if keys and keys[0] is _PAUSE:
+            if self._delay >= 0:  # The next key isn't typed yet.
+                return -1
+            keys.popleft()
+        if keys:
+            return keys.popleft()
+        if self._delay >= 0:
+            return -1
+        raise KeysExhausted("No scripted keys left")
+
+    def getkey(self, *args) -> str:
+        key = self.getch(*args)
+        if key == -1:
+            raise curses.error("no input")
+        return chr(key) if key < 256 else _KEY_NAMES.get(key, str(key))
+
+    def get_wch(self, *args):
+        key = self.getch(*args)
+        if key == -1:
+            raise curses.error("no input")
+        return chr(key) if key < 256 else key
+
+
+def _text_args(args: tuple) -> tuple:
+    """INTERNAL - (y, x, text, attr) out of the args of addstr() and friends."""
+    if isinstance(args[0], (str, bytes)):
+        args = (None, None) + tuple(args)
+    y, x, text, *attr = args
+    if isinstance(text, bytes):
+        text = text.decode()
+    return y, x, text, attr[0] if attr else 0
+
+
+def _char_attr(ch, attr: int = 0) -> tuple:
+    """INTERNAL - (char, attributes) out of a curses char (str, or int with attributes)."""
+    if isinstance(ch, (str, bytes)):
+        ch = ch.decode() if isinstance(ch, bytes) else ch
+        return (ch or " ")[0], attr
+    attr |= ch & curses.A_ATTRIBUTES
+    code = ch & curses.A_CHARTEXT
+    if attr & curses.A_ALTCHARSET:
+        attr &= ~curses.A_ALTCHARSET
+        return _ALTCHARS.get(code, chr(code)), attr
+    return chr(code) if code else " ", attr
+
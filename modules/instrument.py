@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+#
+# CurTools - Render instrumentation
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+import atexit
+import curses
+import json
+import os
+import time
+
+# Off unless enable() is called (or CURTOOLS_STATS is set when curses_init()
+# runs). While off, the windows are not wrapped and the hooks in eventloop
+# and screen are a flag check.
+enabled = False
+overlay = False
+
+# Key that shows/hides the overlay in the status bar (it never gets to the widget).
+OVERLAY_KEYS = (curses.KEY_F12,)
+
+# Window calls counted, and the ones whose text is counted as bytes written.
+_COUNTED = ("addstr", "addnstr", "addch", "insstr", "hline", "vline", "box", "border",
+            "bkgd", "erase", "clear", "clrtoeol", "clrtobot", "refresh", "noutrefresh")
+_TEXT = frozenset(("addstr", "addnstr", "insstr"))
+
+_stats = None
+_screen = None      # Window the overlay is drawn on.
+_dump_path = None
+_paused = False     # True while the overlay is drawn (it's not counted).
+
+
+class Histogram:
+    """Fixed memory histogram of non negative ints (i.e. microseconds).
+
+    Values go in power of two buckets, so it never grows, and percentiles
+    are worked out within a factor of two.
+    """
+
+    BUCKETS = 40
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def add(self, value: int):
+        """Adds a value.
+
+        Args:
+            value (int): The value (negative ones count as 0).
+        """
+        value = max(int(value), 0)
+        self.counts[min(value.bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+
+    def percentile(self, p: float) -> int:
+        """Upper bound of the bucket holding a percentile.
+
+        Args:
+            p (float): Percentile (0 to 100).
+
+        Returns:
+            int: The value (at most the max), 0 if empty.
+        """
+        if not self.count:
+            return 0
+        rank = max(1, round(self.count * p / 100))
+        seen = 0
+        for bucket, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min((1 << bucket) - 1, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        """Summary and buckets, for the JSON dump."""
+        return {
+            "count": self.count,
+            "min": self.min or 0,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else 0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": self.counts,
+        }
+
+
+class Stats:
+    """Counters and histograms of the session."""
+
+    def __init__(self):
+        self.events = 0
+        self.frames = 0
+        self.calls = dict.fromkeys(_COUNTED, 0)
+        self.bytes = 0
+        self.event_calls = Histogram()    # Window calls per input event.
+        self.event_bytes = Histogram()    # Bytes written per input event.
+        self.flush = Histogram()          # Microseconds to send a frame.
+        self.widgets = {}                 # widget -> (handle, draw) histograms (microseconds)
+
+        self.widget = None    # Widget handling the last key.
+        self.key_time = None  # When the key got to it.
+        self.draw_time = None  # First window call after the key.
+        self.key_calls = 0
+        self.key_bytes = 0
+
+    def to_dict(self) -> dict:
+        """Everything, for the JSON dump."""
+        return {
+            "events": self.events,
+            "frames": self.frames,
+            "calls": self.calls,
+            "bytes": self.bytes,
+            "per_event": {"calls": self.event_calls.to_dict(), "bytes": self.event_bytes.to_dict()},
+            "flush_us": self.flush.to_dict(),
+            "widgets": {name: {"handle_us": handle.to_dict(), "draw_us": draw.to_dict()}
+                        for name, (handle, draw) in self.widgets.items()},
+        }
+
+
+class _Window:
+    """INTERNAL - Wraps a window and counts the calls to it."""
+
+    __slots__ = ('_window',)
+
+    def __init__(self, window):
+        object.__setattr__(self, '_window', window)
+
+    def __getattr__(self, name):
+        return getattr(self._window, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._window, name, value)
+
+
+def _counted(name: str):
+    """INTERNAL - Window method that is counted before being called."""
+    text = name in _TEXT
+
+    def method(self, *args):
+        if not _paused and _stats is not None:
+            _write(name, _text_bytes(args) if text else (1 if name == "addch" else 0))
+        return getattr(self._window, name)(*args)
+    method.__name__ = name
+    return method
+
+
+for _name in _COUNTED:
+    setattr(_Window, _name, _counted(_name))
+
+
+def _text_bytes(args: tuple) -> int:
+    """INTERNAL - Bytes of the text of addstr() and friends."""
+    for arg in args:
+        if isinstance(arg, str):
+            return len(arg.encode())
+        if isinstance(arg, bytes):
+            return len(arg)
+    return 0
+
+
+def _write(name: str, size: int):
+    """INTERNAL - Counts a window call."""
+    stats = _stats
+    stats.calls[name] += 1
+    stats.bytes += size
+    stats.key_calls += 1
+    stats.key_bytes += size
+    if stats.draw_time is None and stats.key_time is not None:
+        stats.draw_time = time.perf_counter()
+
+
+def enable(dump_path: str = None):
+    """Turns the instrumentation on. Windows opened from now on are counted.
+
+    Args:
+        dump_path (str): JSON file the stats are written to on exit. None for no dump.
+    """
+    global enabled, _stats, _dump_path
+    if _stats is None:
+        _stats = Stats()
+    enabled = True
+    if dump_path and _dump_path is None:
+        atexit.register(lambda: dump(_dump_path))
+    _dump_path = dump_path or _dump_path
+
+
+def enable_from_env():
+    """Turns the instrumentation on if CURTOOLS_STATS is set (to the JSON file to dump to)."""
+    path = os.environ.get("CURTOOLS_STATS")
+    if path and not enabled:
+        enable(path)
+
+
+def disable():
+    """Turns the instrumentation off (the stats are kept)."""
+    global enabled
+    enabled = False
+
+
+def stats() -> Stats:
+    """Stats so far (None if never enabled)."""
+    return _stats
+
+
+def reset():
+    """Starts the stats again."""
+    global _stats
+    _stats = Stats()
+
+
+def dump(path: str):
+    """Writes the stats to a JSON file.
+
+    Args:
+        path (str): File name.
+    """
+    if _stats is None:
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(_stats.to_dict(), f, indent=2)
+        f.write("\n")
+
+
+def wrap(window, is_screen: bool = False):
+    """Window whose calls are counted (the same window if it's off).
+
+    Args:
+        window (curses.window): Curses window object.
+        is_screen (bool): True for the screen: the overlay goes in its last row.
+
+    Returns:
+        curses.window: The wrapped window.
+    """
+    global _screen
+    if not enabled:
+        return window
+    if not isinstance(window, _Window):
+        window = _Window(window)
+    if is_screen:
+        _screen = window
+    return window
+
+
+def key_event(key, widget: str) -> bool:
+    """A key got to a widget (eventloop calls it).
+
+    Args:
+        key (int | str): The key.
+        widget (str): Name of the widget (the function waiting for it).
+
+    Returns:
+        bool: True if it's the overlay key (the widget never gets it).
+    """
+    global overlay
+    if key in OVERLAY_KEYS:
+        overlay = not overlay
+        return True
+    stats = _stats
+    stats.events += 1
+    stats.widget = widget
+    stats.key_time = time.perf_counter()
+    stats.draw_time = None
+    stats.key_calls = stats.key_bytes = 0
+    return False
+
+
+def waiting():
+    """A widget waits for a key: the last one has been handled (eventloop calls it).
+
+    Returns:
+        curses.window: The window with the overlay to be sent, None if it's off.
+    """
+    global _paused
+    stats = _stats
+    now = time.perf_counter()
+    if stats.key_time is not None:
+        draw_time = stats.draw_time or now
+        if stats.widget not in stats.widgets:
+            stats.widgets[stats.widget] = (Histogram(), Histogram())
+        handle, draw = stats.widgets[stats.widget]
+        handle.add((draw_time - stats.key_time) * 1e6)
+        draw.add((now - draw_time) * 1e6)
+        stats.event_calls.add(stats.key_calls)
+        stats.event_bytes.add(stats.key_bytes)
+        stats.key_time = None
+
+    if not overlay or _screen is None:
+        return None
+    _paused = True
+    try:
+        height, width = _screen.getmaxyx()
+        _screen.addstr(height - 1, 0, overlay_text()[:width - 1].ljust(width - 1), curses.A_REVERSE)
+    finally:
+        _paused = False
+    return _screen
+
+
+def frame(seconds: float):
+    """A frame was sent (screen calls it).
+
+    Args:
+        seconds (float): Time it took.
+    """
+    _stats.frames += 1
+    _stats.flush.add(seconds * 1e6)
+
+
+def overlay_text() -> str:
+    """Live numbers, as shown in the status bar."""
+    stats = _stats
+    text = (f" STATS ev {stats.events} fr {stats.frames} | calls/ev {stats.event_calls.percentile(50)}"
+            f" bytes/ev {stats.event_bytes.percentile(50)} | flush p50 {_ms(stats.flush.percentile(50))}")
+    if stats.widget in stats.widgets:
+        handle, draw = stats.widgets[stats.widget]
+        text += (f" | {stats.widget}: key p50 {_ms(handle.percentile(50))}"
+                 f" draw p50 {_ms(draw.percentile(50))} p99 {_ms(draw.percentile(99))}")
+    return text
+
+
+def _ms(us: int) -> str:
+    """INTERNAL - Microseconds as milliseconds."""
+    return f"{us / 1000:.2f}ms"
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+#
+# CurTools - Job dashboard
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+import curses
+import multiprocessing
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from curses import ascii
+from typing import Callable, List
+
+import modules.constant as const
+import modules.cur_tools as cur_tools
+import modules.eventloop as eventloop
+import modules.screen as screen
+
+# Job states.
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Queue and cancel flags of a process pool worker, set by _init_worker().
+_queue = None
+_flags = None
+
+
+class Cancelled(Exception):
+    """Raised by the report function of a job that has been cancelled."""
+
+
+class Job:
+    """A callable run by dashboard().
+
+    The callable gets a Reporter as its first argument, to tell how it
+    goes: report(done, total). The reporter raises Cancelled once the job
+    is cancelled from the dashboard, so a job should report often enough.
+    """
+
+    def __init__(self, fn: Callable, *args, name: str = None, **kwargs):
+        """Defines a job.
+
+        Args:
+            fn (Callable): Function to be run as fn(report, *args, **kwargs). It
+                has to be picklable (a module level function) for a process pool.
+            args: Positional arguments.
+            name (str): Name shown. Defaults to the function name.
+            kwargs: Keyword arguments.
+        """
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.name = name or getattr(fn, '__name__', 'job')
+        self.state = PENDING
+        self.done = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.future = None
+
+    @property
+    def fraction(self) -> float:
+        """Part of the job done, from 0 to 1."""
+        if self.state == DONE:
+            return 1.0
+        if not self.total:
+            return 0.0
+        return min(self.done / self.total, 1.0)
+
+
+class Reporter:
+    """Progress report function handed to a job.
+
+    Reports are throttled in the worker (a put every 0.1 s, or when the
+    percentage changes), so a job can call it on every item.
+    """
+
+    def __init__(self, job_id: int, reports=None, flags=None):
+        """Creates a reporter.
+
+        Args:
+            job_id (int): Index of the job.
+            reports (queue): Queue of the dashboard. None in a process pool
+                worker, where the one set by _init_worker() is used.
+            flags (bytearray): Cancel flags. None in a process pool worker.
+        """
+        self.job_id = job_id
+        self._reports = reports
+        self._flags = flags
+        self._last = 0.0
+        self._percent = -1
+
+    def __getstate__(self):
+        return self.job_id
+
+    def __setstate__(self, job_id):
+        self.__init__(job_id)
+
+    @property
+    def cancelled(self) -> bool:
+        """True once the job has been cancelled."""
+        flags = self._flags if self._flags is not None else _flags
+        return bool(flags[self.job_id])
+
+    def __call__(self, done: int, total: int = None):
+        """Reports the progress.
+
+        Args:
+            done (int): Items done.
+            total (int): Total items (None if unknown).
+
+        Raises:
+            Cancelled: The job has been cancelled.
+        """
+        if self.cancelled:
+            raise Cancelled()
+
+        now = time.monotonic()
+        percent = done * 100 // total if total else -1
+        if percent != self._percent or now - self._last >= 0.1:
+            self._percent = percent
+            self._last = now
+            reports = self._reports if self._reports is not None else _queue
+            reports.put((self.job_id, done, total))
+
+
+def _init_worker(reports, flags):
+    """INTERNAL - Process pool initializer: the queue and the flags are inherited."""
+    global _queue, _flags
+    _queue = reports
+    _flags = flags
+
+
+def _run_job(fn: Callable, report: Reporter, args: tuple, kwargs: dict):
+    """INTERNAL - Runs a job in a worker. A cancelled job returns Cancelled."""
+    try:
+        return fn(report, *args, **kwargs)
+    except Cancelled as e:
+        return e
+
+
+async def dashboard_async(s: curses.window, jobs: List[Job], processes: bool = False,
+                          workers: int = None, title: str = "Jobs",
+                          close_when_done: bool = False) -> List[Job]:
+    """Runs jobs in a pool, showing a bar for every job and one for the whole.
+
+    Up/Down select a job, C cancels it, A cancels them all, and Q (or ESC)
+    closes the dashboard once nothing is running. Workers report over a
+    queue that is drained, in batches, a few times a second: the UI never
+    waits for them.
+
+    Args:
+        s (curses.window): Curses screen object.
+        jobs (List[Job]): Jobs (or plain callables) to be run.
+        processes (bool): True for a ProcessPoolExecutor, False for a ThreadPoolExecutor.
+        workers (int): Pool size. None lets the executor decide.
+        title (str): Title of the window.
+        close_when_done (bool): True to close by itself when every job is over.
+
+    Returns:
+        List[Job]: The jobs, with their state, result and error.
+    """
+    jobs = [job if isinstance(job, Job) else Job(job) for job in jobs]
+    if processes:
+        reports = multiprocessing.Queue()
+        flags = multiprocessing.Array('b', len(jobs), lock=False)
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(reports, flags))
+        reporters = [Reporter(i) for i in range(len(jobs))]
+    else:
+        reports = queue.SimpleQueue()
+        flags = bytearray(len(jobs))
+        executor = ThreadPoolExecutor(workers)
+        reporters = [Reporter(i, reports, flags) for i in range(len(jobs))]
+
+    for job, report in zip(jobs, reporters):
+        job.future = executor.submit(_run_job, job.fn, report, job.args, job.kwargs)
+
+    mh, mw = s.getmaxyx()
+    width = min(mw - 4, 78)
+    visible = max(1, min(len(jobs), mh - 10))
+    height = visible + 6
+    w, sha = cur_tools.init_win(height, width, (mh - height) // 2, (mw - width) // 2, title)
+    w.addstr(height - 2, 2, "Up/Down C: cancel  A: cancel all  Q: close"[:width - 4],
+             curses.color_pair(const.PAIR_WINDOW_HELPER))
+
+    selected = 0
+    top = 0
+    shown = {}  # row -> text on screen
+    finished = False
+    try:
+        while True:
+            _drain(reports, jobs)
+            for job in jobs:
+                _settle(job)
+
+            # Keep the selected job on screen.
+            top = min(max(top, selected - visible + 1), selected)
+            for row in range(visible):
+                i = top + row
+                line = _job_line(jobs[i], width - 4) if i < len(jobs) else ""
+                key = (line, i == selected)
+                if shown.get(row) != key:
+                    w.addstr(row + 1, 2, line.ljust(width - 4),
+                             curses.A_REVERSE if i == selected else curses.A_NORMAL)
+                    shown[row] = key
+
+            over = sum(job.state in (DONE, FAILED, CANCELLED) for job in jobs)
+            total = sum(job.fraction for job in jobs) / max(len(jobs), 1)
+            line = _bar_line("All", total, f"{over}/{len(jobs)}", width - 4)
+            if shown.get('all') != line:
+                w.addstr(height - 3, 2, line, curses.A_BOLD)
+                shown['all'] = line
+            screen.frame_mark(w)
+
+            finished = over == len(jobs)
+            if finished and close_when_done:
+                break
+
+            key = await eventloop.getch(w, None if finished else 0.1)
+            if key == curses.KEY_DOWN:
+                selected = min(selected + 1, len(jobs) - 1)
+            elif key == curses.KEY_UP:
+                selected = max(selected - 1, 0)
+            elif key in (ord('c'), ord('C')):
+                _cancel(jobs[selected], selected, flags)
+            elif key in (ord('a'), ord('A')):
+                for i, job in enumerate(jobs):
+                    _cancel(job, i, flags)
+            elif key in (ord('q'), ord('Q'), ascii.ESC) and finished:
+                break
+    finally:
+        # Waiting for idle workers is quick, and leaves no pool thread behind.
+        executor.shutdown(wait=finished, cancel_futures=True)
+        cur_tools.end_win(w, sha)
+
+    return jobs
+
+
+def dashboard(s: curses.window, jobs: List[Job], processes: bool = False,
+              workers: int = None, title: str = "Jobs",
+              close_when_done: bool = False) -> List[Job]:
+    """Blocking version of dashboard_async()."""
+    return eventloop.run(dashboard_async(s, jobs, processes, workers, title, close_when_done))
+
+
+def _drain(reports, jobs: List[Job], batch: int = 1000):
+    """INTERNAL - Takes the pending reports, without waiting."""
+    for _ in range(batch):
+        try:
+            job_id, done, total = reports.get_nowait()
+        except queue.Empty:
+            return
+        job = jobs[job_id]
+        if job.state in (PENDING, RUNNING):
+            job.state = RUNNING
+            job.done, job.total = done, total
+
+
+def _settle(job: Job):
+    """INTERNAL - Updates the state of a job from its future."""
+    if job.state not in (PENDING, RUNNING):
+        return
+    future = job.future
+    if future.cancelled():
+        job.state = CANCELLED
+    elif future.done():
+        error = future.exception()
+        if error is not None:
+            job.state, job.error = FAILED, error
+        elif isinstance(future.result(), Cancelled):
+            job.state = CANCELLED
+        else:
+            job.state, job.result = DONE, future.result()
+    elif future.running() and job.state == PENDING:
+        job.state = RUNNING
+
+
+def _cancel(job: Job, job_id: int, flags):
+    """INTERNAL - Cancels a job: a pending one never starts, a running one stops at its next report."""
+    if job.state in (PENDING, RUNNING):
+        flags[job_id] = 1
+        job.future.cancel()
+
+
+def _job_line(job: Job, width: int) -> str:
+    """INTERNAL - Row of a job: name, bar, percentage and state."""
+    if job.state == RUNNING and not job.total:
+        info = f"{job.done} {job.state}" if job.done else job.state
+    elif job.state == RUNNING:
+        info = f"{int(job.fraction * 100)}%"
+    else:
+        info = job.state
+    return _bar_line(job.name, job.fraction, info, width)
+
+
+def _bar_line(name: str, fraction: float, info: str, width: int) -> str:
+    """INTERNAL - name [#####     ] info, width chars long."""
+    name_width = min(16, width // 4)
+    info_width = 10
+    bar_width = max(width - name_width - info_width - 4, 1)
+    cells = int(fraction * bar_width)
+    bar = const.CHAR_HIGH_GRAY * cells + const.CHAR_LOW_GRAY * (bar_width - cells)
+    return f"{name[:name_width]:<{name_width}} {bar} {info[:info_width]:>{info_width}}".ljust(width)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+#
+# CurTools - Parallel justification
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+import os
+import re
+import threading
+from concurrent.futures import CancelledError, Executor, Future, ProcessPoolExecutor
+from typing import Iterator, List
+
+import modules.cur_tools as cur_tools
+
+# Chunks are cut at the first paragraph boundary after this many chars.
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+_PARAGRAPH_RE = re.compile(r'\n[ \t\r]*\n')
+
+
+def split_chunks(text: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Splits a text in chunks, only at paragraph boundaries (blank lines).
+
+    The cuts are boundaries justify_paragraphs() splits at too, so the
+    paragraphs of the chunks are the ones of the whole text.
+
+    Args:
+        text (str): Text to be split.
+        chunk_size (int): Minimum size of every chunk (but the last one).
+
+    Yields:
+        str: Chunks of whole paragraphs.
+    """
+    pos = 0
+    for m in _PARAGRAPH_RE.finditer(text):
+        if m.start() >= pos + chunk_size:
+            yield text[pos:m.start()]
+            pos = m.end()
+    yield text[pos:]
+
+
+def justify_chunk(chunk: str, width: int) -> List[str]:
+    """Justifies the paragraphs of a chunk, with a blank row between them.
+
+    Args:
+        chunk (str): Whole paragraphs.
+        width (int): Width of the justification.
+
+    Returns:
+        List[str]: Justified rows.
+    """
+    rows = []
+    for paragraph in _PARAGRAPH_RE.split(chunk):
+        if rows:
+            rows.append("")
+        rows.extend(cur_tools.align_paragraph(paragraph, width))
+    return rows
+
+
+def justify_paragraphs(text: str, width: int) -> List[str]:
+    """Justifies a text paragraph by paragraph, in this process.
+
+    Args:
+        text (str): Text to be justified. Blank lines split paragraphs.
+        width (int): Width of the justification.
+
+    Returns:
+        List[str]: Justified rows.
+    """
+    return justify_chunk(text, width)
+
+
+def justify_parallel(text: str, width: int, workers: int = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[str]]:
+    """Justifies a text across CPU cores.
+
+    The text is split at paragraph boundaries and every chunk is justified
+    in a ProcessPoolExecutor (with one worker too: justify_paragraphs() is
+    the serial path). Chunks come back in order, as soon as they (and the
+    ones before them) are done. Joined, the output is the same as
+    justify_paragraphs().
+
+    Args:
+        text (str): Text to be justified. Blank lines split paragraphs.
+        width (int): Width of the justification.
+        workers (int): Number of processes. None means one per CPU.
+        chunk_size (int): Size of the chunks, in chars.
+
+    Yields:
+        List[str]: Justified rows of every chunk.
+    """
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        yield from _collect(_submit(executor, text, width, chunk_size))
+
+
+def _justify_each(chunk: str, width: int) -> List[List[str]]:
+    """INTERNAL - Justified rows of every paragraph of a chunk (in a worker)."""
+    return [cur_tools.align_paragraph(paragraph, width) for paragraph in _PARAGRAPH_RE.split(chunk)]
+
+
+def _submit(executor: Executor, text: str, width: int, chunk_size: int) -> List[Future]:
+    """INTERNAL - Sends every chunk of the text to the executor."""
+    return [executor.submit(_justify_each, chunk, width) for chunk in split_chunks(text, chunk_size)]
+
+
+def _collect(futures: List[Future]) -> Iterator[List[str]]:
+    """INTERNAL - Rows of the chunks in order.
+
+    The blank rows between paragraphs are put here, as justify_chunk() does
+    over the whole text: one before every paragraph but the ones before the
+    first row (empty paragraphs, i.e. more blank lines, have no rows).
+    """
+    started = False
+    for future in futures:
+        rows = []
+        for paragraph in future.result():
+            if started:
+                rows.append("")
+            rows.extend(paragraph)
+            started = started or bool(rows)
+        yield rows
+
+
+class JustifiedText:
+    """A text justified in the background, browsable while it's being done.
+
+    It can be given to text_browser() instead of a str: the first page is
+    shown as soon as the first chunk is ready, and the rest arrives while
+    the user is reading. If the browser is closed before the end, it calls
+    close(), so the rest of the text isn't justified for nothing.
+    """
+
+    def __init__(self, text: str, width: int, workers: int = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """Starts the justification.
+
+        Args:
+            text (str): Text to be justified. Blank lines split paragraphs.
+            width (int): Width of the justification.
+            workers (int): Number of processes. None means one per CPU.
+            chunk_size (int): Size of the chunks, in chars.
+        """
+        self.width = width
+        self.error = None
+        self._size = max(len(text), 1)
+        self._done_chars = 0
+        self._rows = []
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._complete = False
+        self._closed = False
+        self._executor = None
+        self._futures = []
+
+        self._thread = threading.Thread(target=self._run,
+                                        args=(text, workers, chunk_size), daemon=True)
+        self._thread.start()
+
+    def _run(self, text: str, workers: int, chunk_size: int):
+        """INTERNAL - Collects the justified chunks."""
+        try:
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+                with self._lock:
+                    if self._closed:
+                        return
+                    self._executor = executor
+                    self._futures = _submit(executor, text, self.width, chunk_size)
+
+                for rows in _collect(self._futures):
+                    chars = sum(len(r) for r in rows)
+                    with self._changed:
+                        self._rows.extend(rows)
+                        self._done_chars += chars
+                        self._changed.notify_all()
+        except CancelledError:  # close()
+            pass
+        except Exception as e:  # Shown by the caller, not lost in the thread.
+            self.error = e
+        finally:
+            with self._changed:
+                self._complete = True
+                self._changed.notify_all()
+
+    def close(self):
+        """Stops the justification.
+
+        The chunks not started are dropped, the ones running finish in their
+        workers. The rows already justified are kept.
+        """
+        with self._lock:
+            self._closed = True
+            executor, futures = self._executor, self._futures
+
+        for future in futures:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def complete(self) -> bool:
+        """True once the whole text has been justified, or close() stopped it."""
+        return self._complete
+
+    @property
+    def running(self) -> bool:
+        """True while chunks are still arriving."""
+        return not self._complete
+
+    def row_count(self) -> int:
+        """Number of rows justified so far.
+
+        Returns:
+            int: Rows justified.
+        """
+        return len(self._rows)
+
+    def estimate_rows(self) -> int:
+        """Estimates the total number of rows, from the chunks done so far.
+
+        Returns:
+            int: Number of rows of the text (exact if complete is True).
+        """
+        with self._lock:
+            count = len(self._rows)
+            if self._complete or not self._done_chars:
+                return max(count, 1)
+            return max(count, int(count * self._size / self._done_chars))
+
+    def rows(self, start: int, count: int) -> List[str]:
+        """Gets justified rows.
+
+        Args:
+            start (int): First row.
+            count (int): Number of rows.
+
+        Returns:
+            List[str]: The rows ready, every one padded to width.
+        """
+        with self._lock:
+            page = self._rows[start:start + count]
+        return [row.ljust(self.width) for row in page]
+
+    def wait(self, rows: int = None, timeout: float = None) -> bool:
+        """Waits for the justification.
+
+        Args:
+            rows (int): Wait only until this many rows are ready. None waits for all.
+            timeout (float): Seconds to wait. None waits forever.
+
+        Returns:
+            bool: True if the rows are ready.
+        """
+        with self._changed:
+            return self._changed.wait_for(
+                lambda: self._complete or (rows is not None and len(self._rows) >= rows),
+                timeout)
+
+    def index_all(self) -> int:
+        """Waits for the whole text.
+
+        Returns:
+            int: Total number of rows.
+        """
+        self.wait()
+        return len(self._rows)
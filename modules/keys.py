@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+#
+# CurTools - Key decoder
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+import collections
+import curses
+import sys
+from curses import ascii
+from typing import List
+
+# Alt+key comes as ALT | the code of the key.
+ALT = 1 << 16
+
+# A paste (bracketed paste mode) comes as one PASTE key, see Decoder.pastes
+# and eventloop.pasted.
+PASTE = 1 << 17
+_PASTE_END = b"\x1b[201~"
+
+# True while the terminal marks pastes (see set_bracketed_paste()).
+bracketed_paste = False
+
+# Moves whose auto repeats (a held down key) the widgets merge into one jump (see eventloop.repeats()).
+SCROLL = frozenset((curses.KEY_UP, curses.KEY_DOWN, curses.KEY_LEFT, curses.KEY_RIGHT,
+                    curses.KEY_PPAGE, curses.KEY_NPAGE))
+
+# Seconds an ESC waits for the rest of a sequence before it's taken as ESC.
+esc_delay = 0.025
+
+
+def set_esc_delay(seconds: float):
+    """Time an ESC waits for the rest of an escape sequence.
+
+    Args:
+        seconds (float): The time. Terminals send a sequence at once, so a
+            few milliseconds are enough (more over slow remote links).
+    """
+    global esc_delay
+    esc_delay = seconds
+
+
+def set_bracketed_paste(on: bool):
+    """Asks the terminal to mark pastes (they come as one PASTE key) or not.
+
+    Args:
+        on (bool): True to turn it on. curses_init() turns it on, and curses_end() off.
+    """
+    global bracketed_paste
+    if on != bracketed_paste:
+        sys.stdout.write("\x1b[?2004h" if on else "\x1b[?2004l")
+        sys.stdout.flush()
+        bracketed_paste = on
+
+
+def alt(char: str) -> int:
+    """Key of Alt+char.
+
+    Args:
+        char (str): The char.
+
+    Returns:
+        int: The key.
+    """
+    return ALT | ord(char)
+
+
+def alt_char(key: int) -> str:
+    """Char of an Alt+key.
+
+    Args:
+        key (int): A key.
+
+    Returns:
+        str: The char, None if the key isn't Alt+char.
+    """
+    if isinstance(key, int) and key & ALT:
+        return chr(key & ~ALT)
+    return None
+
+
+def name(key: int) -> str:
+    """Name of a key, as curses getkey() gives it ("a", "KEY_UP", "M-a" for Alt+a...).
+
+    Args:
+        key (int): A key.
+
+    Returns:
+        str: The name.
+    """
+    if key & ALT:
+        return "M-" + chr(key & ~ALT)
+    if key < 256:
+        return chr(key)
+    return _NAMES.get(key, str(key))
+
+
+_NAMES = {PASTE: "KEY_PASTE"}
+for _name, _value in vars(curses).items():
+    if _name.startswith("KEY_") and isinstance(_value, int):
+        _NAMES.setdefault(_value, _name)
+
+
+def _build_trie() -> dict:
+    """INTERNAL - Escape sequences (xterm, vt100, linux console) and their keys.
+
+    Every node maps a code to the next node, or to the key at the end of a
+    sequence.
+    """
+    sequences = {
+        "[A": curses.KEY_UP, "[B": curses.KEY_DOWN, "[C": curses.KEY_RIGHT, "[D": curses.KEY_LEFT,
+        "[H": curses.KEY_HOME, "[F": curses.KEY_END, "[Z": curses.KEY_BTAB, "[E": curses.KEY_B2,
+        "OA": curses.KEY_UP, "OB": curses.KEY_DOWN, "OC": curses.KEY_RIGHT, "OD": curses.KEY_LEFT,
+        "OH": curses.KEY_HOME, "OF": curses.KEY_END, "OM": curses.KEY_ENTER,
+        "OP": curses.KEY_F1, "OQ": curses.KEY_F2, "OR": curses.KEY_F3, "OS": curses.KEY_F4,
+        "[1~": curses.KEY_HOME, "[2~": curses.KEY_IC, "[3~": curses.KEY_DC, "[4~": curses.KEY_END,
+        "[5~": curses.KEY_PPAGE, "[6~": curses.KEY_NPAGE, "[7~": curses.KEY_HOME, "[8~": curses.KEY_END,
+        "[[A": curses.KEY_F1, "[[B": curses.KEY_F2, "[[C": curses.KEY_F3, "[[D": curses.KEY_F4,
+        "[[E": curses.KEY_F5, "[200~": PASTE,
+    }
+    for number, fkey in zip((11, 12, 13, 14, 15, 17, 18, 19, 20, 21, 23, 24), range(1, 13)):
+        sequences[f"[{number}~"] = curses.KEY_F0 + fkey
+    # Shift, Alt and Ctrl arrows (ESC [ 1 ; modifier X) are taken as the plain key.
+    for modifier in range(2, 9):
+        for final in "ABCDHF":
+            sequences[f"[1;{modifier}{final}"] = sequences["[" + final]
+
+    trie = {}
+    for sequence, key in sequences.items():
+        node = trie
+        for char in sequence[:-1]:
+            node = node.setdefault(ord(char), {})
+        node[ord(sequence[-1])] = key
+    return {ascii.ESC: trie}
+
+
+TRIE = _build_trie()
+
+
+class Decoder:
+    """Turns the codes read from the terminal into keys.
+
+    Escape sequences are looked up in a trie (TRIE) as their codes arrive:
+    arrows, Home/End, PgUp/PgDn, Insert/Delete and F-keys become their
+    curses.KEY_* codes, and ESC followed by a char becomes Alt+char (ALT |
+    char). An ESC that is not followed by anything within esc_delay is an
+    ESC. Unknown CSI sequences (ESC [ ... final char) are dropped whole, so
+    their tail is never taken as keys. Codes above 255 (already decoded by
+    curses, i.e. KEY_RESIZE) go through as they are.
+
+    Everything between ESC [ 200 ~ and ESC [ 201 ~ (a bracketed paste) is
+    one PASTE key, and its text (UTF-8 decoded) goes to pastes.
+    """
+
+    def __init__(self, trie: dict = None):
+        """Creates a decoder.
+
+        Args:
+            trie (dict): Sequences. None for TRIE.
+        """
+        self.trie = TRIE if trie is None else trie
+        self._pending = []   # Codes of the sequence being read.
+        self._node = None    # Where the sequence is in the trie (None: unknown CSI).
+        self._paste = None   # Codes of the paste being read.
+        self.pastes = collections.deque()  # Texts of the PASTE keys given, not taken yet.
+
+    @property
+    def pending(self) -> bool:
+        """True while a sequence is half read (see flush())."""
+        return bool(self._pending)
+
+    def feed(self, code: int) -> List[int]:
+        """Takes a code read.
+
+        Args:
+            code (int): The code.
+
+        Returns:
+            List[int]: Keys completed by it (none while a sequence goes on).
+        """
+        if self._paste is not None:
+            return self._feed_paste(code)
+        if code >= 256 or code < 0:
+            return self.flush() + [code]
+
+        if not self._pending:
+            node = self.trie.get(code)
+            if isinstance(node, dict):
+                self._pending, self._node = [code], node
+                return []
+            return [code] if node is None else [node]
+
+        node = self._node
+        if node is not None and code in node:
+            child = node[code]
+            if isinstance(child, dict):
+                self._pending.append(code)
+                self._node = child
+                return []
+            self._reset()
+            if child == PASTE:
+                self._paste = bytearray()
+                return []
+            return [child]
+
+        if len(self._pending) == 1:  # ESC and a char that starts no sequence.
+            self._reset()
+            if code == ascii.ESC:
+                return [ascii.ESC] + self.feed(code)
+            return [ALT | code]
+
+        if self._pending[1] == ord("["):
+            # Unknown CSI sequence: dropped up to its final char.
+            if 0x40 <= code <= 0x7e:
+                self._reset()
+            else:
+                self._pending.append(code)
+                self._node = None
+            return []
+
+        # Unknown SS3 (ESC O x) sequence.
+        self._reset()
+        return []
+
+    def flush(self) -> List[int]:
+        """Ends a half read sequence (nothing came within esc_delay).
+
+        Returns:
+            List[int]: ESC for a lone ESC, Alt+char for ESC and a char,
+            nothing for the start of an unknown sequence.
+        """
+        pending = self._pending
+        self._reset()
+        if len(pending) == 1:
+            return [pending[0]]
+        if len(pending) == 2:
+            return [ALT | pending[1]]
+        return []
+
+    def _feed_paste(self, code: int) -> List[int]:
+        """INTERNAL - Takes a code of a paste, PASTE when it ends."""
+        if code >= 256 or code < 0:
+            return [code]
+        paste = self._paste
+        paste.append(code)
+        if code == 0x7e and paste.endswith(_PASTE_END):
+            del paste[-len(_PASTE_END):]
+            self.pastes.append(paste.decode("utf-8", "replace"))
+            self._paste = None
+            return [PASTE]
+        return []
+
+    def _reset(self):
+        """INTERNAL - Forgets the sequence being read."""
+        self._pending = []
+        self._node = None
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+#
+# CurTools - Menu model
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+from types import MappingProxyType
+from typing import List
+
+
+class _Frozen:
+    """INTERNAL - Attributes can only be set by __init__."""
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def _set(self, **values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+
+class MenuList(_Frozen):
+    """Options of a vertical menu, compiled once.
+
+    Built from the choices vertical_menu() takes: [text, description] or
+    [text, description, submenu choices]. The hotkeys, the width and the
+    text shown for every option (with the ">" of the submenus) are worked
+    out here, and the list can't change afterwards.
+    """
+
+    __slots__ = ('items', 'texts', 'max_length', 'hotkey_list', 'hotkey_index', 'labels')
+
+    def __init__(self, choices: list):
+        """Compiles the choices.
+
+        Args:
+            choices (list): List of choices (a submenu can be a MenuList already).
+        """
+        items = tuple((choice[0], choice[1], _submenu(choice)) for choice in choices)
+        max_length = max((len(text) for text, _, _ in items), default=0) + 2
+        texts = tuple(text.ljust(max_length - 1) + ">" if submenu is not None else text
+                      for text, _, submenu in items)
+        hotkey_list = tuple(tuple(h) for h in hotkey_option(items))
+        self._set(items=items, texts=texts, max_length=max_length, hotkey_list=hotkey_list,
+                  hotkey_index=MappingProxyType(hotkey_index(hotkey_list)),
+                  labels=tuple(text.lower() for text, _, _ in items))
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        return self.items[i]
+
+
+class MenuModel(_Frozen):
+    """Menu bar, compiled once from the nested dict menu_bar() takes.
+
+    The titles, their hotkeys and columns, and a MenuList for every menu
+    are worked out here: showing the menu bar again only draws it.
+
+        {"File": {"Load": {"description": "Load a file."},
+                  "Input": {"description": "Some input.",
+                            "submenu": {"Normal": {"description": "..."}}}}}
+    """
+
+    __slots__ = ('titles', 'hotkey_list', 'hotkey_index', 'columns', 'menus', 'bar')
+
+    def __init__(self, options: dict):
+        """Compiles the menu.
+
+        Args:
+            options (dict): The list of options and suboptions.
+        """
+        titles = tuple(options)
+        hotkey_list = tuple(tuple(h) for h in hotkey_option([(title,) for title in titles]))
+
+        columns = [0]
+        for title in titles:
+            columns.append(columns[-1] + len(title) + 2)
+
+        self._set(titles=titles, hotkey_list=hotkey_list,
+                  hotkey_index=MappingProxyType(hotkey_index(hotkey_list)),
+                  columns=tuple(columns),
+                  menus=tuple(MenuList(_choices(options[title])) for title in titles),
+                  bar=tuple(f" {title} " for title in titles))
+
+
+def _submenu(choice) -> MenuList:
+    """INTERNAL - Compiled submenu of a choice, None if it has none."""
+    submenu = choice[2] if len(choice) == 3 else None
+    if submenu is None or isinstance(submenu, MenuList):
+        return submenu
+    return MenuList(submenu)
+
+
+def _choices(options: dict) -> list:
+    """INTERNAL - Choices of a vertical menu out of a dict of options."""
+    choices = []
+    for text, option in options.items():
+        if "submenu" in option:
+            choices.append([text, option["description"], _choices(option["submenu"])])
+        else:
+            choices.append([text, option["description"]])
+    return choices
+
+
+def hotkey_option(choices: list) -> List[list]:
+    """Given a list of options, returns a list of the hotkeys for every option.
+
+    Every option gets the first char of its text (choice[0]) that no option
+    before took (ignoring case). An option left without one gets an empty
+    hotkey at -1.
+
+    Args:
+        choices (list): The list of choices.
+
+    Returns:
+        List[list]: The list of hotkeys for every option: [text, hotkey, position].
+    """
+    hotkey_list = []
+    used = {" "}  # Blanks are never hotkeys.
+
+    for opt in choices:
+        text = opt[0]
+        if used.issuperset(text.upper()):  # Long lists run out of hotkeys soon.
+            hotkey_list.append([text, "", -1])
+            continue
+        for pos, x in enumerate(text):
+            if x.upper() not in used:
+                used.add(x.upper())
+                hotkey_list.append([text, x, pos])
+                break
+        else:
+            hotkey_list.append([text, "", -1])
+
+    return hotkey_list
+
+
+def hotkey_index(hotkey_list: List[list]) -> dict:
+    """Maps every hotkey (uppercase) to its option.
+
+    Args:
+        hotkey_list (List[list]): Hotkeys, as hotkey_option() returns them.
+
+    Returns:
+        dict: Option of every hotkey.
+    """
+    return {h[1].upper(): i for i, h in enumerate(hotkey_list) if h[1]}
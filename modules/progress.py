@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+#
+# CurTools - Progress tracker
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+import asyncio
+import curses
+import threading
+import time
+from typing import Iterable
+
+import modules.constant as const
+import modules.screen as screen
+
+
+class Progress:
+    """Progress of a job, shown in a progress_bar_create() window.
+
+    It wraps an iterable (like tqdm) or takes update() calls, from any
+    thread (iterating a tracker made without an iterable is a ValueError).
+    Every thread counts in a cell of its own, so an increment takes no
+    lock. The counters are only looked at every so many increments (sized
+    to fall about fps times a second), and the window is painted only if
+    the bar or the text on it changed.
+
+    The window is painted by the thread that created the tracker: on its
+    own increments, on refresh(), or by the watch() coroutine.
+    """
+
+    def __init__(self, iterable: Iterable = None, total: int = None, s: curses.window = None,
+                 title: str = "Progress", fps: int = 10):
+        """Starts tracking.
+
+        Args:
+            iterable (Iterable): Items to be tracked when iterating the tracker.
+            total (int): Number of items. None takes len(iterable), if it has one.
+            s (curses.window): Curses screen object. None tracks without a window.
+            title (str): Title of the window.
+            fps (int): Max repaints per second.
+        """
+        if total is None and iterable is not None:
+            try:
+                total = len(iterable)
+            except TypeError:
+                pass
+
+        self.iterable = iterable
+        self.total = total
+        self.interval = 1 / fps if fps > 0 else 0.0
+
+        self._local = threading.local()
+        self._cells = []
+        self._lock = threading.Lock()
+        self._owner = threading.get_ident()
+        self._step = 1
+        self._start = time.monotonic()
+        self._last = 0.0
+        self._tuned = 0.0
+        self._shown = None
+        self.closed = False
+
+        self._win = self._sha = None
+        if s is not None:
+            from modules.cur_tools import progress_bar_create  # Here, not at the top: no import cycle.
+            self._win, self._sha = progress_bar_create(s, max(total or 0, 1), title)
+            self._width = self._win.getmaxyx()[1] - 4
+
+    def __iter__(self):
+        if self.iterable is None:
+            raise ValueError("Progress has no iterable to go through: count with update()")
+        return self._iterate()
+
+    def _iterate(self):
+        """INTERNAL - Goes through the iterable, counting.
+
+        The count is kept in a local, and stored in the cell at the checks.
+        """
+        cell = self._cell()
+        n, due = cell
+        try:
+            for item in self.iterable:
+                yield item
+                n += 1
+                if n >= due:
+                    cell[0] = n
+                    self._check(cell)
+                    due = cell[1]
+        finally:
+            cell[0] = n
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def update(self, n: int = 1):
+        """Adds done items. It can be called from any thread.
+
+        Args:
+            n (int): Number of items.
+        """
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._cell()
+        cell[0] += n
+        if cell[0] >= cell[1]:
+            self._check(cell)
+
+    @property
+    def count(self) -> int:
+        """Items done so far, by every thread."""
+        return sum(cell[0] for cell in self._cells)
+
+    def stats(self) -> tuple:
+        """How the job goes.
+
+        Returns:
+            tuple[int, float, float, float]: Items done, items per second,
+            seconds elapsed and seconds left (None if the total is unknown).
+        """
+        count = self.count
+        elapsed = time.monotonic() - self._start
+        rate = count / elapsed if elapsed > 0 else 0.0
+        left = None
+        if self.total is not None and rate > 0:
+            left = max(self.total - count, 0) / rate
+        return count, rate, elapsed, left
+
+    def refresh(self, force: bool = False):
+        """Paints the window, if it changed.
+
+        Args:
+            force (bool): True to ignore the fps limit.
+        """
+        now = time.monotonic()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+
+        count, rate, elapsed, left = self.stats()
+        self._tune(rate, now)
+
+        if self._win is None or self.closed:
+            return
+
+        if self.total:
+            done = min(count / self.total, 1.0)
+            cells = int(done * self._width)
+            label = f"{int(done * 100)}%  {count}/{self.total}  "
+        else:
+            cells = 0
+            label = f"{count}  "
+        label += f"{_format_rate(rate)}  {_format_time(elapsed)}"
+        if left is not None:
+            label += f" < {_format_time(left)}"
+
+        shown = (cells, label)
+        if shown == self._shown:
+            return
+
+        w = self._win
+        old_cells = self._shown[0] if self._shown else 0
+        if cells > old_cells:
+            w.addstr(2, 2 + old_cells, const.CHAR_HIGH_GRAY * (cells - old_cells),
+                     curses.color_pair(const.PAIR_PROGRESS_BAR) | curses.A_BOLD | curses.A_REVERSE)
+        w.addstr(4, 2, label[:self._width].center(self._width))
+        self._shown = shown
+        screen.frame_mark(w)
+        screen.frame_flush()
+
+    async def watch(self):
+        """Coroutine that repaints the window until the tracker is closed.
+
+        Handy when the work runs in other threads and the owner just waits.
+        """
+        while not self.closed:
+            self.refresh()
+            await asyncio.sleep(self.interval or 0.1)
+
+    def close(self):
+        """Paints the last state and closes the window."""
+        if self.closed:
+            return
+        if threading.get_ident() == self._owner:
+            self.refresh(True)
+        self.closed = True
+        if self._win is not None:
+            from modules.cur_tools import progress_bar_close
+            progress_bar_close(self._win, self._sha)
+            screen.frame_flush(True)
+
+    def _cell(self) -> list:
+        """INTERNAL - Counter of the calling thread: [count, count to check at]."""
+        cell = getattr(self._local, 'cell', None)
+        if cell is None:
+            cell = [0, self._step]
+            self._local.cell = cell
+            with self._lock:
+                self._cells = self._cells + [cell]
+        return cell
+
+    def _check(self, cell: list):
+        """INTERNAL - A cell reached its check point."""
+        if threading.get_ident() == self._owner:
+            self.refresh()
+        else:
+            now = time.monotonic()
+            if now - self._tuned >= self.interval:
+                self._tune(self.stats()[1], now)
+        cell[1] = cell[0] + self._step
+
+    def _tune(self, rate: float, now: float):
+        """INTERNAL - Checks again after about an interval worth of increments per thread."""
+        self._tuned = now
+        self._step = max(1, int(rate * self.interval / max(len(self._cells), 1)))
+
+
+def track(iterable: Iterable, s: curses.window = None, title: str = "Progress",
+          total: int = None) -> Progress:
+    """Wraps an iterable in a Progress tracker.
+
+    Args:
+        iterable (Iterable): Items to be tracked.
+        s (curses.window): Curses screen object. None tracks without a window.
+        title (str): Title of the window.
+        total (int): Number of items. None takes len(iterable), if it has one.
+
+    Returns:
+        Progress: Tracker to iterate (and close, or use as a context manager).
+    """
+    return Progress(iterable, total, s, title)
+
+
+def _format_time(seconds: float) -> str:
+    """INTERNAL - [h:]mm:ss."""
+    m, sec = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return f"{h}:{m:02}:{sec:02}" if h else f"{m:02}:{sec:02}"
+
+
+def _format_rate(rate: float) -> str:
+    """INTERNAL - Items per second, with k/M/G suffixes."""
+    for suffix in ("", "k", "M", "G"):
+        if rate < 1000:
+            return f"{rate:.1f}{suffix} it/s" if rate < 100 else f"{rate:.0f}{suffix} it/s"
+        rate /= 1000
+    return f"{rate:.0f}T it/s"
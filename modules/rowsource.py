@@ -0,0 +1,954 @@
+#!/usr/bin/env python3
+#
+# CurTools - Row sources for table_viewer
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+import csv
+import heapq
+import io
+import itertools
+import math
+import mmap
+import operator
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import List
+
+
+class RowSource:
+    """Rows shown by table_viewer().
+
+    A row source only has to tell how many rows there are and hand over a
+    range of them, so the table never has to be in memory as a whole.
+    """
+
+    # True if the source has sort() and filter().
+    sortable = False
+
+    # Changes every time the rows change place (i.e. after a sort), so the
+    # viewer knows that what's on screen is stale.
+    version = 0
+
+    def row_count(self) -> int:
+        """Number of rows.
+
+        Returns:
+            int: Rows of the table.
+        """
+        raise NotImplementedError
+
+    def column_count(self) -> int:
+        """Number of columns.
+
+        Returns:
+            int: Columns of the table.
+        """
+        raise NotImplementedError
+
+    def columns(self) -> List[str]:
+        """Column names, shown as a header.
+
+        Returns:
+            List[str]: The names, or None for no header.
+        """
+        return None
+
+    def column_widths(self) -> List[int]:
+        """Width of every column.
+
+        Returns:
+            List[int]: The widths, or None to use the width given to table_viewer().
+        """
+        return None
+
+    @property
+    def running(self) -> bool:
+        """True while rows are still arriving (row_count() grows)."""
+        return False
+
+    def progress(self) -> float:
+        """How much of the rows has arrived.
+
+        Returns:
+            float: From 0 to 1.
+        """
+        return 1.0
+
+    def rows(self, start: int, count: int) -> List[tuple]:
+        """Gets a range of rows.
+
+        Args:
+            start (int): First row (from 0).
+            count (int): Number of rows.
+
+        Returns:
+            List[tuple]: The rows. Shorter than count at the end of the table.
+        """
+        raise NotImplementedError
+
+
+class ListRows(RowSource):
+    """Rows held in a list of lists (the classic table_viewer() data)."""
+
+    def __init__(self, data: list, columns: List[str] = None):
+        """Wraps a list.
+
+        Args:
+            data (list): List of rows, every one a list of cells.
+            columns (List[str]): Column names. None for no header.
+        """
+        self._data = data
+        self._columns = columns
+
+    def row_count(self) -> int:
+        return len(self._data)
+
+    def column_count(self) -> int:
+        if self._columns is not None:
+            return len(self._columns)
+        return len(self._data[0]) if self._data else 0
+
+    def columns(self) -> List[str]:
+        return self._columns
+
+    def rows(self, start: int, count: int) -> List[tuple]:
+        return self._data[start:start + count]
+
+
+class SqliteRows(RowSource):
+    """Rows of a SQLite table, read a page at a time.
+
+    Pages are read with keyset pagination (WHERE key > last key of the page
+    before, ORDER BY key LIMIT n) so reading a page costs the same at the
+    start or at the end of the table. The key before every page seen is
+    remembered to seek straight to it later. Pages live in a LRU cache, so
+    memory is bounded by cache_pages * page_size rows whatever the size of
+    the table.
+    """
+
+    def __init__(self, database, table: str, key: str = "rowid",
+                 page_size: int = 256, cache_pages: int = 16, prefetch: int = 32):
+        """Opens a table.
+
+        Args:
+            database (str | sqlite3.Connection): Database file (opened read only)
+                or an open connection.
+            table (str): Table name.
+            key (str): Unique column the rows are sorted by. Defaults to rowid.
+            page_size (int): Rows read at a time.
+            cache_pages (int): Pages kept in memory.
+            prefetch (int): When a range gets this close to the end of its page,
+                the next page is read too.
+        """
+        if isinstance(database, sqlite3.Connection):
+            self._db = database
+            self._own = False
+        else:
+            self._db = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+            self._own = True
+
+        self.table = table
+        self.key = key
+        self.page_size = page_size
+        self.cache_pages = max(cache_pages, 2)
+        self.prefetch = prefetch
+
+        self._from = f"FROM {_quote(table)}"
+        self._key = _quote(key)
+        cur = self._db.execute(f"SELECT * {self._from} LIMIT 0")
+        self._columns = [d[0] for d in cur.description]
+        self._count = None
+
+        # page number -> key of the last row of the page before it
+        # (None for the first page).
+        self._anchors = {0: None}
+        self._cache = OrderedDict()
+
+    def close(self):
+        """Closes the database, if it was opened here."""
+        if self._own:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def row_count(self) -> int:
+        if self._count is None:
+            self._count = self._db.execute(f"SELECT COUNT(*) {self._from}").fetchone()[0]
+        return self._count
+
+    def column_count(self) -> int:
+        return len(self._columns)
+
+    def columns(self) -> List[str]:
+        return self._columns
+
+    def rows(self, start: int, count: int) -> List[tuple]:
+        start = max(start, 0)
+        end = min(start + count, self.row_count())
+        out = []
+        page = start // self.page_size
+        while start + len(out) < end:
+            rows = self._page(page)
+            if not rows:
+                break
+            first = page * self.page_size
+            out.extend(rows[max(start - first, 0):end - first])
+            page += 1
+
+        # Read ahead the page the user is heading to.
+        if end + self.prefetch >= page * self.page_size and end < self.row_count():
+            self._page(page)
+
+        return out
+
+    def _page(self, page: int) -> List[tuple]:
+        """INTERNAL - Rows of a page, from the cache or the database."""
+        rows = self._cache.get(page)
+        if rows is not None:
+            self._cache.move_to_end(page)
+            return rows
+
+        sql, args = self._after(self._anchor(page))
+        cur = self._db.execute(f"SELECT {self._key}, * {self._from}{sql} "
+                               f"ORDER BY {self._key} LIMIT ?", args + (self.page_size,))
+        keyed = cur.fetchall()
+        rows = [row[1:] for row in keyed]
+        if len(keyed) == self.page_size:
+            self._anchors[page + 1] = keyed[-1][0]
+
+        self._cache[page] = rows
+        if len(self._cache) > self.cache_pages:
+            self._cache.popitem(last=False)
+        return rows
+
+    def _anchor(self, page: int):
+        """INTERNAL - Key of the last row before a page.
+
+        A page never seen is found from the nearest page seen, before or
+        after it (an OFFSET on the key index only, the rows are not read).
+        """
+        if page in self._anchors:
+            return self._anchors[page]
+
+        below = max(p for p in self._anchors if p < page)
+        above = min((p for p in self._anchors if p > page), default=None)
+        if above is not None and above - page < page - below:
+            sql = f" WHERE {self._key} <= ? ORDER BY {self._key} DESC"
+            args = (self._anchors[above],)
+            offset = (above - page) * self.page_size
+        else:
+            sql, args = self._after(self._anchors[below])
+            sql += f" ORDER BY {self._key}"
+            offset = (page - below) * self.page_size - 1
+
+        row = self._db.execute(f"SELECT {self._key} {self._from}{sql} LIMIT 1 OFFSET ?",
+                               args + (offset,)).fetchone()
+        anchor = row[0] if row is not None else None
+        self._anchors[page] = anchor
+        return anchor
+
+    def _after(self, anchor) -> tuple:
+        """INTERNAL - WHERE clause for the rows after a key."""
+        if anchor is None:
+            return "", ()
+        return f" WHERE {self._key} > ?", (anchor,)
+
+
+class CsvRows(RowSource):
+    """Rows of a CSV (or TSV) file of any size.
+
+    The file is memory mapped, and a background thread builds an array with
+    the byte offset of every row (8 bytes a row), so the first rows can be
+    browsed right away while the rest is indexed. Only the rows asked for
+    are parsed, with the csv module. Quoted fields can hold newlines.
+    """
+
+    def __init__(self, filename: str, delimiter: str = None, header: bool = True,
+                 encoding: str = "utf-8", sample: int = 1000, max_width: int = 30):
+        """Maps a file and starts indexing it.
+
+        Args:
+            filename (str): CSV file.
+            delimiter (str): Field delimiter. None means tab for .tsv/.tab files
+                and comma for anything else.
+            header (bool): True if the first row holds the column names.
+            encoding (str): File encoding.
+            sample (int): Rows read to size the columns.
+            max_width (int): Max width of a column.
+        """
+        if delimiter is None:
+            delimiter = "\t" if os.path.splitext(filename)[1].lower() in (".tsv", ".tab") else ","
+        self.filename = filename
+        self.delimiter = delimiter
+        self.encoding = encoding
+
+        self._file = open(filename, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            self._mm = b""
+        self._size = len(self._mm)
+
+        # Byte offset where every row starts, plus where the last one ends.
+        self._offsets = array("Q")
+        self._lock = threading.Lock()
+        self._indexed = 0
+        self._complete = False
+        self._stop = False
+
+        first = _csv_row_end(self._mm, 0, self._size) if header else 0
+        self._header = list(self._parse(0, first)[0]) if header and first else None
+        self._offsets.append(first)
+        self._widths = self._sample(first, sample, max_width)
+
+        # The first block right away, so there is something to show.
+        pos = self._index_block(first) if first < self._size else first
+        self._complete = pos >= self._size
+        self._thread = threading.Thread(target=self._run, args=(pos,), daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stops the indexing, unmaps and closes the file."""
+        self._stop = True
+        self._thread.join()
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def running(self) -> bool:
+        return not self._complete
+
+    def progress(self) -> float:
+        return self._indexed / self._size if self._size else 1.0
+
+    def row_count(self) -> int:
+        return len(self._offsets) - 1
+
+    def column_count(self) -> int:
+        return len(self._widths)
+
+    def columns(self) -> List[str]:
+        return self._header
+
+    def column_widths(self) -> List[int]:
+        return self._widths
+
+    def rows(self, start: int, count: int) -> List[tuple]:
+        with self._lock:
+            end = min(start + count, len(self._offsets) - 1)
+            if start >= end:
+                return []
+            first, last = self._offsets[start], self._offsets[end]
+        return self._parse(first, last)
+
+    def _parse(self, first: int, last: int) -> List[tuple]:
+        """INTERNAL - Parses the rows between two byte offsets."""
+        text = self._mm[first:last].decode(self.encoding, "replace")
+        reader = csv.reader(io.StringIO(text, newline=""), delimiter=self.delimiter)
+        return [tuple(row) for row in reader]
+
+    def _sample(self, first: int, sample: int, max_width: int) -> List[int]:
+        """INTERNAL - Widths of the columns, from the header and the first rows."""
+        end = first
+        for _ in range(sample):
+            if end >= self._size:
+                break
+            end = _csv_row_end(self._mm, end, self._size)
+
+        widths = [len(name) for name in self._header or ()]
+        for row in self._parse(first, end):
+            for c, cell in enumerate(row):
+                if c < len(widths):
+                    widths[c] = max(widths[c], len(cell))
+                else:
+                    widths.append(len(cell))
+        return [min(max(w, 3), max_width) + 1 for w in widths]
+
+    def _run(self, pos: int):
+        """INTERNAL - Indexes the file, a block at a time."""
+        while pos < self._size and not self._stop:
+            pos = self._index_block(pos)
+        self._complete = True
+
+    def _index_block(self, pos: int) -> int:
+        """INTERNAL - Indexes a block of the file.
+
+        Every block starts at a row boundary and ends at the last one in it.
+
+        Returns:
+            int: Where the next block starts.
+        """
+        size = self._size
+        end = min(pos + _CSV_BLOCK, size)
+        ends = _csv_row_ends(self._mm, pos, end)
+        while not ends and end < size:  # A row bigger than a block.
+            end = min(end + _CSV_BLOCK, size)
+            ends = _csv_row_ends(self._mm, pos, end)
+
+        with self._lock:
+            self._offsets.extend(ends)
+            if self._offsets[-1] < size and end == size:  # Last row without a newline.
+                self._offsets.append(size)
+            pos = self._offsets[-1]
+        self._indexed = pos
+        return pos
+
+
+def _csv_row_ends(mm, pos: int, end: int) -> array:
+    """INTERNAL - Byte offsets where the rows between pos and end finish.
+
+    pos has to be the start of a row. A newline inside quotes doesn't end it.
+    """
+    ends = array("Q")
+    block = mm[pos:end]
+    if b'"' not in block:
+        ends.extend(pos + m.end() for m in _NEWLINE_RE.finditer(block))
+        return ends
+
+    quoted = False
+    start = 0
+    for m in _NEWLINE_RE.finditer(block):
+        if block.count(b'"', start, m.end()) & 1:
+            quoted = not quoted
+        start = m.end()
+        if not quoted:
+            ends.append(pos + start)
+    return ends
+
+
+def _csv_row_end(mm, pos: int, size: int) -> int:
+    """INTERNAL - Byte offset after the row starting at pos (quotes can hold newlines)."""
+    quoted = False
+    while pos < size:
+        nl = mm.find(b"\n", pos)
+        end = size if nl < 0 else nl + 1
+        if mm[pos:end].count(b'"') & 1:
+            quoted = not quoted
+        pos = end
+        if not quoted:
+            break
+    return pos
+
+
+# The index thread works on blocks of this many bytes.
+_CSV_BLOCK = 4 * 1024 * 1024
+_NEWLINE_RE = re.compile(rb"\n")
+
+
+class ColumnarRows(RowSource):
+    """Rows held column by column, that can be sorted and filtered.
+
+    Numeric columns are kept in arrays, and text columns whose cells are all
+    numbers sort as numbers. The sort permutation of every column
+    is computed once (in a background thread, so the UI doesn't freeze) and
+    cached. Filters are evaluated a column at a time into a mask, and a
+    filter that only narrows the previous one is evaluated just over the
+    rows that passed it.
+
+    Filters are conditions joined by "and":
+
+        <column> <op> <value>     op: = != < <= > >= ~ (~ means contains)
+        <text>                    rows with text in any column
+
+    Columns are given by name or by number (from 1).
+    """
+
+    sortable = True
+
+    def __init__(self, data: list, columns: List[str] = None, chunk_size: int = 32768):
+        """Loads the data.
+
+        Args:
+            data (list): List of rows, every one a list of cells.
+            columns (List[str]): Column names. None for no header.
+            chunk_size (int): Rows sorted at a time by the sort thread.
+        """
+        self._columns = columns
+        self._n = len(data)
+        self._cols = [_column(values) for values in itertools.zip_longest(*data, fillvalue="")]
+        while len(self._cols) < len(columns or ()):
+            self._cols.append([""] * self._n)
+        self.chunk_size = chunk_size
+
+        self._keys = {}  # column -> sort key of a column that isn't an array
+        self._numbers = {}  # column -> cells as numbers (NaN if not one)
+        self._lower = {}  # column -> lowered text, for ~
+        self._perms = {}  # column -> ascending sort permutation
+        self._sort = None  # (column, descending)
+        self._mask = None  # bytearray, 1 for the rows that pass the filter
+        self._conditions = []
+        self._order = None  # row ids shown, None for all of them in order
+
+        self._lock = threading.Lock()
+        self._job = 0
+        self._busy = False
+        self._progress = 1.0
+        self.error = None
+
+    def row_count(self) -> int:
+        order = self._order
+        return len(order) if order is not None else self._n
+
+    def column_count(self) -> int:
+        return len(self._cols)
+
+    def columns(self) -> List[str]:
+        return self._columns
+
+    def rows(self, start: int, count: int) -> List[tuple]:
+        order = self._order
+        ids = order[start:start + count] if order is not None else range(start, min(start + count, self._n))
+        cols = self._cols
+        return [tuple(c[i] for c in cols) for i in ids]
+
+    @property
+    def running(self) -> bool:
+        return self._busy
+
+    def progress(self) -> float:
+        return self._progress
+
+    @property
+    def sorted_by(self) -> tuple:
+        """Current sort: (column, descending), or None."""
+        return self._sort
+
+    def sort(self, column: int, descending: bool = False):
+        """Sorts the rows by a column.
+
+        A column sorted before is done at once. Otherwise the sort runs in a
+        background thread (running and progress() tell how it goes), and a
+        newer sort() cancels it.
+
+        Args:
+            column (int): Column (from 0).
+            descending (bool): True for descending order.
+        """
+        with self._lock:
+            self._job += 1
+            job = self._job
+            if column in self._perms:
+                self._sort = (column, descending)
+                self._busy = False
+                self._progress = 1.0
+                self._apply()
+                return
+            self._busy = True
+            self._progress = 0.0
+
+        threading.Thread(target=self._sort_job, args=(job, column, descending), daemon=True).start()
+
+    def _sort_job(self, job: int, column: int, descending: bool):
+        """INTERNAL - Sorts a column in chunks, and merges them.
+
+        sorted() holds the GIL until it's done, so a single call over the
+        whole column would freeze the UI. Chunks let it breathe, and tell
+        the progress.
+        """
+        keys = self._sort_keys(column)
+        n = self._n
+        step = self.chunk_size
+        try:
+            parts = []
+            for start in range(0, n, step):
+                if job != self._job:
+                    return
+                parts.append(sorted(range(start, min(start + step, n)), key=keys.__getitem__))
+                self._progress = 0.5 * (start + step) / n
+
+            perm = array("L")
+            merged = heapq.merge(*parts, key=keys.__getitem__)
+            while len(perm) < n:
+                if job != self._job:
+                    return
+                perm.extend(itertools.islice(merged, step))
+                self._progress = 0.5 + 0.5 * len(perm) / n
+        except TypeError as e:  # Values that can't be compared.
+            self.error = e
+            perm = None
+
+        with self._lock:
+            if perm is not None:
+                self._perms[column] = perm
+            if job == self._job:
+                if perm is not None:
+                    self._sort = (column, descending)
+                    self._apply()
+                self._busy = False
+                self._progress = 1.0
+
+    def filter(self, expression: str):
+        """Shows only the rows that meet a filter.
+
+        Args:
+            expression (str): Filter (see the class docs). Empty shows every row.
+
+        Raises:
+            ValueError: The filter can't be understood.
+        """
+        conditions = _parse_filter(expression, self._columns, len(self._cols))
+        for column, op, value in conditions:
+            if op not in ("~", "any"):
+                self._compared(column, value)  # A text value against numbers raises.
+
+        with self._lock:
+            if not conditions:
+                mask = None
+            elif self._mask is not None and _narrows(conditions, self._conditions):
+                # Only the new conditions are evaluated. When few rows passed,
+                # just over them; else a column at a time, and-ed to the mask.
+                mask = bytearray(self._mask)
+                new = [c for c in conditions if c not in self._conditions]
+                if self.row_count() * 8 < self._n:
+                    matches = [self._predicate(c) for c in new]
+                    for i in itertools.compress(range(self._n), self._mask):
+                        if not all(match(i) for match in matches):
+                            mask[i] = 0
+                else:
+                    for condition in new:
+                        mask = bytearray(map(operator.and_, mask, self._condition_mask(condition)))
+            else:
+                mask = None
+                for condition in conditions:
+                    m = self._condition_mask(condition)
+                    mask = m if mask is None else bytearray(map(operator.and_, mask, m))
+
+            self._mask = mask
+            self._conditions = conditions
+            self._apply()
+
+    def _apply(self):
+        """INTERNAL - Builds the row order from the sort and the filter (lock held)."""
+        perm = None
+        if self._sort is not None:
+            column, descending = self._sort
+            perm = self._perms[column]
+            if descending:
+                perm = perm[::-1]
+
+        if self._mask is None:
+            self._order = perm
+        elif perm is None:
+            self._order = array("L", itertools.compress(range(self._n), self._mask))
+        else:
+            self._order = array("L", itertools.compress(perm, map(self._mask.__getitem__, perm)))
+        self.version += 1
+
+    def _sort_keys(self, column: int):
+        """INTERNAL - Values a column is sorted and compared by."""
+        col = self._cols[column]
+        if isinstance(col, array):
+            return col
+        if column not in self._keys:
+            numbers = self._as_numbers(column)
+            self._keys[column] = [str(v) for v in col] if any(map(math.isnan, numbers)) else numbers
+        return self._keys[column]
+
+    def _as_numbers(self, column: int):
+        """INTERNAL - A column as numbers, NaN for the cells that aren't one."""
+        col = self._cols[column]
+        if isinstance(col, array):
+            return col
+        if column not in self._numbers:
+            self._numbers[column] = array("d", map(_number, col))
+        return self._numbers[column]
+
+    def _compared(self, column: int, value: str) -> tuple:
+        """INTERNAL - What a condition compares: the column and the value, as numbers if the value is one.
+
+        Raises:
+            ValueError: The value isn't a number, and the column is.
+        """
+        if _NUMBER_RE.fullmatch(value):
+            return self._as_numbers(column), float(value)
+        keys = self._sort_keys(column)
+        if isinstance(keys, array):
+            raise ValueError(f"'{value}' is not a number")
+        return keys, value
+
+    def _text(self, column: int) -> list:
+        """INTERNAL - A column as lowered text, for ~."""
+        if column not in self._lower:
+            self._lower[column] = [str(v).lower() for v in self._cols[column]]
+        return self._lower[column]
+
+    def _condition_mask(self, condition: tuple) -> bytearray:
+        """INTERNAL - Mask of the rows that meet a condition, a column at a time."""
+        column, op, value = condition
+        if op == "any":
+            mask = bytearray(self._n)
+            for c in range(len(self._cols)):
+                m = map(str.__contains__, self._text(c), itertools.repeat(value.lower()))
+                mask = bytearray(map(operator.or_, mask, m))
+            return mask
+        if op == "~":
+            return bytearray(map(str.__contains__, self._text(column), itertools.repeat(value.lower())))
+
+        keys, value = self._compared(column, value)
+        return bytearray(map(_FILTER_OPS[op], keys, itertools.repeat(value)))
+
+    def _predicate(self, condition: tuple):
+        """INTERNAL - Function that tells if row i meets a condition."""
+        column, op, value = condition
+        if op == "any":
+            texts = [self._text(c) for c in range(len(self._cols))]
+            value = value.lower()
+            return lambda i: any(value in text[i] for text in texts)
+        if op == "~":
+            text = self._text(column)
+            value = value.lower()
+            return lambda i: value in text[i]
+
+        keys, value = self._compared(column, value)
+        compare = _FILTER_OPS[op]
+        return lambda i: compare(keys[i], value)
+
+
+_FILTER_OPS = {"=": operator.eq, "!=": operator.ne, "<": operator.lt,
+               "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+_CONDITION_RE = re.compile(r"\s*(\S+?)\s*(!=|<=|>=|=|<|>|~)\s*(.*?)\s*$")
+_AND_RE = re.compile(r"\s+and\s+", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"\s*[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?\s*")
+
+
+def _column(values) -> list:
+    """INTERNAL - Stores a column: an array if it's all ints or all floats."""
+    kinds = set(map(type, values))
+    try:
+        if kinds == {int}:
+            return array("q", values)
+        if kinds == {float}:
+            return array("d", values)
+    except OverflowError:
+        pass
+    return list(values)
+
+
+def _number(value) -> float:
+    """INTERNAL - A cell as a number: ints, floats and numeric text. NaN otherwise."""
+    if type(value) in (int, float):
+        return value
+    if isinstance(value, str) and _NUMBER_RE.fullmatch(value):
+        return float(value)
+    return math.nan
+
+
+def _parse_filter(expression: str, names: List[str], count: int) -> List[tuple]:
+    """INTERNAL - Parses a filter into (column, op, value) conditions."""
+    conditions = []
+    for part in _AND_RE.split(expression.strip()):
+        if not part:
+            continue
+        m = _CONDITION_RE.match(part)
+        if m is None:
+            conditions.append((None, "any", part))
+            continue
+
+        name, op, value = m.groups()
+        if names and name in names:
+            column = names.index(name)
+        elif name.isdigit() and 1 <= int(name) <= count:
+            column = int(name) - 1
+        else:
+            raise ValueError(f"Unknown column '{name}'")
+        conditions.append((column, op, value))
+
+    return conditions
+
+
+def _narrows(conditions: List[tuple], previous: List[tuple]) -> bool:
+    """INTERNAL - Tells if a filter can only drop rows from the previous one.
+
+    It does if it keeps every previous condition, or a narrower one (a
+    longer text for ~).
+    """
+    for old in previous:
+        column, op, value = old
+        if old not in conditions and not any(
+                op in ("~", "any") and c[:2] == (column, op) and value.lower() in c[2].lower()
+                for c in conditions):
+            return False
+    return True
+
+
+def _quote(name: str) -> str:
+    """INTERNAL - Quotes a SQL identifier."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DirRows(RowSource):
+    """Entries of a directory: name, size and modification time.
+
+    A background thread lists the directory with os.scandir (stat included)
+    and the entries can be browsed as they arrive. Once they're all in,
+    they're sorted (directories first, then by name) and version changes.
+    Use dir_rows() to get them from the cache.
+    """
+
+    def __init__(self, path: str, chunk: int = 2048):
+        """Starts listing a directory.
+
+        Args:
+            path (str): Directory.
+            chunk (int): Entries listed before the first ones are shown.
+
+        Raises:
+            OSError: The directory can't be read.
+        """
+        self.path = os.path.abspath(path)
+        self.mtime_ns = os.stat(self.path).st_mtime_ns
+        self.error = None
+
+        # (name, is_dir, size, mtime) of every entry.
+        self._entries = []
+        self._complete = False
+        self._stop = False
+
+        it = os.scandir(self.path)
+        self._read(it, chunk)
+        self._thread = threading.Thread(target=self._run, args=(it,), daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stops the listing."""
+        self._stop = True
+
+    @property
+    def running(self) -> bool:
+        return not self._complete
+
+    def row_count(self) -> int:
+        return len(self._entries)
+
+    def column_count(self) -> int:
+        return 3
+
+    def columns(self) -> List[str]:
+        return ["Name", "Size", "Modified"]
+
+    def rows(self, start: int, count: int) -> List[tuple]:
+        return [(name + os.sep if is_dir else name,
+                 "<DIR>" if is_dir else _format_size(size),
+                 time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime)))
+                for name, is_dir, size, mtime in self._entries[start:start + count]]
+
+    def entry(self, row: int) -> tuple:
+        """Entry of a row.
+
+        Args:
+            row (int): Row (from 0).
+
+        Returns:
+            tuple[str, bool]: Name, and True if it's a directory.
+        """
+        name, is_dir, _, _ = self._entries[row]
+        return name, is_dir
+
+    def find(self, name: str) -> int:
+        """Row of an entry.
+
+        Args:
+            name (str): Name of the entry.
+
+        Returns:
+            int: The row, -1 if it's not there.
+        """
+        for row, entry in enumerate(self._entries):
+            if entry[0] == name:
+                return row
+        return -1
+
+    def _run(self, it):
+        """INTERNAL - Lists the rest of the directory, and sorts it."""
+        try:
+            self._read(it, None)
+        except OSError as e:
+            self.error = e
+        finally:
+            it.close()
+
+        if not self._stop:
+            dirs = [(name.lower(), name, True, size, mtime)
+                    for name, is_dir, size, mtime in self._entries if is_dir]
+            files = [(name.lower(), name, False, size, mtime)
+                     for name, is_dir, size, mtime in self._entries if not is_dir]
+            dirs.sort()
+            files.sort()
+            self._entries = [entry[1:] for entry in itertools.chain(dirs, files)]
+            self.version += 1
+        self._complete = True
+
+    def _read(self, it, count: int):
+        """INTERNAL - Adds the next count entries (None for all of them)."""
+        append = self._entries.append
+        for entry in itertools.islice(it, count):
+            if self._stop:
+                break
+            try:
+                is_dir = entry.is_dir()
+                st = entry.stat()
+            except OSError:  # i.e. a broken symlink
+                is_dir = False
+                st = entry.stat(follow_symlinks=False)
+            append((entry.name, is_dir, st.st_size, st.st_mtime))
+
+
+# Directory listings, the most recently used last.
+_dir_cache = OrderedDict()
+
+
+def dir_rows(path: str, cache_size: int = 16) -> DirRows:
+    """Entries of a directory, from the cache if the directory didn't change.
+
+    A cached listing is used as long as the directory modification time
+    is the same as when it was listed (adding, removing or renaming an
+    entry changes it).
+
+    Args:
+        path (str): Directory.
+        cache_size (int): Directories kept in the cache.
+
+    Returns:
+        DirRows: The listing (maybe still running).
+
+    Raises:
+        OSError: The directory can't be read.
+    """
+    path = os.path.abspath(path)
+    rows = _dir_cache.pop(path, None)
+    if rows is None or rows.error is not None or os.stat(path).st_mtime_ns != rows.mtime_ns:
+        if rows is not None:
+            rows.close()
+        rows = DirRows(path)
+    _dir_cache[path] = rows
+    while len(_dir_cache) > cache_size:
+        _dir_cache.popitem(last=False)[1].close()
+    return rows
+
+
+def _format_size(size: int) -> str:
+    """INTERNAL - Size in bytes, with K/M/G/T suffixes."""
+    if size < 1024:
+        return str(size)
+    for suffix in ("K", "M", "G", "T"):
+        size /= 1024
+        if size < 1024 or suffix == "T":
+            return f"{size:.1f}{suffix}" if size < 10 else f"{size:.0f}{suffix}"
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+#
+# CurTools - Screen management
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+import curses
+import curses.panel
+import time
+
+import modules.instrument as instrument
+
+# Frame scheduler state.
+# Widgets never refresh() a window by themselves. They mark it dirty with
+# noutrefresh() and a single doupdate() pushes the frame to the terminal.
+_frame_pending = False
+_frame_last = 0.0
+_frame_interval = 0.0
+
+# Window stack.
+# Every window opened by win_open() lives in a panel, so curses keeps the
+# z-order and repaints only the rectangle exposed when a window is closed.
+# id(window) -> (window, panel, shadow window, shadow panel)
+_stack = {}
+# ids of the stacked windows and their shadows
+_stacked = set()
+
+
+def frame_rate_limit(fps: int = 0):
+    """Caps the number of frames per second sent to the terminal.
+
+    Only the flushes that are not tied to an input event are capped (i.e.
+    progress bars). A frame is always sent before waiting for a key.
+
+    Args:
+        fps (int): Max frames per second. 0 means no limit.
+    """
+    global _frame_interval
+    _frame_interval = 1 / fps if fps > 0 else 0.0
+
+
+def frame_mark(*windows: curses.window):
+    """Marks windows as dirty, so they are sent in the next frame.
+
+    Stacked windows are left to the panel library. Any other window is copied
+    right away, and the stacked windows it overlaps are touched so they are
+    painted again on top of it.
+
+    Args:
+        windows (curses.window): Curses windows objects, in z-order (bottom first).
+    """
+    global _frame_pending
+    for w in windows:
+        if id(w) in _stacked:
+            continue
+
+        if _stack:
+            top, left = w.getbegyx()
+            height, width = w.getmaxyx()
+            rows = [y for y in range(height) if w.is_linetouched(y)]
+            w.noutrefresh()
+            if rows:
+                _touch_stack(top + rows[0], top + rows[-1], left, left + width - 1)
+        else:
+            w.noutrefresh()
+
+    _frame_pending = True
+
+
+def _touch_stack(y1: int, y2: int, x1: int, x2: int):
+    """INTERNAL - Touches the stacked windows that overlap a screen rectangle.
+
+    Args:
+        y1 (int): First screen row.
+        y2 (int): Last screen row.
+        x1 (int): First screen column.
+        x2 (int): Last screen column.
+    """
+    for entry in _stack.values():
+        for w in (entry[0], entry[2]):
+            if w is None:
+                continue
+            top, left = w.getbegyx()
+            height, width = w.getmaxyx()
+            if left > x2 or left + width - 1 < x1:
+                continue
+            first = max(y1, top)
+            last = min(y2, top + height - 1)
+            if first <= last:
+                w.touchline(first - top, last - first + 1)
+
+
+def frame_flush(force: bool = False) -> bool:
+    """Sends the pending frame to the terminal with one doupdate().
+
+    Args:
+        force (bool): True to ignore the frame rate limit.
+
+    Returns:
+        bool: True if a frame was sent.
+    """
+    global _frame_pending, _frame_last
+
+    if not _frame_pending:
+        return False
+
+    now = time.monotonic()
+    if not force and _frame_interval and now - _frame_last < _frame_interval:
+        return False
+
+    curses.panel.update_panels()
+    curses.doupdate()
+    if instrument.enabled:
+        instrument.frame(time.monotonic() - now)
+    _frame_pending = False
+    _frame_last = now
+    return True
+
+
+def win_open(height: int, width: int, wx: int, wy: int, shadow: bool = True) -> tuple:
+    """Opens a window on top of the window stack.
+
+    Args:
+        height (int): Window height.
+        width (int): Window width.
+        wx (int): x coor.
+        wy (int): y coor.
+        shadow (bool): True to put a shadow under the window.
+
+    Returns:
+        tuple[curses.window, curses.window]: The window and its shadow (None if no shadow).
+    """
+    sha = sha_panel = None
+    if shadow:
+        sha = curses.newwin(height, width, wx + 1, wy + 2)
+        sha.bkgd(" ", curses.A_DIM)
+        sha_panel = curses.panel.new_panel(sha)
+
+    w = curses.newwin(height, width, wx, wy)
+    panel = curses.panel.new_panel(w)
+
+    # The panels keep the curses windows, the widgets get them counted.
+    w = instrument.wrap(w)
+    if sha is not None:
+        sha = instrument.wrap(sha)
+
+    _stack[id(w)] = (w, panel, sha, sha_panel)
+    _stacked.add(id(w))
+    if sha is not None:
+        _stacked.add(id(sha))
+
+    return w, sha
+
+
+def win_close(w: curses.window) -> bool:
+    """Closes a stacked window and its shadow.
+
+    Only the rectangle exposed by the window is restored in the next frame,
+    from the windows under it.
+
+    Args:
+        w (curses.window): Window returned by win_open().
+
+    Returns:
+        bool: False if the window is not in the stack.
+    """
+    global _frame_pending
+
+    entry = _stack.pop(id(w), None)
+    if entry is None:
+        return False
+
+    _, panel, sha, sha_panel = entry
+    panel.hide()
+    _stacked.discard(id(w))
+    if sha_panel is not None:
+        sha_panel.hide()
+        _stacked.discard(id(sha))
+
+    _frame_pending = True
+    return True
+
+
+def win_stacked(w: curses.window) -> bool:
+    """Tells if a window lives in the window stack.
+
+    Args:
+        w (curses.window): Curses window object.
+
+    Returns:
+        bool: True if the window (or its shadow) was opened with win_open().
+    """
+    return id(w) in _stacked
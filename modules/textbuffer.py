@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+#
+# CurTools - Text buffer
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+import random
+from typing import Iterator, List
+
+# Text is kept in leaves of at most this many chars.
+LEAF_SIZE = 2048
+
+
+class _Node:
+    """INTERNAL - Treap node: a piece of text plus the totals of its subtree."""
+
+    __slots__ = ('text', 'left', 'right', 'prio', 'size', 'nl')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.left = None
+        self.right = None
+        self.prio = random.random()
+        self.size = len(text)
+        self.nl = text.count('\n')
+
+
+def _update(t: _Node):
+    """INTERNAL - Recomputes the totals of a node from its children."""
+    size = len(t.text)
+    nl = t.text.count('\n')
+    if t.left is not None:
+        size += t.left.size
+        nl += t.left.nl
+    if t.right is not None:
+        size += t.right.size
+        nl += t.right.nl
+    t.size = size
+    t.nl = nl
+
+
+def _merge(a: _Node, b: _Node) -> _Node:
+    """INTERNAL - Joins two trees, every char of a going before the ones of b."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.prio > b.prio:
+        a.right = _merge(a.right, b)
+        _update(a)
+        return a
+    b.left = _merge(a, b.left)
+    _update(b)
+    return b
+
+
+def _split(t: _Node, k: int) -> tuple:
+    """INTERNAL - Splits a tree in the first k chars and the rest."""
+    if t is None:
+        return None, None
+
+    left_size = t.left.size if t.left is not None else 0
+    if k <= left_size:
+        a, b = _split(t.left, k)
+        t.left = b
+        _update(t)
+        return a, t
+
+    k -= left_size
+    if k < len(t.text):  # The cut falls inside this piece.
+        tail = _Node(t.text[k:])
+        t.text = t.text[:k]
+        right = t.right
+        t.right = None
+        _update(t)
+        return t, _merge(tail, right)
+
+    a, b = _split(t.right, k - len(t.text))
+    t.right = a
+    _update(t)
+    return t, b
+
+
+def _build(pieces: List[str]) -> _Node:
+    """INTERNAL - Builds a treap out of pieces of text, in linear time."""
+    stack = []
+    for text in pieces:
+        node = _Node(text)
+        last = None
+        while stack and stack[-1].prio < node.prio:
+            last = stack.pop()
+        node.left = last
+        if stack:
+            stack[-1].right = node
+        stack.append(node)
+
+    if not stack:
+        return None
+
+    # Totals, children first.
+    order = []
+    todo = [stack[0]]
+    while todo:
+        t = todo.pop()
+        order.append(t)
+        if t.left is not None:
+            todo.append(t.left)
+        if t.right is not None:
+            todo.append(t.right)
+    for t in reversed(order):
+        _update(t)
+
+    return stack[0]
+
+
+class TextBuffer:
+    """A rope: the text lives in small pieces, kept in a balanced tree.
+
+    Every node knows how many chars and newlines its subtree holds, so
+    inserting, deleting and finding a line are O(log n) no matter the size
+    of the text, and the editor never copies more than a piece.
+    """
+
+    def __init__(self, text: str = ""):
+        """Creates a buffer.
+
+        Args:
+            text (str): Initial text.
+        """
+        self._root = None
+        self.extend(text)
+
+    def extend(self, text: str):
+        """Appends text at the end (i.e. while a file is being loaded).
+
+        Args:
+            text (str): Text to be appended.
+        """
+        pieces = [text[i:i + LEAF_SIZE] for i in range(0, len(text), LEAF_SIZE)]
+        self._root = _merge(self._root, _build(pieces))
+
+    def __len__(self) -> int:
+        return self._root.size if self._root is not None else 0
+
+    def __str__(self) -> str:
+        return ''.join(self.chunks())
+
+    def line_count(self) -> int:
+        """Number of lines (an empty buffer has one empty line).
+
+        Returns:
+            int: Lines of the text.
+        """
+        return (self._root.nl if self._root is not None else 0) + 1
+
+    def chunks(self) -> Iterator[str]:
+        """Walks the pieces of the text, in order.
+
+        Returns:
+            Iterator[str]: Pieces of the text.
+        """
+        return iter(self.snapshot())
+
+    def snapshot(self) -> List[str]:
+        """Takes a copy of the text that later edits won't change.
+
+        It's a list of references to the (immutable) pieces, so it's cheap.
+
+        Returns:
+            List[str]: Pieces of the text.
+        """
+        pieces = []
+        todo = []
+        t = self._root
+        while todo or t is not None:
+            if t is not None:
+                todo.append(t)
+                t = t.left
+            else:
+                t = todo.pop()
+                pieces.append(t.text)
+                t = t.right
+        return pieces
+
+    def insert(self, pos: int, text: str):
+        """Inserts text.
+
+        Args:
+            pos (int): Offset, in chars.
+            text (str): Text to be inserted.
+        """
+        if not text:
+            return
+
+        # Fast path: typing. The piece is changed in place.
+        path = self._find(pos)
+        if path:
+            t, k = path[-1]
+            if len(t.text) + len(text) <= LEAF_SIZE:
+                t.text = t.text[:k] + text + t.text[k:]
+                self._grow(path, len(text), text.count('\n'))
+                return
+
+        a, b = _split(self._root, pos)
+        pieces = [text[i:i + LEAF_SIZE] for i in range(0, len(text), LEAF_SIZE)]
+        self._root = _merge(_merge(a, _build(pieces)), b)
+
+    def delete(self, pos: int, length: int = 1) -> str:
+        """Deletes text.
+
+        Args:
+            pos (int): Offset, in chars.
+            length (int): Number of chars.
+
+        Returns:
+            str: The text deleted.
+        """
+        length = min(length, len(self) - pos)
+        if length <= 0 or pos < 0:
+            return ""
+
+        # Fast path: the text is inside one piece, and the piece is kept.
+        path = self._find(pos)
+        if path:
+            t, k = path[-1]
+            if k + length < len(t.text) or (k > 0 and k + length == len(t.text)):
+                removed = t.text[k:k + length]
+                t.text = t.text[:k] + t.text[k + length:]
+                self._grow(path, -length, -removed.count('\n'))
+                return removed
+
+        a, b = _split(self._root, pos)
+        removed, c = _split(b, length)
+        self._root = _merge(a, c)
+        return ''.join(_walk(removed))
+
+    def _find(self, pos: int) -> list:
+        """INTERNAL - Path from the root to the piece holding offset pos.
+
+        Returns:
+            list: (node, offset) pairs. The last offset is the one inside the piece.
+        """
+        path = []
+        t = self._root
+        while t is not None:
+            left_size = t.left.size if t.left is not None else 0
+            if pos < left_size:
+                path.append((t, pos))
+                t = t.left
+                continue
+            pos -= left_size
+            if pos <= len(t.text):
+                path.append((t, pos))
+                return path
+            path.append((t, pos))
+            pos -= len(t.text)
+            t = t.right
+        return []
+
+    @staticmethod
+    def _grow(path: list, chars: int, newlines: int):
+        """INTERNAL - Adds to the totals of every node in a path."""
+        for t, _ in path:
+            t.size += chars
+            t.nl += newlines
+
+    def offset(self, line: int, col: int = 0) -> int:
+        """Offset of a position.
+
+        Args:
+            line (int): Line number (from 0).
+            col (int): Column.
+
+        Returns:
+            int: Offset, in chars.
+        """
+        return self._line_start(line) + col
+
+    def position(self, pos: int) -> tuple:
+        """Line and column of an offset.
+
+        Args:
+            pos (int): Offset, in chars.
+
+        Returns:
+            tuple[int, int]: Line and column.
+        """
+        line = 0
+        base = pos
+        t = self._root
+        while t is not None:
+            left_size = t.left.size if t.left is not None else 0
+            if pos < left_size:
+                t = t.left
+                continue
+            if t.left is not None:
+                line += t.left.nl
+            pos -= left_size
+            if pos <= len(t.text):
+                line += t.text.count('\n', 0, pos)
+                break
+            line += t.text.count('\n')
+            pos -= len(t.text)
+            t = t.right
+        return line, base - self._line_start(line)
+
+    def line(self, n: int) -> str:
+        """Text of a line, without the newline.
+
+        Args:
+            n (int): Line number (from 0).
+
+        Returns:
+            str: The line.
+        """
+        start = self._line_start(n)
+        if n + 1 < self.line_count():
+            end = self._newline(n + 1)
+        else:
+            end = len(self)
+        return self.text(start, end)
+
+    def line_length(self, n: int) -> int:
+        """Length of a line.
+
+        Args:
+            n (int): Line number (from 0).
+
+        Returns:
+            int: Chars of the line, without the newline.
+        """
+        if n + 1 < self.line_count():
+            return self._newline(n + 1) - self._line_start(n)
+        return len(self) - self._line_start(n)
+
+    def lines(self, start: int, count: int) -> List[str]:
+        """Text of consecutive lines.
+
+        Args:
+            start (int): First line (from 0).
+            count (int): Number of lines.
+
+        Returns:
+            List[str]: The lines. Shorter than count at the end of the text.
+        """
+        total = self.line_count()
+        if start >= total or count <= 0:
+            return []
+        end_line = min(start + count, total)
+        first = self._line_start(start)
+        last = self._newline(end_line) if end_line < total else len(self)
+        return self.text(first, last).split('\n')
+
+    def text(self, start: int = 0, end: int = None) -> str:
+        """Text between two offsets.
+
+        Args:
+            start (int): First offset.
+            end (int): Last offset (not included). None means the end.
+
+        Returns:
+            str: The text.
+        """
+        if end is None:
+            end = len(self)
+        out = []
+        _collect(self._root, start, end, out)
+        return ''.join(out)
+
+    def _line_start(self, n: int) -> int:
+        """INTERNAL - Offset where line n starts."""
+        if n <= 0:
+            return 0
+        return self._newline(n) + 1
+
+    def _newline(self, k: int) -> int:
+        """INTERNAL - Offset of the k-th newline (from 1)."""
+        base = 0
+        t = self._root
+        while t is not None:
+            left_nl = t.left.nl if t.left is not None else 0
+            if k <= left_nl:
+                t = t.left
+                continue
+            k -= left_nl
+            if t.left is not None:
+                base += t.left.size
+            here = t.text.count('\n')
+            if k <= here:
+                idx = -1
+                for _ in range(k):
+                    idx = t.text.index('\n', idx + 1)
+                return base + idx
+            k -= here
+            base += len(t.text)
+            t = t.right
+        return base
+
+
+def _walk(t: _Node) -> Iterator[str]:
+    """INTERNAL - Pieces of a tree, in order."""
+    todo = []
+    while todo or t is not None:
+        if t is not None:
+            todo.append(t)
+            t = t.left
+        else:
+            t = todo.pop()
+            yield t.text
+            t = t.right
+
+
+def _collect(t: _Node, start: int, end: int, out: list):
+    """INTERNAL - Appends to out the text of a tree between two offsets."""
+    while t is not None and start < end:
+        left_size = t.left.size if t.left is not None else 0
+        if start < left_size:
+            _collect(t.left, start, min(end, left_size), out)
+        here = len(t.text)
+        if start < left_size + here and end > left_size:
+            out.append(t.text[max(0, start - left_size):end - left_size])
+        start -= left_size + here
+        end -= left_size + here
+        start = max(start, 0)
+        t = t.right
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+#
+# CurTools - Memory mapped text files
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+import mmap
+import re
+from array import array
+from typing import List
+
+import modules.cur_tools as cur_tools
+
+
+class MappedText:
+    """A text file justified on demand, for browsing files of any size.
+
+    The file is memory mapped and the byte offset of every display row is
+    stored in an array, built only as far as the rows that have been asked
+    for. Only the rows on screen (plus a prefetch margin) are justified.
+
+    Lines are joined with spaces, and a blank line starts a new paragraph.
+    The file is expected to be UTF-8 (or plain ASCII).
+    """
+
+    def __init__(self, filename: str, width: int, prefetch: int = 20):
+        """Maps a file.
+
+        Args:
+            filename (str): File to be browsed.
+            width (int): Width of the justification.
+            prefetch (int): Rows justified ahead and behind the visible ones.
+        """
+        self.filename = filename
+        self.width = width
+        self.prefetch = prefetch
+
+        self._file = open(filename, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            self._mm = b''
+        self._size = len(self._mm)
+
+        # Byte offset where every indexed row starts. The last item is the
+        # start of the first row not indexed yet.
+        self._rows = array('Q', [self._skip_blanks(0)])
+        self._complete = self._rows[0] >= self._size
+        self._cache = {}
+
+    def close(self):
+        """Unmaps and closes the file."""
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def complete(self) -> bool:
+        """True once the whole file has been indexed."""
+        return self._complete
+
+    def row_count(self) -> int:
+        """Number of rows indexed so far.
+
+        Returns:
+            int: Rows indexed. It's the real total once complete is True.
+        """
+        return len(self._rows) - (0 if self._complete else 1)
+
+    def estimate_rows(self) -> int:
+        """Estimates the total number of rows, from the rows indexed so far.
+
+        Returns:
+            int: Number of rows of the file (exact if complete is True).
+        """
+        count = self.row_count()
+        if self._complete or count == 0:
+            return max(count, 1)
+
+        return max(count, int(self._size * count / self._rows[-1]))
+
+    def rows(self, start: int, count: int) -> List[str]:
+        """Gets justified rows.
+
+        Args:
+            start (int): First row.
+            count (int): Number of rows.
+
+        Returns:
+            List[str]: The rows, every one padded to width. It could be shorter
+            than count at the end of the file.
+        """
+        first = max(0, start - self.prefetch)
+        last = start + count + self.prefetch
+        self._index_to(last)
+        last = min(last, self.row_count())
+
+        # Keep only the rows around the window.
+        self._cache = {k: v for k, v in self._cache.items() if first <= k < last}
+        for i in range(first, last):
+            if i not in self._cache:
+                self._cache[i] = self._justify(i)
+
+        return [self._cache[i] for i in range(start, min(start + count, last))]
+
+    def index_all(self) -> int:
+        """Indexes the whole file.
+
+        Returns:
+            int: Total number of rows.
+        """
+        while not self._complete:
+            self._index_to(len(self._rows) + 4096)
+        return self.row_count()
+
+    def _index_to(self, n: int):
+        """INTERNAL - Indexes rows until row n is known, or the end of the file."""
+        rows = self._rows
+        while len(rows) <= n and not self._complete:
+            _, next_off, _ = self._scan(rows[-1])
+            if next_off >= self._size:
+                self._complete = True
+            else:
+                rows.append(next_off)
+
+    def _skip_blanks(self, off: int) -> int:
+        """INTERNAL - Skips the spaces at the beginning of a row."""
+        mm = self._mm
+        while off < self._size and mm[off:off + 1] in (b' ', b'\t', b'\r'):
+            off += 1
+        return off
+
+    def _scan(self, off: int) -> tuple:
+        """INTERNAL - Finds where a row ends.
+
+        Args:
+            off (int): Byte offset of the row.
+
+        Returns:
+            tuple[str, int, bool]: The row text, the offset of the next row and
+            True if it is the last row of its paragraph.
+        """
+        width = self.width
+        mm = self._mm
+        raw = mm[off:off + 4 * (width + 1)]
+
+        # Blank line: paragraph separator.
+        if raw[:1] == b'\n':
+            blanks = len(raw) - len(raw.lstrip(b' \t\r\n'))
+            return "", off + blanks, True
+
+        chunk = raw.decode('utf-8', 'surrogateescape')[:width + 1]
+        m = _PARAGRAPH_RE.search(chunk, 0, width + 1)
+        if m is not None:
+            end = m.start()
+        elif len(chunk) <= width and off + len(raw) >= self._size:
+            end = len(chunk)  # End of file
+        else:
+            brk = chunk.translate(_BLANKS).rfind(' ', 1, width + 1)
+            end = brk if brk > 0 else width  # big word detected
+
+        text = chunk[:end]
+        next_off = self._skip_blanks(off + len(text.encode('utf-8', 'surrogateescape')))
+        last = next_off >= self._size
+
+        if mm[next_off:next_off + 1] == b'\n':
+            m = _PARAGRAPH_BYTES_RE.match(mm, next_off)
+            if m is not None:
+                last = True
+                next_off = m.end() - 1  # The last newline makes the blank row.
+            else:
+                next_off = self._skip_blanks(next_off + 1)
+                last = next_off >= self._size
+
+        return text.translate(_BLANKS).strip(), next_off, last
+
+    def _justify(self, i: int) -> str:
+        """INTERNAL - Justifies row i."""
+        text, _, last = self._scan(self._rows[i])
+        text = text.encode('utf-8', 'replace').decode('utf-8')
+        if last:
+            return text.ljust(self.width)
+        return cur_tools.align_string(text, self.width).ljust(self.width)
+
+
+_BLANKS = str.maketrans('\n\r\t', '   ')
+_PARAGRAPH_RE = re.compile(r'\n[ \t\r]*\n')
+_PARAGRAPH_BYTES_RE = re.compile(rb'\n[ \t\r]*\n')
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+#
+# CurTools - Input validators
+#
+# By Pablo Niklas <pablo _dot_ niklas _at_ gmail _dot_ com>
+#
+
+import datetime
+import ipaddress
+import re
+from typing import Callable, Optional, Tuple
+
+import modules.constant as const
+
+
+class Validator:
+    """What an input field takes: the chars, and the whole value on submit.
+
+    The chars are compiled once into the set of the codes 0-255 taken (the
+    keys getch() gives), so checking a key is a set lookup, and a paste is
+    filtered with a single bytes.translate().
+    """
+
+    def __init__(self, chars, pattern: str = None, check: Callable[[str], bool] = None,
+                 message: str = "Valor invalido."):
+        """Creates a validator.
+
+        Args:
+            chars (str | Callable[[str], bool]): The chars taken, or a test of a char (i.e. str.isdigit).
+            pattern (str): Regular expression the whole value has to match on submit. None for any.
+            check (Callable[[str], bool]): Test of the whole value on submit (after the pattern). None for any.
+            message (str): Shown when the value is not valid.
+        """
+        if isinstance(chars, str):
+            allowed = frozenset(chars)
+            chars = allowed.__contains__
+        self.char_test = chars
+        self.codes = frozenset(code for code in range(256) if chars(chr(code)))
+        self.accepts = self.codes.__contains__
+        self._invalid = bytes(code for code in range(256) if code not in self.codes)
+        self.pattern = re.compile(pattern) if pattern is not None else None
+        self.check = check
+        self.message = message
+        self.length = None  # Fixed length of the value (masks), None for the field's.
+
+    # accepts(key) -> bool: True if the key (a getch() code) can be typed. It's
+    # the lookup in codes, set in __init__().
+
+    def filter(self, text: str) -> str:
+        """Text without the chars that can't be typed (i.e. a paste), in one pass.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            str: The valid chars.
+        """
+        try:
+            data = text.encode("latin-1")
+        except UnicodeEncodeError:
+            return "".join(filter(self.char_test, text))
+        return data.translate(None, self._invalid).decode("latin-1")
+
+    def insert(self, value: str, cursor: int, text: str, length: int) -> Tuple[str, int]:
+        """Types text at the cursor.
+
+        Args:
+            value (str): Value of the field.
+            cursor (int): Cursor position in it.
+            text (str): Text typed (a key, or a paste).
+            length (int): Length of the field.
+
+        Returns:
+            Tuple[str, int]: The new value and cursor.
+        """
+        text = self.filter(text)[:max(length - len(value), 0)]
+        return value[:cursor] + text + value[cursor:], cursor + len(text)
+
+    def delete(self, value: str, cursor: int) -> Tuple[str, int]:
+        """Backspace at the cursor.
+
+        Args:
+            value (str): Value of the field.
+            cursor (int): Cursor position in it.
+
+        Returns:
+            Tuple[str, int]: The new value and cursor.
+        """
+        if cursor == 0:
+            return value, cursor
+        return value[:cursor - 1] + value[cursor:], cursor - 1
+
+    def validate(self, value: str) -> bool:
+        """True if the whole value is valid (an empty one always is).
+
+        Args:
+            value (str): The value.
+
+        Returns:
+            bool: True if it's valid.
+        """
+        if not value:
+            return True
+        if self.pattern is not None and self.pattern.fullmatch(value) is None:
+            return False
+        return self.check is None or bool(self.check(value))
+
+
+class Mask(Validator):
+    """Fixed format field: "99/99/9999" (date), "(99) 9999-9999" (phone)...
+
+    In the mask, 9 is a digit, A a letter, * a letter or digit, and
+    anything else a literal, written by the field itself. Typing overwrites
+    (the literals are skipped), and backspace only deletes at the end.
+    """
+
+    SLOTS = {"9": str.isdigit, "A": str.isalpha, "*": str.isalnum}
+
+    def __init__(self, mask: str, check: Callable[[str], bool] = None, message: str = None):
+        """Creates a mask.
+
+        Args:
+            mask (str): The mask.
+            check (Callable[[str], bool]): Test of the whole value on submit. None for any.
+            message (str): Shown when the value is not valid. None for "Formato: <mask>".
+        """
+        slots = [self.SLOTS.get(char) for char in mask]
+        tests = {test for test in slots if test is not None}
+        super().__init__(lambda char: any(test(char) for test in tests), None, check,
+                         message or f"Formato: {mask}")
+        self.mask = mask
+        self.slots = slots
+        self.length = len(mask)
+
+    def insert(self, value: str, cursor: int, text: str, length: int) -> Tuple[str, int]:
+        for char in self.filter(text):
+            cursor = self._skip_literals(cursor)
+            if cursor >= self.length:
+                break
+            if not self.slots[cursor](char):
+                continue
+            value = value + self.mask[len(value):cursor]  # Literals up to the cursor.
+            value = value[:cursor] + char + value[cursor + 1:]
+            cursor = self._skip_literals(cursor + 1)
+            value += self.mask[len(value):cursor]
+        return value, cursor
+
+    def delete(self, value: str, cursor: int) -> Tuple[str, int]:
+        if cursor < len(value):  # Overwrite mode: backspace just moves back.
+            return value, max(cursor - 1, 0)
+        value = value[:-1]
+        while value and self.slots[len(value) - 1] is None:
+            value = value[:-1]
+        return value, len(value)
+
+    def validate(self, value: str) -> bool:
+        if not value:
+            return True
+        if len(value) != self.length or not self._fits(value):
+            return False
+        return self.check is None or bool(self.check(value))
+
+    def _skip_literals(self, cursor: int) -> int:
+        """INTERNAL - First slot from the cursor on."""
+        while cursor < self.length and self.slots[cursor] is None:
+            cursor += 1
+        return cursor
+
+    def _fits(self, value: str) -> bool:
+        """INTERNAL - True if every char of the value fits its place in the mask."""
+        for char, slot, literal in zip(value, self.slots, self.mask):
+            if (slot is None and char != literal) or (slot is not None and not slot(char)):
+                return False
+        return True
+
+
+def _is_date(value: str) -> bool:
+    """INTERNAL - True for a dd/mm/yyyy date that exists."""
+    try:
+        datetime.datetime.strptime(value, "%d/%m/%Y")
+    except ValueError:
+        return False
+    return True
+
+
+def _is_ip(value: str) -> bool:
+    """INTERNAL - True for an IPv4 or IPv6 address."""
+    try:
+        ipaddress.ip_address(value)
+    except ValueError:
+        return False
+    return True
+
+
+_registry = {
+    const.INPUT_TYPE_ALPHANUMERIC: Validator(lambda char: char.isalnum() or char.isspace()),
+    const.INPUT_TYPE_NUMERIC: Validator(str.isdigit),
+    const.INPUT_TYPE_ALPHABETIC: Validator(str.isalpha),
+    const.INPUT_TYPE_EMAIL: Validator(lambda char: char.isprintable() and not char.isspace(),
+                                      r"[^@\s]+@[^@\s]+\.[^@\s.]+", message="E-mail invalido."),
+    const.INPUT_TYPE_TEXT: Validator(str.isprintable),
+    const.INPUT_TYPE_DATE: Mask("99/99/9999", _is_date, "Fecha invalida (dd/mm/aaaa)."),
+    const.INPUT_TYPE_PHONE: Validator("0123456789 +-()", r"\+?[\d ()-]{6,}", message="Telefono invalido."),
+    const.INPUT_TYPE_IP: Validator("0123456789abcdefABCDEF.:", check=_is_ip, message="Direccion IP invalida."),
+}
+
+# Key codes every registered type takes, kept by register(). Read only: it's
+# for per key checks that can't pay for a call (see cur_tools.valid_input()).
+CODES = {input_type: validator.codes for input_type, validator in _registry.items()}
+
+
+def register(input_type, validator: Validator):
+    """Adds an input type (or replaces one).
+
+    Args:
+        input_type: Its name (any hashable, i.e. "zip_code"), as the fields' type.
+        validator (Validator): What it takes.
+    """
+    _registry[input_type] = validator
+    CODES[input_type] = validator.codes
+
+
+def get(input_type) -> Optional[Validator]:
+    """Validator of an input type.
+
+    Args:
+        input_type: A registered type (const.INPUT_TYPE_*, or one added with register()),
+            or a Validator (returned as it is).
+
+    Returns:
+        Validator: The validator, None if the type is unknown.
+    """
+    validator = _registry.get(input_type)
+    if validator is None and isinstance(input_type, Validator):
+        return input_type
+    return validator